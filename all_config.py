@@ -5,6 +5,12 @@ import json
 import os
 import tushare as ts
 
+#数据库连接默认参数
+from stock_project.src.SQLbase.SQLite_connect import DEFAULT_SQLITE_SETTINGS
+
+#并行下载默认参数
+from stock_project.src.data_acquisition.stock_download_parallel import DEFAULT_DOWNLOAD_SETTINGS
+
 #-----------------------------------------------------------------------
 #验证Tushare API密钥是否有效
 def validate_tushare_api(api_key):
@@ -99,7 +105,12 @@ def config_data_get():
     config_data = {
         "tushare_api": tushare_api,
         "headers": headers,
-        "cookies": cookies
+        "cookies": cookies,
+        "sqlite": {
+            "mmap_size": DEFAULT_SQLITE_SETTINGS["mmap_size"],
+            "cache_size": DEFAULT_SQLITE_SETTINGS["cache_size"]
+        },
+        "download": dict(DEFAULT_DOWNLOAD_SETTINGS)
     }
 
     # 保存配置到文件
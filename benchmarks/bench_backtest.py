@@ -0,0 +1,67 @@
+#基准测试：DTZS策略向量化回测的耗时
+#直接生成合成的MarketArrays（随机游走价格，开盘价=前收盘价×跳空，约5%停牌），默认10年 x 5000只股票，不读取数据库
+#运行方式（在项目根目录）：python -m benchmarks.bench_backtest --stocks 5000 --years 10
+
+import argparse
+import time
+
+import numpy as np
+
+from stock_project.src.strategyBacktesting.dtzs_backtest import (
+    MarketArrays,
+    compute_signals,
+    simulate
+)
+
+#生成合成行情数组
+def synthetic_market(stocks, years, seed=0):
+    rng = np.random.default_rng(seed)
+    days = years * 250
+    dates = np.busday_offset('2015-01-01', np.arange(days), roll='forward')
+    codes = np.array([f"sz.00{i:04d}" if i % 2 else f"sh.60{i:04d}" for i in range(stocks)])
+
+    # 对数收益拆为隔夜跳空与日内两部分：开盘价只由前一日收盘价和跳空决定，不含当日收盘价的信息
+    # 价格为鞅（对数收益均值取-σ²/2），没有可预测的收益，不计手续费时策略收益应在0附近，计入手续费后为负
+    gap = rng.normal(-0.01 ** 2 / 2, 0.01, (days, stocks))
+    intraday = rng.normal(-0.028 ** 2 / 2, 0.028, (days, stocks))
+    log_close = np.log(10) + np.cumsum(gap + intraday, axis=0)
+    open_ = np.exp(log_close - intraday).astype(np.float32)
+    close = np.exp(log_close).astype(np.float32)
+    fields = {
+        'open': open_,
+        'high': np.maximum(open_, close) * np.float32(1.01),
+        'low': np.minimum(open_, close) * np.float32(0.99),
+        'close': close,
+        'volume': np.full((days, stocks), 1e7, dtype=np.float32),
+        'turn': np.full((days, stocks), 2.0, dtype=np.float32),
+        'isST': np.zeros((days, stocks), dtype=np.float32),
+    }
+    suspended = rng.random((days, stocks)) < 0.05
+    for values in fields.values():
+        values[suspended] = np.nan
+    return MarketArrays(dates, codes, fields)
+
+def main():
+    parser = argparse.ArgumentParser(description="DTZS策略向量化回测基准测试")
+    parser.add_argument('--stocks', type=int, default=5000)
+    parser.add_argument('--years', type=int, default=10)
+    args = parser.parse_args()
+
+    market = synthetic_market(args.stocks, args.years)
+    days, stocks = market.shape
+    print(f"合成行情：{days} 个交易日 x {stocks} 只股票")
+
+    start_time = time.perf_counter()
+    buy_signal, sell_signal = compute_signals(market)
+    signal_seconds = time.perf_counter() - start_time
+    print(f"信号计算：{signal_seconds:.2f} s")
+
+    start_time = time.perf_counter()
+    result = simulate(market, buy_signal, sell_signal)
+    simulate_seconds = time.perf_counter() - start_time
+    print(f"逐日模拟：{simulate_seconds:.2f} s")
+    print(result)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+#基准测试：STOCK000001按股票代码查询的耗时（建立(code, date)索引前后对比）
+#在临时目录生成合成数据库，默认10年 x 5000只股票（约1200万行），不会影响data目录
+#运行方式（在项目根目录）：python -m benchmarks.bench_stock_index --stocks 5000 --years 10
+
+import argparse
+import os
+import random
+import sqlite3
+import tempfile
+import time
+from datetime import date, timedelta
+
+from stock_project.src.SQLbase.SQLite_manage import migrate_stock_table
+
+TABLE_NAME = 'STOCK000001'
+
+#升级前的表结构，主键为(date, code)
+LEGACY_TABLE_SQL = f"""
+CREATE TABLE IF NOT EXISTS {TABLE_NAME} (
+    date          TEXT    NOT NULL,
+    code          TEXT    NOT NULL,
+    code_name     TEXT,
+    open          REAL,
+    high          REAL,
+    low           REAL,
+    close         REAL,
+    preclose      REAL,
+    volume        REAL,
+    amount        REAL,
+    adjustflag    INTEGER,
+    turn          REAL,
+    tradestatus   INTEGER,
+    pctChg        REAL,
+    isST          INTEGER,
+    PRIMARY KEY (date, code)
+);
+"""
+
+#生成合成交易日（仅剔除周末）
+def synthetic_trade_days(years):
+    days = []
+    current = date(2015, 1, 1)
+    end = current + timedelta(days=365 * years)
+    while current < end:
+        if current.isoweekday() < 6:
+            days.append(current.strftime("%Y-%m-%d"))
+        current += timedelta(days=1)
+    return days
+
+def synthetic_codes(stocks):
+    return [f"{'sh.60' if i % 2 == 0 else 'sz.00'}{i:04d}" for i in range(stocks)]
+
+#按日期顺序写入（与每日补充数据的写入顺序一致）
+def build_database(db_path, stocks, years):
+    days = synthetic_trade_days(years)
+    codes = synthetic_codes(stocks)
+
+    conn = sqlite3.connect(db_path)
+    conn.execute("PRAGMA journal_mode=OFF")
+    conn.execute("PRAGMA synchronous=OFF")
+    conn.execute(LEGACY_TABLE_SQL)
+
+    rng = random.Random(0)
+    start_time = time.time()
+    for day in days:
+        rows = []
+        for code in codes:
+            close = round(rng.uniform(5, 50), 2)
+            rows.append((day, code, code, close, close * 1.02, close * 0.98, close, close,
+                         1e6, 1e7, 2, 1.5, 1, 0.1, 0))
+        conn.executemany(f"INSERT INTO {TABLE_NAME} VALUES ({','.join(['?'] * 15)})", rows)
+    conn.commit()
+    print(f"生成 {len(days)} 个交易日 x {len(codes)} 只股票，共 {len(days) * len(codes)} 行，"
+          f"耗时 {time.time() - start_time:.1f} 秒")
+    return conn, codes
+
+#随机抽取股票，测量单只股票查询的平均耗时
+def time_lookups(conn, codes, lookups):
+    rng = random.Random(1)
+    sample = [rng.choice(codes) for _ in range(lookups)]
+
+    start_time = time.perf_counter()
+    for code in sample:
+        conn.execute(f"SELECT * FROM {TABLE_NAME} WHERE code = ? ORDER BY date", (code,)).fetchall()
+    return (time.perf_counter() - start_time) / lookups * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description="STOCK000001单股查询索引基准测试")
+    parser.add_argument('--stocks', type=int, default=5000)
+    parser.add_argument('--years', type=int, default=10)
+    parser.add_argument('--lookups', type=int, default=20, help="升级前每次查询为全表扫描，次数不宜过多")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = os.path.join(tmp_dir, 'bench-stock-data.db')
+        conn, codes = build_database(db_path, args.stocks, args.years)
+
+        before_ms = time_lookups(conn, codes, args.lookups)
+        print(f"升级前：单股查询平均 {before_ms:.2f} ms")
+
+        migrate_stock_table(conn, TABLE_NAME)
+
+        after_ms = time_lookups(conn, codes, args.lookups * 10)
+        print(f"升级后：单股查询平均 {after_ms:.2f} ms")
+        print(f"加速比：{before_ms / after_ms:.1f}x")
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -3,7 +3,10 @@
 import threading
 
 #多头择时策略
-from stock_project.DTZS_run import dtzs_run
+from stock_project.DTZS_run import dtzs_run, dtzs_shutdown
+
+#数据库连接管理
+from stock_project.src.SQLbase.SQLite_connect import close_all_connections
 
 def main():
     stop_event = threading.Event()
@@ -24,12 +27,22 @@ def main():
             if user_input == 'stop':
                 print("正在停止策略...")
                 stop_event.set()  # 设置停止信号
-                strategy_thread.join(timeout=30)  # 等待线程结束（最多30秒）
                 break
     except KeyboardInterrupt:
         print("\n收到中断信号，正在停止...")
         stop_event.set()
     finally:
+        stop_event.set()
+        strategy_thread.join(timeout=30)  # 等待线程结束（最多30秒）
+        if strategy_thread.is_alive():
+            print("策略线程未在30秒内结束")
+        # 写入剩余的出入池记录并导出监控池（策略线程已执行过时重复调用无影响）
+        try:
+            dtzs_shutdown()
+        except Exception as e:
+            print(f"保存监控池出错: {str(e)}")
+        # 关闭所有线程持有的数据库连接
+        close_all_connections()
         print("程序已安全停止")
 
 
@@ -12,21 +12,52 @@ from .src.data_acquisition.get_stock_pool import *
 from .src.data_acquisition.stock_data_complement import data_complement
 
 #连接股票池
-from .technocal_indicators.connect_monitoring_pool import get_monitoring_pool
-
-#获取api
-from stock_project.src.data_acquisition.stock_get_tdx import connect_tdx,api_disconnect
+from .technocal_indicators.connect_monitoring_pool import (
+    get_monitoring_pool,
+    export_monitoring_pool
+)
 
+#出入池记录日志（缓存后批量写入）
+from .technocal_indicators.monitoring_journal import get_monitoring_journal
 
-def dtzs_run(stop_event):
+#获取api
+from stock_project.src.data_acquisition.stock_get_tdx import api_disconnect
+from stock_project.src.data_acquisition.stock_get_tdx_pool import connect_tdx_pool
+from stock_project.src.data_acquisition.tdx_server_health import get_server_health
+
+
+#停止后台任务、写入剩余的出入池记录并导出监控池csv
+#可重复调用，策略线程退出和主线程退出（包括Ctrl-C）时都会调用
+def dtzs_shutdown(api=None):
+    if api is not None:
+        api_disconnect(api)
+    get_server_health().stop_background()
+    #写入剩余的出入池记录
+    get_monitoring_journal().stop_background()
+    #导出监控池csv（兼容旧格式）
+    export_monitoring_pool()
+    return None
+
+
+#poll_interval:每轮循环的间隔（秒），盘中指标为增量计算，可缩短到几秒
+def dtzs_run(stop_event, poll_interval=60):
     #更新股票池
     get_all_stock_to_pool()
 
     #自动补全数据
     data_complement()
 
-    #连接api
-    api = connect_tdx()
+    #探测服务器延迟并在后台定时重新探测
+    server_health = get_server_health()
+    server_health.probe_all()
+    server_health.start_background()
+
+    #出入池记录在后台定时批量写入
+    monitoring_journal = get_monitoring_journal()
+    monitoring_journal.start_background()
+
+    #连接api（多服务器连接池，并行获取行情）
+    api = connect_tdx_pool()
 
     #一筛，预处理
     #买入数据处理
@@ -42,6 +73,14 @@ def dtzs_run(stop_event):
     # 无限循环部分（可随时停止）
     while not stop_event.is_set():
         try:
+            # 进入新的交易日（交易日6点起）后先补全上一交易日数据，再重新预处理，
+            # 与启动时相同，指标的历史部分每个交易日只计算一次
+            if stock_require_data['indicator_state'].is_stale():
+                print("交易日已变化，补全数据并重新执行预处理")
+                data_complement()
+                code_name_map, stock_require_data = apply_stock_filters_first(get_all_stock_code())
+                code_name_map2, stock_require_data_sell = apply_selling_stocks_first(get_monitoring_pool())
+
             # 获取当前时间
             current_time = datetime.now().time()
             skip_period_start = datetime.strptime("08:00:00", "%H:%M:%S").time()
@@ -53,7 +92,7 @@ def dtzs_run(stop_event):
                 # 每秒检查一次是否结束跳过时段或收到停止信号
                 while skip_period_start <= datetime.now().time() <= skip_period_end:
                     if stop_event.is_set():
-                        api_disconnect(api)
+                        dtzs_shutdown(api)
                         return
                     time.sleep(1)
                 continue  # 跳过时段结束后继续主循环
@@ -61,20 +100,23 @@ def dtzs_run(stop_event):
             # 执行核心逻辑
             print(f"测试运行第{test_i}次")
 
-            code_name_map_buy = apply_stock_filters_second(code_name_map, stock_require_data,api)
-            add_to_monitoring_pool(code_name_map_buy,api)
+            # 本轮只获取一次行情，买入和卖出各阶段共用同一份快照
+            snapshot = get_market_snapshot(api, code_name_map, code_name_map2)
+
+            code_name_map_buy = apply_stock_filters_second(code_name_map, stock_require_data,snapshot)
+            add_to_monitoring_pool(code_name_map_buy,snapshot)
 
-            code_name_map_sell = apply_selling_stocks_second(code_name_map2, stock_require_data_sell,api)
-            remove_stock_from_monitoring_pool(code_name_map_sell,api)
+            code_name_map_sell = apply_selling_stocks_second(code_name_map2, stock_require_data_sell,snapshot)
+            remove_stock_from_monitoring_pool(code_name_map_sell,snapshot)
 
 
 
             # 每次循环后检查停止信号
-            for _ in range(60):  # 每1秒检查一次，共60秒
+            # 每0.5秒检查一次，共poll_interval秒
+            for _ in range(max(1, int(poll_interval * 2))):
                 if stop_event.is_set():
-                    api_disconnect(api)
                     break
-                time.sleep(1)
+                time.sleep(0.5)
 
         except Exception as e:
             print(f"执行出错: {e}")
@@ -82,4 +124,5 @@ def dtzs_run(stop_event):
 
         test_i = test_i + 1
 
+    dtzs_shutdown(api)
     return
\ No newline at end of file
@@ -0,0 +1,133 @@
+#数据库连接管理
+#每个线程、每个数据库文件（stock-data.db、trade-data.db）保持一个长连接，避免反复connect/close
+#启用WAL日志模式，策略线程读取的同时补充数据线程可以写入
+#连接参数可在data/config/config.json的"sqlite"项中配置，例如：
+#   "sqlite": {"mmap_size": 268435456, "cache_size": -65536}
+
+import os
+import json
+import sqlite3
+import threading
+
+#默认连接参数
+#mmap_size:内存映射读取的字节数，0为关闭
+#cache_size:页缓存大小，负数表示KB（-65536即64MB）
+DEFAULT_SQLITE_SETTINGS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "mmap_size": 268435456,
+    "cache_size": -65536,
+    "busy_timeout": 30000
+}
+
+_local = threading.local()
+_all_connections = []
+_lock = threading.Lock()
+_settings = None
+#每次close_all_connections后递增，各线程据此丢弃已关闭的连接
+_generation = 0
+
+#获取数据路径
+#内置函数，无需使用
+def get_data_dir():
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    data_dir = os.path.join(base_dir, '../../data')
+    os.makedirs(data_dir, exist_ok=True)  # 确保目录存在
+    return data_dir
+
+#读取config.json中的数据库配置，缺省项使用默认值
+#内置函数，无需使用
+def load_sqlite_settings():
+    global _settings
+    if _settings is not None:
+        return _settings
+
+    settings = dict(DEFAULT_SQLITE_SETTINGS)
+    json_path = os.path.join(get_data_dir(), 'config', 'config.json')
+    try:
+        if os.path.exists(json_path):
+            with open(json_path, "r", encoding='utf-8') as load_f:
+                config_data = json.load(load_f)
+            settings.update(config_data.get("sqlite") or {})
+    except Exception as e:
+        print(f"读取数据库配置出错，使用默认配置: {e}")
+
+    _settings = settings
+    return _settings
+
+#数据库文件名转为绝对路径，文件名默认位于data目录下
+#内置函数，无需使用
+def _resolve_db_path(db_file):
+    if os.path.isabs(db_file):
+        return os.path.normpath(db_file)
+    return os.path.normpath(os.path.join(get_data_dir(), db_file))
+
+def _open_connection(db_path):
+    settings = load_sqlite_settings()
+
+    # 连接由所属线程使用，check_same_thread=False仅为了主线程退出时统一关闭
+    conn = sqlite3.connect(db_path, timeout=settings["busy_timeout"] / 1000, check_same_thread=False)
+    conn.execute(f"PRAGMA journal_mode={settings['journal_mode']}")
+    conn.execute(f"PRAGMA synchronous={settings['synchronous']}")
+    conn.execute(f"PRAGMA mmap_size={int(settings['mmap_size'])}")
+    conn.execute(f"PRAGMA cache_size={int(settings['cache_size'])}")
+    conn.execute(f"PRAGMA busy_timeout={int(settings['busy_timeout'])}")
+    return conn
+
+#获取当前线程对应数据库的连接，不存在则创建
+#db_file:数据库文件名（如'stock-data.db'）或绝对路径
+#注意：返回的连接由本模块管理，调用方不要关闭
+def get_connection(db_file):
+    db_path = _resolve_db_path(db_file)
+
+    connections = getattr(_local, 'connections', None)
+    if connections is None or getattr(_local, 'generation', None) != _generation:
+        connections = {}
+        _local.connections = connections
+        _local.generation = _generation
+
+    conn = connections.get(db_path)
+    if conn is None:
+        conn = _open_connection(db_path)
+        connections[db_path] = conn
+        with _lock:
+            _all_connections.append(conn)
+    return conn
+
+#关闭当前线程的连接，db_file为None时关闭当前线程的全部连接
+def close_connection(db_file=None):
+    connections = getattr(_local, 'connections', None)
+    if not connections:
+        return None
+
+    if db_file is None:
+        db_paths = list(connections.keys())
+    else:
+        db_paths = [_resolve_db_path(db_file)]
+
+    for db_path in db_paths:
+        conn = connections.pop(db_path, None)
+        if conn is not None:
+            with _lock:
+                if conn in _all_connections:
+                    _all_connections.remove(conn)
+            conn.close()
+    return None
+
+#关闭所有线程的连接，程序退出时调用
+def close_all_connections():
+    global _generation
+    with _lock:
+        connections = list(_all_connections)
+        _all_connections.clear()
+        _generation += 1
+
+    for conn in connections:
+        try:
+            conn.commit()
+            conn.close()
+        except sqlite3.Error as e:
+            print(f"关闭数据库连接出错: {str(e)}")
+
+    print(f"已关闭 {len(connections)} 个数据库连接")
+    return None
@@ -7,12 +7,12 @@ import os
 #json文件
 import json
 
-#baostock部分
-import baostock as bs
-from ..data_acquisition.stock_get import bs_daily_original_stock
+#baostock部分（多进程并行下载）
+from ..data_acquisition.stock_download_parallel import parallel_download
 
 #数据库
 import sqlite3
+from .SQLite_connect import get_connection
 
 #类型整合
 from typing import Union
@@ -43,10 +43,11 @@ def json_to_str():
 
 #连接/创建数据库
 #数据库文件固定存储在stock-data.db中
+#连接由SQLite_connect按线程统一管理，keep_open为True时返回该连接（调用方无需关闭）
 #内置函数，无需使用
 def create_stock_db(table_name,db_path,keep_open=False):
     
-    conn = sqlite3.connect(db_path)
+    conn = get_connection(db_path)
 
     #cursor对象
     c = conn.cursor()
@@ -75,15 +76,61 @@ def create_stock_db(table_name,db_path,keep_open=False):
     c.execute(create_table_sql)
 
     conn.commit()
+
+    #建表后执行结构升级，补建(code, date)索引
+    migrate_stock_table(conn, table_name)
     
     if keep_open:
         print(f"已创建数据库表: {table_name}")
         return conn 
     else:
         print("已创建数据库（关闭连接模式）")
-        conn.close()
         return None
 
+#----------------------------------------------------------
+#数据库结构升级
+#原表主键为(date, code)，按code查询时无法使用主键索引，会全表扫描
+#补建以code在前的(code, date)索引，已有数据库可原地升级，重复执行无副作用
+_migrated_tables = set()
+
+def _stock_index_name(table_name):
+    return f"idx_{table_name}_code_date"
+
+def migrate_stock_table(conn, table_name):
+    # 同一进程内每张表只检查一次
+    db_path = conn.execute("PRAGMA database_list").fetchone()[2]
+    if (db_path, table_name) in _migrated_tables:
+        return None
+
+    c = conn.cursor()
+
+    # 检查表是否存在，以及是否已有索引
+    c.execute("SELECT name FROM sqlite_master WHERE type='table' AND name=?", (table_name,))
+    if not c.fetchone():
+        return None
+    c.execute("SELECT name FROM sqlite_master WHERE type='index' AND name=?", (_stock_index_name(table_name),))
+
+    if not c.fetchone():
+        print(f"正在为表 {table_name} 建立(code, date)索引，数据量大时需要一些时间...")
+        start_time = time.time()
+        c.execute(f"CREATE INDEX IF NOT EXISTS {_stock_index_name(table_name)} ON {table_name} (code, date)")
+        #更新统计信息，使查询计划优先使用新索引
+        c.execute(f"ANALYZE {table_name}")
+        conn.commit()
+        print(f"索引建立完成，耗时 {time.time() - start_time:.1f} 秒")
+
+    _migrated_tables.add((db_path, table_name))
+    return None
+
+#手动升级已有的stock-data.db
+def upgrade_stock_db(table_name='STOCK000001'):
+    data_dir = get_data_dir()
+    db_path = os.path.join(data_dir, 'stock-data.db')
+
+    conn = get_connection(db_path)
+    migrate_stock_table(conn, table_name)
+    return None
+
 # 从JSON文件加载股票代码和名称映射
 def load_stock_mapping(json_path=None):
     if json_path is None:
@@ -103,10 +150,226 @@ def load_stock_mapping(json_path=None):
     
     return code_name_map
 
+#----------------------------------------------------------
+#批量写入股票日线数据
+#STOCK000001表的列顺序，与create_stock_db一致
+STOCK_COLUMNS = ['date', 'code', 'code_name', 'open', 'high', 'low', 'close', 'preclose',
+                 'volume', 'amount', 'adjustflag', 'turn', 'tradestatus', 'pctChg', 'isST']
+
+#各列的类型转换，baostock返回的空字符串转为None
+def _to_real(value):
+    return float(value) if value != '' else None
+
+def _to_int(value):
+    return int(value) if value != '' else None
+
+def _to_text(value):
+    return value if value != '' else None
+
+_STOCK_CONVERTERS = {
+    'date': _to_text, 'code': _to_text,
+    'open': _to_real, 'high': _to_real, 'low': _to_real, 'close': _to_real, 'preclose': _to_real,
+    'volume': _to_real, 'amount': _to_real, 'adjustflag': _to_int, 'turn': _to_real,
+    'tradestatus': _to_int, 'pctChg': _to_real, 'isST': _to_int
+}
+
+#baostock原始字符串行转换为按表列顺序排列的元组
+#fields:baostock返回的字段列表，rows:原始字符串行，code_name:股票名称
+def stock_rows_to_tuples(fields, rows, code_name):
+    positions = [fields.index(col) if col in fields else None for col in STOCK_COLUMNS]
+    converters = [_STOCK_CONVERTERS.get(col) for col in STOCK_COLUMNS]
+
+    result = []
+    for row in rows:
+        values = []
+        for col, pos, convert in zip(STOCK_COLUMNS, positions, converters):
+            if col == 'code_name':
+                values.append(code_name)
+            elif pos is None:
+                values.append(None)
+            else:
+                values.append(convert(row[pos]))
+        result.append(tuple(values))
+    return result
+
+#以(date, code)为键插入或更新，重复写入同一天的数据不会报错
+#rows需为stock_rows_to_tuples返回的元组，在一个事务内完成
+#progress:可选，同一事务内更新下载进度，见update_download_progress
+def upsert_stock_rows(conn, table_name, rows, progress=None):
+    if not rows and not progress:
+        return 0
+
+    update_sql = ', '.join(f"{col} = excluded.{col}" for col in STOCK_COLUMNS if col not in ('date', 'code'))
+    upsert_sql = f"""
+        INSERT INTO {table_name} ({', '.join(STOCK_COLUMNS)})
+        VALUES ({', '.join(['?'] * len(STOCK_COLUMNS))})
+        ON CONFLICT(date, code) DO UPDATE SET {update_sql}
+    """
+    with conn:
+        if rows:
+            conn.executemany(upsert_sql, rows)
+        if progress:
+            update_download_progress(conn, table_name, progress, commit=False)
+    return len(rows)
+
+#----------------------------------------------------------
+#每只股票的下载进度（高水位），存储在stock-data.db的DOWNLOAD_PROGRESS表中
+#last_date:该股票已入库的最后日期
+#last_attempt:最后一次尝试下载的时间，status:'ok'或'error'，message:错误信息
+#与数据在同一事务中更新，中途中断后可从last_date继续补充
+PROGRESS_TABLE = 'DOWNLOAD_PROGRESS'
+
+def create_progress_table(conn):
+    conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS {PROGRESS_TABLE} (
+            table_name    TEXT    NOT NULL,
+            code          TEXT    NOT NULL,
+            last_date     TEXT,
+            last_attempt  TEXT,
+            status        TEXT,
+            message       TEXT,
+            PRIMARY KEY (table_name, code)
+        )
+    """)
+    conn.commit()
+    return None
+
+#progress:列表，每项为(code, last_date, last_attempt, status, message)
+#last_date只会前进，为None时保留原值
+def update_download_progress(conn, table_name, progress, commit=True):
+    conn.executemany(f"""
+        INSERT INTO {PROGRESS_TABLE} (table_name, code, last_date, last_attempt, status, message)
+        VALUES (?, ?, ?, ?, ?, ?)
+        ON CONFLICT(table_name, code) DO UPDATE SET
+            last_date = CASE
+                WHEN excluded.last_date IS NULL THEN last_date
+                WHEN last_date IS NULL OR excluded.last_date > last_date THEN excluded.last_date
+                ELSE last_date END,
+            last_attempt = excluded.last_attempt,
+            status = excluded.status,
+            message = excluded.message
+    """, [(table_name,) + tuple(entry) for entry in progress])
+    if commit:
+        conn.commit()
+    return None
+
+#读取下载进度，返回{code: {'last_date':..., 'status':..., ...}}
+#首次使用时根据数据表中已有的数据初始化每只股票的last_date
+def load_download_progress(table_name):
+    data_dir = get_data_dir()
+    db_path = os.path.join(data_dir, 'stock-data.db')
+
+    conn = get_connection(db_path)
+    create_progress_table(conn)
+
+    c = conn.cursor()
+    c.execute("SELECT name FROM sqlite_master WHERE type='table' AND name=?", (table_name,))
+    table_exists = c.fetchone() is not None
+    c.execute(f"SELECT COUNT(*) FROM {PROGRESS_TABLE} WHERE table_name = ?", (table_name,))
+    if table_exists and c.fetchone()[0] == 0:
+        print("初始化下载进度表...")
+        with conn:
+            conn.execute(f"""
+                INSERT OR IGNORE INTO {PROGRESS_TABLE} (table_name, code, last_date, status)
+                SELECT ?, code, MAX(date), 'ok' FROM {table_name} GROUP BY code
+            """, (table_name,))
+
+    df = pd.read_sql_query(
+        f"SELECT code, last_date, last_attempt, status, message FROM {PROGRESS_TABLE} WHERE table_name = ?",
+        conn, params=[table_name])
+    return df.set_index('code').to_dict('index')
+
+#数据表中最早的日期，新上市或从未下载的股票从该日期开始补全
+def query_stock_first_date(table_name):
+    data_dir = get_data_dir()
+    db_path = os.path.join(data_dir, 'stock-data.db')
+
+    conn = get_connection(db_path)
+    c = conn.cursor()
+    c.execute("SELECT name FROM sqlite_master WHERE type='table' AND name=?", (table_name,))
+    if not c.fetchone():
+        return None
+    row = c.execute(f"SELECT MIN(date) FROM {table_name}").fetchone()
+    return row[0] if row else None
+
+#数据表中全部股票代码（升序），通过(code, date)索引读取
+def query_stock_codes(table_name):
+    data_dir = get_data_dir()
+    db_path = os.path.join(data_dir, 'stock-data.db')
+
+    conn = get_connection(db_path)
+    c = conn.cursor()
+    c.execute("SELECT name FROM sqlite_master WHERE type='table' AND name=?", (table_name,))
+    if not c.fetchone():
+        return []
+    migrate_stock_table(conn, table_name)
+    return [row[0] for row in c.execute(f"SELECT DISTINCT code FROM {table_name} ORDER BY code")]
+
+#----------------------------------------------------------
+#股票基本资料（baostock的query_stock_basic），每个交易日最多下载一次
+#update_date为下载日期，读取时据此判断是否需要刷新
+STOCK_BASIC_TABLE = 'STOCK_BASIC'
+STOCK_BASIC_COLUMNS = ['code', 'code_name', 'ipoDate', 'outDate', 'type', 'status']
+
+def create_stock_basic_table(conn):
+    conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS {STOCK_BASIC_TABLE} (
+            code          TEXT    PRIMARY KEY,
+            code_name     TEXT,
+            ipoDate       TEXT,
+            outDate       TEXT,
+            type          TEXT,
+            status        TEXT,
+            update_date   TEXT
+        )
+    """)
+    conn.commit()
+    return None
+
+#整表替换股票基本资料，在同一事务中完成
+def save_stock_basic(df, update_date):
+    data_dir = get_data_dir()
+    db_path = os.path.join(data_dir, 'stock-data.db')
+
+    conn = get_connection(db_path)
+    create_stock_basic_table(conn)
+
+    rows = [tuple(row) + (update_date,) for row in df[STOCK_BASIC_COLUMNS].itertuples(index=False)]
+    with conn:
+        conn.execute(f"DELETE FROM {STOCK_BASIC_TABLE}")
+        conn.executemany(f"""
+            INSERT OR REPLACE INTO {STOCK_BASIC_TABLE} ({', '.join(STOCK_BASIC_COLUMNS)}, update_date)
+            VALUES ({', '.join(['?'] * (len(STOCK_BASIC_COLUMNS) + 1))})
+        """, rows)
+    return None
+
+#读取股票基本资料，返回(DataFrame, update_date)，没有数据时返回(None, None)
+def load_stock_basic():
+    data_dir = get_data_dir()
+    db_path = os.path.join(data_dir, 'stock-data.db')
+
+    conn = get_connection(db_path)
+    create_stock_basic_table(conn)
+
+    df = pd.read_sql_query(f"SELECT {', '.join(STOCK_BASIC_COLUMNS)}, update_date FROM {STOCK_BASIC_TABLE}", conn)
+    if df.empty:
+        return None, None
+    return df.drop(columns='update_date'), df['update_date'].max()
+
 #json数据存入到数据库
 #table_name自选池名称
 #start,end:格式为YYYY-MM-DD形式的日期
-def stock_to_sql_for(table_name,start,end):
+#batch_rows:累计多少行提交一次事务
+#workers,rate_limit:并行下载的进程数和限速，默认读取配置
+def stock_to_sql_for(table_name,start,end,batch_rows=50000,workers=None,rate_limit=None):
+    #调用读取json
+    stock_code = json_to_str()
+    tasks = [(code, start, end) for code in stock_code['股票'].values()]
+    return stock_tasks_to_sql(table_name, tasks, batch_rows, workers, rate_limit)
+
+#按任务列表下载并写入数据库，每项为(code, start, end)
+#下载由多个进程并行完成，写入只在当前进程内进行
+def stock_tasks_to_sql(table_name,tasks,batch_rows=50000,workers=None,rate_limit=None):
     # 获取数据库路径
     data_dir = get_data_dir()
     db_path = os.path.join(data_dir, 'stock-data.db')
@@ -116,31 +379,59 @@ def stock_to_sql_for(table_name,start,end):
     
     # 加载股票代码-名称映射
     code_name_map = load_stock_mapping()
-    
-    #调用读取json
-    stock_code = json_to_str()
-    
-    bs.login()
-    
-    for code in list(stock_code['股票'].values()):
-        try:
-            #调用原始数据读取
-            data = bs_daily_original_stock(code,start,end,adjust_val='2',already_login=True)
-            #股票名称
-            stock_name = code_name_map.get(code, "未知股票")
-            data['code_name'] = stock_name
-            time.sleep(0.2)
-            data.to_sql(table_name,con_name,index=False,if_exists='append')#存到数据库
-            print("right code is %s"%code)
-        except Exception as e:
+
+    create_progress_table(con_name)
+
+    pending_rows = []
+    pending_progress = []
+    total_rows = 0
+    # 各股票本次下载的截止日期
+    task_end = {code: end for code, _, end in tasks}
+    # 区间内没有数据的股票，下载结束后再决定是否推进last_date
+    empty_results = []
+    # 本次下载到的最新日期，说明该日数据已发布
+    latest_row_date = None
+
+    # 下载结果回调，攒够一批后在一个事务内写入数据和下载进度
+    def handle_result(code, fields, rows, error):
+        nonlocal pending_rows, pending_progress, total_rows, latest_row_date
+        attempt_time = time.strftime("%Y-%m-%d %H:%M:%S")
+        if error is not None:
             print("error code is %s"%code)
-            print(f"错误，检查是否已有数据或程序错误:{str(e)}")
-    
-    bs.logout()
+            print(f"错误，数据获取失败:{error}")
+            pending_progress.append((code, None, attempt_time, 'error', error))
+            return
+
+        #股票名称
+        stock_name = code_name_map.get(code, "未知股票")
+        stock_rows = stock_rows_to_tuples(fields, rows, stock_name)
+        pending_rows.extend(stock_rows)
+        if stock_rows:
+            last_date = max(row[0] for row in stock_rows)
+            latest_row_date = max(latest_row_date or last_date, last_date)
+            pending_progress.append((code, last_date, attempt_time, 'ok', None))
+        else:
+            empty_results.append((code, attempt_time))
+        print("right code is %s"%code)
+
+        if len(pending_rows) >= batch_rows:
+            total_rows += upsert_stock_rows(con_name, table_name, pending_rows, pending_progress)
+            pending_rows = []
+            pending_progress = []
+
+    parallel_download(tasks, handle_result, workers=workers, rate_limit=rate_limit)
+
+    # 区间内没有数据（停牌或尚未上市）：截止日期的数据已发布时才记录截止日期，下次不再重复下载；
+    # 当日16:00后补充时baostock可能尚未发布当日数据，此时保留原last_date，下次重新下载
+    today = time.strftime("%Y-%m-%d")
+    for code, attempt_time in empty_results:
+        end = task_end.get(code)
+        published = end is not None and (end < today or (latest_row_date is not None and end <= latest_row_date))
+        pending_progress.append((code, end if published else None, attempt_time, 'ok', None))
+
+    total_rows += upsert_stock_rows(con_name, table_name, pending_rows, pending_progress)
     
-    #关闭数据库
-    print("导入数据库完成")
-    con_name.close()
+    print(f"导入数据库完成，共写入 {total_rows} 行")
     print(f"数据已保存到: {db_path}")
 #----------------------------------------------------------
 #删除表函数
@@ -150,10 +441,8 @@ def _drop_table(db_file: str, table_name: str) -> str:
     data_dir = get_data_dir()
     db_path = os.path.join(data_dir, db_file)
     
-    conn = None
-    
     try:
-        conn = sqlite3.connect(db_path)
+        conn = get_connection(db_path)
         c = conn.cursor()
         
         # 检查表是否存在
@@ -168,9 +457,6 @@ def _drop_table(db_file: str, table_name: str) -> str:
     
     except sqlite3.Error as e:
         return f"删除表时出错: {str(e)}"
-    finally:
-        if conn:
-            conn.close()
 
 # 交易数据库专用接口
 def drop_trade_table(table_name: str) -> str:
@@ -190,10 +476,8 @@ def _query_table(db_file: str, table_name: str) -> Union[pd.DataFrame, str]:
     data_dir = get_data_dir()
     db_path = os.path.join(data_dir, db_file)
     
-    conn = None
-    
     try:
-        conn = sqlite3.connect(db_path)
+        conn = get_connection(db_path)
         c = conn.cursor()
         
         # 检查表是否存在
@@ -206,9 +490,6 @@ def _query_table(db_file: str, table_name: str) -> Union[pd.DataFrame, str]:
         return df
     except sqlite3.Error as e:
         return f"读取表时出错: {str(e)}"
-    finally:
-        if conn:
-            conn.close()
 
 # 交易数据库查询
 def query_trade_table(table_name: str) -> Union[pd.DataFrame, str]:
@@ -222,15 +503,17 @@ def query_stock_table(table_name: str) -> Union[pd.DataFrame, str]:
 
 #----------------------------------------------------------
 #查询表某一个股票的函数
-def _query_one_stock_table(db_file: str, table_name: str, stock_code: str) -> Union[pd.DataFrame, str]:
+#start,end:可选，格式为YYYY-MM-DD形式的日期，只读取该区间内的数据
+#last_n:可选，只取截至end（as of日期）的最近n条记录
+#trading_only:为True时在数据库内过滤停牌数据（tradestatus = 1）
+def _query_one_stock_table(db_file: str, table_name: str, stock_code: str,
+                           start=None, end=None, last_n=None, trading_only=False) -> Union[pd.DataFrame, str]:
     # 获取数据库路径
     data_dir = get_data_dir()
     db_path = os.path.join(data_dir, db_file)
 
-    conn = None
-
     try:
-        conn = sqlite3.connect(db_path)
+        conn = get_connection(db_path)
         c = conn.cursor()
 
         # 检查表是否存在
@@ -244,8 +527,34 @@ def _query_one_stock_table(db_file: str, table_name: str, stock_code: str) -> Un
         if 'code' not in columns:
             return f"表 '{table_name}' 中不存在 'code' 列"
 
+        # 已有数据库原地升级，确保(code, date)索引存在
+        if 'date' in columns:
+            migrate_stock_table(conn, table_name)
+
+        # 日期区间条件，配合(code, date)索引只扫描所需区间
         query = f"SELECT * FROM {table_name} WHERE code = ?"
-        df = pd.read_sql_query(query, conn,params=[stock_code])
+        params = [stock_code]
+        if start is not None:
+            query += " AND date >= ?"
+            params.append(start)
+        if end is not None:
+            query += " AND date <= ?"
+            params.append(end)
+        if trading_only:
+            if 'tradestatus' not in columns:
+                return f"表 '{table_name}' 中不存在 'tradestatus' 列"
+            query += " AND tradestatus = 1"
+
+        if last_n is not None:
+            if 'date' not in columns:
+                return f"表 '{table_name}' 中不存在 'date' 列"
+            # 在数据库内倒序取最近n条，再恢复为日期升序
+            query = f"SELECT * FROM ({query} ORDER BY date DESC LIMIT ?) ORDER BY date"
+            params.append(int(last_n))
+        elif 'date' in columns:
+            query += " ORDER BY date"
+
+        df = pd.read_sql_query(query, conn,params=params)
 
         if df.empty:
             return f"表 '{table_name}' 中未找到股票代码 '{stock_code}' 的记录"
@@ -253,9 +562,6 @@ def _query_one_stock_table(db_file: str, table_name: str, stock_code: str) -> Un
         return df
     except sqlite3.Error as e:
         return f"查询股票数据时出错: {str(e)}"
-    finally:
-        if conn:
-            conn.close()
 
 
 # 交易数据库查询特定股票
@@ -265,6 +571,126 @@ def query_one_trade_table(table_name: str, stock_code: str) -> Union[pd.DataFram
 
 
 # 股票数据库查询特定股票
-def query_one_stock_table(table_name: str, stock_code: str) -> Union[pd.DataFrame, str]:
-    """专用函数：查询stock-data.db中特定股票的数据"""
-    return _query_one_stock_table("stock-data.db", table_name, stock_code)
\ No newline at end of file
+def query_one_stock_table(table_name: str, stock_code: str, start=None, end=None,
+                          last_n=None, trading_only=False) -> Union[pd.DataFrame, str]:
+    """专用函数：查询stock-data.db中特定股票的数据，可选日期区间、最近n条及过滤停牌"""
+    return _query_one_stock_table("stock-data.db", table_name, stock_code, start, end, last_n, trading_only)
+
+#----------------------------------------------------------
+#一次查询多只股票的函数，替代逐只调用query_one_stock_table
+#codes:股票代码列表，通过临时表与数据表连接，一次SQL读取全部股票
+#last_n:可选，每只股票只取最近n条记录（窗口函数ROW_NUMBER实现，n为1时使用索引倒序查找）
+#start,end:可选，格式为YYYY-MM-DD形式的日期区间
+#columns:可选，需要读取的列，code和date总会包含
+#as_arrays:为True时返回{列名: NumPy数组}，否则返回DataFrame
+#trading_only:为True时在数据库内过滤停牌数据，last_n即为最近n个交易日
+#返回结果均按(code, date)升序排列，同一股票的数据连续存放
+def _query_many_stocks(db_file: str, table_name: str, codes, last_n=None, start=None, end=None,
+                       columns=None, as_arrays=False, trading_only=False) -> Union[pd.DataFrame, dict, str]:
+    # 获取数据库路径
+    data_dir = get_data_dir()
+    db_path = os.path.join(data_dir, db_file)
+
+    conn = get_connection(db_path)
+    c = conn.cursor()
+    try:
+        # 检查表是否存在
+        c.execute("SELECT name FROM sqlite_master WHERE type='table' AND name=?", (table_name,))
+        if not c.fetchone():
+            return f"表 '{table_name}' 不存在"
+
+        # 检查列是否存在
+        c.execute(f"PRAGMA table_info({table_name})")
+        table_columns = [col[1] for col in c.fetchall()]
+        if 'code' not in table_columns or 'date' not in table_columns:
+            return f"表 '{table_name}' 中不存在 'code' 或 'date' 列"
+
+        if columns is None:
+            select_columns = table_columns
+        else:
+            unknown = [col for col in columns if col not in table_columns]
+            if unknown:
+                return f"表 '{table_name}' 中不存在列: {unknown}"
+            select_columns = ['code', 'date'] + [col for col in columns if col not in ('code', 'date')]
+
+        if trading_only and 'tradestatus' not in table_columns:
+            return f"表 '{table_name}' 中不存在 'tradestatus' 列"
+
+        # 已有数据库原地升级，确保(code, date)索引存在
+        migrate_stock_table(conn, table_name)
+
+        # 股票代码写入临时表，通过连接代替逐只查询
+        c.execute("DROP TABLE IF EXISTS temp.query_codes")
+        c.execute("CREATE TEMP TABLE query_codes (code TEXT PRIMARY KEY)")
+        c.executemany("INSERT OR IGNORE INTO temp.query_codes (code) VALUES (?)",
+                      [(code,) for code in codes])
+
+        column_sql = ', '.join(f"t.{col}" for col in select_columns)
+        date_condition = ""
+        params = []
+        if start is not None:
+            date_condition += " AND t.date >= ?"
+            params.append(start)
+        if end is not None:
+            date_condition += " AND t.date <= ?"
+            params.append(end)
+        if trading_only:
+            date_condition += " AND t.tradestatus = 1"
+
+        if last_n is None:
+            query = f"""
+                SELECT {column_sql} FROM {table_name} t
+                JOIN temp.query_codes q ON t.code = q.code
+                WHERE 1 = 1 {date_condition}
+                ORDER BY t.code, t.date
+            """
+        elif int(last_n) == 1:
+            # 只取最新一条时，每只股票沿(code, date)索引倒序找到第一条满足条件的记录即可，
+            # 无需对全部历史编号排序
+            query = f"""
+                SELECT {column_sql} FROM temp.query_codes q
+                JOIN {table_name} t ON t.rowid = (
+                    SELECT t.rowid FROM {table_name} t
+                    WHERE t.code = q.code {date_condition}
+                    ORDER BY t.date DESC LIMIT 1
+                )
+                ORDER BY t.code
+            """
+        else:
+            # 窗口函数按股票分组倒序编号，只保留最近last_n条
+            query = f"""
+                SELECT {', '.join(select_columns)} FROM (
+                    SELECT {column_sql},
+                           ROW_NUMBER() OVER (PARTITION BY t.code ORDER BY t.date DESC) AS row_num
+                    FROM {table_name} t
+                    JOIN temp.query_codes q ON t.code = q.code
+                    WHERE 1 = 1 {date_condition}
+                )
+                WHERE row_num <= ?
+                ORDER BY code, date
+            """
+            params.append(int(last_n))
+
+        df = pd.read_sql_query(query, conn, params=params)
+
+        if as_arrays:
+            return {col: df[col].to_numpy() for col in df.columns}
+        return df
+    except sqlite3.Error as e:
+        conn.rollback()
+        return f"查询多只股票数据时出错: {str(e)}"
+    finally:
+        # 长连接需及时结束临时表写入开启的事务，避免长期占用WAL读快照
+        try:
+            c.execute("DROP TABLE IF EXISTS temp.query_codes")
+            conn.commit()
+        except sqlite3.Error:
+            conn.rollback()
+
+
+# 股票数据库一次查询多只股票
+def query_many_stocks(table_name: str, codes, last_n=None, start=None, end=None,
+                      columns=None, as_arrays=False, trading_only=False) -> Union[pd.DataFrame, dict, str]:
+    """专用函数：一次SQL查询stock-data.db中多只股票的数据，按(code, date)排序"""
+    return _query_many_stocks("stock-data.db", table_name, codes, last_n, start, end,
+                              columns, as_arrays, trading_only)
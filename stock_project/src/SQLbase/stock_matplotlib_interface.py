@@ -5,7 +5,7 @@ import numpy as np
 import os
 
 #数据库
-import sqlite3
+from .SQLite_connect import get_connection
 
 #绘图
 import matplotlib.pyplot as plt
@@ -221,8 +221,8 @@ def basic_set_plot_stock(table_name, stock_code,start=None, end=None):
     db_path = os.path.join(data_dir, 'stock-data.db')
 
     #注意需要先生成数据库
-    #连接/创建数据库
-    conn = sqlite3.connect(db_path)
+    #连接/创建数据库（连接由SQLite_connect统一管理，无需关闭）
+    conn = get_connection(db_path)
     
     try:
         # 获取股票名称
@@ -258,10 +258,6 @@ def basic_set_plot_stock(table_name, stock_code,start=None, end=None):
     except Exception as e:
         print(f"数据库操作出错: {str(e)}")
         return pd.DataFrame()
-    
-    finally:
-        # 确保关闭数据库连接
-        conn.close()
 
 #-------------------------------------------------------------------------------------
 #通过函数接口绘制各类图表
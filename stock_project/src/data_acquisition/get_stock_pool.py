@@ -3,31 +3,19 @@
 #结果存储在stock_pool.json
 
 import json
-import pandas as pd
-import baostock as bs
 import os
 
+#股票基本资料缓存
+from .stock_basic_cache import get_stock_basic
+
 def get_all_stock_to_pool():
     print('执行Baostock的全行情获取')
-    # 登陆系统
-    lg = bs.login()
-
-    # 显示登陆返回信息
-    print('login respond error_code:'+lg.error_code)
-    print('login respond  error_msg:'+lg.error_msg)
-
-    rs = bs.query_stock_basic()
+    # 股票基本资料每个交易日只下载一次，与新股筛选共用
+    result = get_stock_basic()
+    if result.empty:
+        print('未获取到股票基本资料，股票池未更新')
+        return None
 
-    # 打印结果集
-    data_list = []
-    while (rs.error_code == '0') & rs.next():
-        # 获取一条记录，将记录合并在一起
-        data_list.append(rs.get_row_data())
-    result = pd.DataFrame(data_list, columns=rs.fields)
-
-    # 登出系统
-    bs.logout()
-    
     # 筛选outDate为空的记录，即未退市的股票
     result = result[result['outDate'] == '']
     
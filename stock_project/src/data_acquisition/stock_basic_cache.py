@@ -0,0 +1,65 @@
+#股票基本资料缓存（上市日期、退市日期、类型、状态）
+#baostock的query_stock_basic每个交易日最多下载一次，保存在stock-data.db的STOCK_BASIC表
+#同一进程内再缓存一份，各模块共用，读取时附带解析好的ipo_date、out_date日期列
+
+from datetime import date
+
+import pandas as pd
+
+#下载股票基本资料
+from .stock_get import bs_query_ipodate
+
+#交易日历
+from .trade_calendar import get_trade_calendar
+
+#数据库
+from ..SQLbase.SQLite_manage import (
+    STOCK_BASIC_COLUMNS,
+    save_stock_basic,
+    load_stock_basic
+)
+
+# 进程内缓存：{'update_date': 下载日期, 'data': 解析后的DataFrame}
+_stock_basic_cache = {'update_date': None, 'data': None}
+
+#解析日期列，空字符串或格式错误的为NaT
+def _parse_stock_basic(df):
+    df = df.copy()
+    df['ipo_date'] = pd.to_datetime(df['ipoDate'], format='%Y-%m-%d', errors='coerce')
+    df['out_date'] = pd.to_datetime(df['outDate'], format='%Y-%m-%d', errors='coerce')
+    return df
+
+def get_stock_basic(force_refresh=False):
+    """
+    获取股票基本资料
+    最近一个交易日已下载过则直接读取缓存，否则重新下载；下载失败时使用旧数据
+
+    返回:
+        DataFrame，列为code、code_name、ipoDate、outDate、type、status、ipo_date、out_date
+    """
+    latest = get_trade_calendar().latest_trade_day().strftime("%Y-%m-%d")
+
+    cached_date = _stock_basic_cache['update_date']
+    if not force_refresh and cached_date is not None and cached_date >= latest:
+        return _stock_basic_cache['data']
+
+    df, update_date = load_stock_basic()
+
+    if force_refresh or df is None or update_date < latest:
+        print('下载股票基本资料')
+        try:
+            fresh_df = bs_query_ipodate()
+            if fresh_df.empty:
+                raise ValueError('返回数据为空')
+            update_date = date.today().strftime("%Y-%m-%d")
+            save_stock_basic(fresh_df, update_date)
+            df = fresh_df[STOCK_BASIC_COLUMNS]
+        except Exception as e:
+            print(f"下载股票基本资料出错: {str(e)}")
+            if df is None:
+                return _parse_stock_basic(pd.DataFrame(columns=STOCK_BASIC_COLUMNS))
+            print(f"使用 {update_date} 下载的股票基本资料")
+
+    _stock_basic_cache['update_date'] = update_date
+    _stock_basic_cache['data'] = _parse_stock_basic(df)
+    return _stock_basic_cache['data']
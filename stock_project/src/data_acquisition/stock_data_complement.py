@@ -1,95 +1,97 @@
 #盘后下载数据、补充确实的数据
+#根据每只股票的下载进度（高水位）只补充缺失的区间
+#中途中断后再次运行会从各股票的断点继续，已是最新的股票直接跳过
 
-#交易日判断
-from chinese_calendar import is_workday
+#交易日历
+from .trade_calendar import get_trade_calendar
 
 #日期
 from datetime import datetime, timedelta
 
 #引用数据库
 from ..SQLbase.SQLite_manage import (
-    query_one_stock_table,
-    stock_to_sql_for
+    json_to_str,
+    load_download_progress,
+    query_stock_first_date,
+    stock_tasks_to_sql
 )
 
 # 判断所给日期是否为交易日
 def is_trade_day(date):
-    if is_workday(date):
-        if datetime.isoweekday(date) < 6:
-            return True
-    return False
+    return get_trade_calendar().is_trade_day(date)
 
-#获取日期，返回数据库空缺的交易时间段
-def date_get():
-    try:
-        table_name = 'STOCK000001'
-        data = query_one_stock_table(table_name, stock_code='sh.600000')
-
-        # 检查是否成功获取数据
-        if data is None or data.empty:
-            print('数库据数据为空，或无法查询')
-            return None, None
-
-        data = data.sort_values(by='date')
-        last_date_str = data['date'].iloc[-1]  # 直接取最后一行日期
-
-        # 将字符串转换为 datetime 对象
-        last_date = datetime.strptime(last_date_str, "%Y-%m-%d")
-
-        # 加一天
-        next_date = last_date + timedelta(days=1)
-        while not is_trade_day(next_date.date()):
-            next_date += timedelta(days=1)
-
-        # 获取当前天
-        current_datetime = datetime.now()
-        current_date = current_datetime.date()
-        current_time = current_datetime.time()
-
-        # 判断日期：下一天应该不晚于当前日期
-        if next_date.date() > current_date:
-            return None, None  # 返回空值
-
-        # 检查时间段内是否有交易日
-        has_trade_day = False
-        temp_date = next_date
-        while temp_date.date() <= current_date:
-            if is_trade_day(temp_date.date()):
-                has_trade_day = True
-                break
-            temp_date += timedelta(days=1)
-
-        if not has_trade_day:
-            print("区间内无交易日，无需补充数据")
-            return None, None
-
-        # 检查是否在有效补充时段（交易日后16:00至次日开盘前）
-        if next_date.date() == current_date:
-            # 检查当前时间是否在下午4点之后
-            if current_time.hour < 16:
-                print(f"当前时间未到下午4点({current_time.strftime('%H:%M')})，请在16:00后补充当日数据")
-                return None, None  # 未到补充时段返回空值
-
-        return next_date.strftime("%Y-%m-%d"), current_datetime.strftime('%Y-%m-%d')
+# 所给日期之后的下一个交易日
+def next_trade_day(date):
+    return get_trade_calendar().next_trade_day(date)
 
-    except Exception as e:
-        print(f"获取日期出错: {str(e)}")
-        return None, None  # 任何异常返回空值
+#获取补充数据的截止日期
+#交易日16:00后可补充当日数据，否则截止到上一个交易日
+def get_complement_end_date():
+    current_datetime = datetime.now()
+    end_date = current_datetime.date()
+
+    if current_datetime.hour < 16:
+        end_date -= timedelta(days=1)
+
+    return get_trade_calendar().latest_trade_day(end_date)
+
+#根据下载进度生成补充任务，返回[(code, start, end), ...]
+#已有数据的股票从last_date的下一个交易日开始，新股票从数据库最早日期开始
+def build_complement_tasks(table_name, codes, end_date):
+    first_date = query_stock_first_date(table_name)
+    if first_date is None:
+        print('数据库数据为空，请先导入历史数据')
+        return []
+
+    progress = load_download_progress(table_name)
+
+    tasks = []
+    up_to_date = 0
+    new_stocks = 0
+    start_cache = {}  # 多数股票的last_date相同，缓存起始日期的计算结果
+    end_str = end_date.strftime("%Y-%m-%d")
+
+    for code in codes:
+        last_date = progress.get(code, {}).get('last_date')
+
+        if last_date:
+            if last_date not in start_cache:
+                start_cache[last_date] = next_trade_day(datetime.strptime(last_date, "%Y-%m-%d").date())
+            start_date = start_cache[last_date]
+        else:
+            start_date = datetime.strptime(first_date, "%Y-%m-%d").date()
+            new_stocks += 1
+
+        if start_date > end_date:
+            up_to_date += 1
+            continue
+
+        tasks.append((code, start_date.strftime("%Y-%m-%d"), end_str))
+
+    print(f"需补充 {len(tasks)} 只股票（其中新股票 {new_stocks} 只），已是最新 {up_to_date} 只")
+    return tasks
 
 #补充数据
 def data_complement():
-    start_date, end_date = date_get()
-    # 当获取不到有效日期时直接返回空值
-    if start_date is None or end_date is None:
+    table_name = 'STOCK000001'
+
+    stock_code = json_to_str()
+    if stock_code is None:
         return None
 
-    table_name = 'STOCK000001'
+    end_date = get_complement_end_date()
+    tasks = build_complement_tasks(table_name, list(stock_code['股票'].values()), end_date)
+
+    # 所有股票均已是最新时直接返回空值
+    if not tasks:
+        print("区间内无缺失数据，无需补充数据")
+        return None
 
     try:
-        stock_to_sql_for(table_name,start_date, end_date)
-        print(f"补充数据从 {start_date} 到 {end_date}")
+        stock_tasks_to_sql(table_name, tasks)
+        print(f"补充数据完成，共 {len(tasks)} 只股票，截止到 {end_date.strftime('%Y-%m-%d')}")
         return "数据补充成功"
 
     except Exception as e:
         print(f"补充数据出错: {str(e)}")
-        return 0
\ No newline at end of file
+        return 0
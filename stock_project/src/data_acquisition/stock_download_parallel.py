@@ -0,0 +1,180 @@
+#多进程并行下载baostock日线数据
+#任务队列在多个工作进程间分发，每个工作进程持有独立的baostock登录会话
+#所有工作进程共享一个限速器，下载结果通过队列传回主进程，由主进程统一写入数据库（单写入者）
+#并发数和限速可在data/config/config.json的"download"项中配置，例如：
+#   "download": {"workers": 4, "rate_limit": 10}
+
+import os
+import json
+import time
+import queue
+import multiprocessing as mp
+
+import baostock as bs
+
+from .stock_get import bs_daily_original_rows
+
+#默认下载参数
+#workers:工作进程数，0表示在当前进程内顺序下载
+#rate_limit:所有进程合计每秒最多请求次数，0表示不限速
+DEFAULT_DOWNLOAD_SETTINGS = {
+    "workers": 4,
+    "rate_limit": 10
+}
+
+#获取配置路径
+#内置函数，无需使用
+def get_config_dir():
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    config_dir = os.path.join(base_dir, '../../data/config')
+    os.makedirs(config_dir, exist_ok=True)  # 确保目录存在
+    return config_dir
+
+#读取config.json中的下载配置，缺省项使用默认值
+def load_download_settings():
+    settings = dict(DEFAULT_DOWNLOAD_SETTINGS)
+    json_path = os.path.join(get_config_dir(), 'config.json')
+    try:
+        if os.path.exists(json_path):
+            with open(json_path, "r", encoding='utf-8') as load_f:
+                config_data = json.load(load_f)
+            settings.update(config_data.get("download") or {})
+    except Exception as e:
+        print(f"读取下载配置出错，使用默认配置: {e}")
+    return settings
+
+#共享限速：所有进程按固定间隔依次领取请求时间片
+#内置函数，无需使用
+def _wait_rate_slot(rate_lock, next_slot, interval):
+    if interval <= 0:
+        return
+    with rate_lock:
+        now = time.time()
+        slot = max(now, next_slot.value)
+        next_slot.value = slot + interval
+    if slot > now:
+        time.sleep(slot - now)
+
+#工作进程：登录baostock后不断从任务队列领取(code, start, end)下载
+#结果消息格式：('ok', code, fields, rows) / ('error', code, 错误信息, None) / ('done', 进程编号, 登录错误, None)
+#内置函数，无需使用
+def _download_worker(worker_id, task_queue, result_queue, rate_lock, next_slot, interval, adjust_val):
+    lg = bs.login()
+    if lg.error_code != '0':
+        result_queue.put(('done', worker_id, f"登录失败: {lg.error_msg}", None))
+        return
+
+    try:
+        while True:
+            task = task_queue.get()
+            if task is None:
+                break
+            code, start, end = task
+            _wait_rate_slot(rate_lock, next_slot, interval)
+            try:
+                fields, rows = bs_daily_original_rows(code, start, end, adjust_val=adjust_val, already_login=True)
+                result_queue.put(('ok', code, fields, rows))
+            except Exception as e:
+                result_queue.put(('error', code, str(e), None))
+    finally:
+        bs.logout()
+        result_queue.put(('done', worker_id, None, None))
+
+#当前进程内顺序下载，workers为0时使用
+#内置函数，无需使用
+def _download_inline(tasks, handle_result, interval, adjust_val):
+    bs.login()
+    try:
+        for code, start, end in tasks:
+            if interval > 0:
+                time.sleep(interval)
+            try:
+                fields, rows = bs_daily_original_rows(code, start, end, adjust_val=adjust_val, already_login=True)
+                handle_result(code, fields, rows, None)
+            except Exception as e:
+                handle_result(code, None, None, str(e))
+    finally:
+        bs.logout()
+    return len(tasks)
+
+'''
+并行下载函数
+
+输入值：
+tasks:任务列表，每项为(code, start, end)，日期格式为YYYY-MM-DD
+handle_result:结果回调handle_result(code, fields, rows, error)，在主进程中依次调用
+    成功时error为None，失败时fields和rows为None
+workers,rate_limit:可选，默认读取配置
+adjust_val: 2:默认前复权 1:后复权 3:不复权
+
+返回值：已处理（成功或失败）的任务数
+'''
+def parallel_download(tasks, handle_result, workers=None, rate_limit=None, adjust_val='2'):
+    settings = load_download_settings()
+    workers = int(settings["workers"] if workers is None else workers)
+    rate_limit = float(settings["rate_limit"] if rate_limit is None else rate_limit)
+    interval = 1.0 / rate_limit if rate_limit > 0 else 0.0
+
+    tasks = list(tasks)
+    if not tasks:
+        return 0
+
+    if workers <= 0:
+        return _download_inline(tasks, handle_result, interval, adjust_val)
+
+    workers = min(workers, len(tasks))
+    print(f"开始并行下载 {len(tasks)} 只股票，进程数 {workers}，限速 {rate_limit or '不限'} 次/秒")
+
+    # 使用spawn启动工作进程：主进程此时已打开数据库连接和线程，fork会把它们复制到子进程中
+    ctx = mp.get_context('spawn')
+    task_queue = ctx.Queue()
+    # 结果队列设上限，写入跟不上时工作进程会等待，避免内存堆积
+    result_queue = ctx.Queue(maxsize=workers * 8)
+    rate_lock = ctx.Lock()
+    next_slot = ctx.Value('d', 0.0, lock=False)
+
+    for task in tasks:
+        task_queue.put(task)
+    for _ in range(workers):
+        task_queue.put(None)
+
+    processes = []
+    for worker_id in range(workers):
+        process = ctx.Process(target=_download_worker,
+                              args=(worker_id, task_queue, result_queue, rate_lock, next_slot, interval, adjust_val),
+                              daemon=True)
+        process.start()
+        processes.append(process)
+
+    handled = 0
+    finished = 0
+    try:
+        while finished < workers:
+            try:
+                kind, key, payload, rows = result_queue.get(timeout=5)
+            except queue.Empty:
+                # 工作进程异常退出时不再等待
+                if not any(process.is_alive() for process in processes):
+                    print("下载进程已全部退出")
+                    break
+                continue
+
+            if kind == 'done':
+                finished += 1
+                if payload:
+                    print(f"下载进程 {key} {payload}")
+            elif kind == 'ok':
+                handle_result(key, payload, rows, None)
+                handled += 1
+            else:
+                handle_result(key, None, None, payload)
+                handled += 1
+    finally:
+        for process in processes:
+            process.join(timeout=10)
+            if process.is_alive():
+                process.terminate()
+
+    if handled < len(tasks):
+        print(f"警告: 仍有 {len(tasks) - handled} 只股票未下载")
+    return handled
@@ -133,6 +133,9 @@ def bs_daily_stock(code_val,start_val,end_val,adjust_val='2',already_login=False
         bs.logout()
     return df_recon
 
+#baostock日线字段
+BS_DAILY_FIELDS = "date,code,open,high,low,close,preclose,volume,amount,adjustflag,turn,tradestatus,pctChg,isST"
+
 #----------------------------------------------------------------------------
 '''
 基于Baostock的股票日线行情数据获取2
@@ -166,27 +169,50 @@ already_login：是否需要登入，默认需要，在外部代码登入可以
 '''
 
 def bs_daily_original_stock(code_val,start_val,end_val,adjust_val='2',already_login=False):
+    #查询失败时与原先一致，返回空的DataFrame
+    try:
+        fields, data_list = bs_daily_original_rows(code_val,start_val,end_val,adjust_val,already_login)
+    except RuntimeError as e:
+        print(f"获取 {code_val} 日线数据出错: {str(e)}")
+        return pd.DataFrame(columns=BS_DAILY_FIELDS.split(','))
+
+    #合并数据为DataFrame
+    result = pd.DataFrame(data_list, columns=fields)
+    return result
+
+#----------------------------------------------------------------------------
+'''
+基于Baostock的股票日线行情数据获取3
+
+与bs_daily_original_stock字段相同，但不构造DataFrame
+直接返回(字段列表, 原始字符串行列表)，用于批量写入数据库
+'''
+def bs_daily_original_rows(code_val,start_val,end_val,adjust_val='2',already_login=False):
     #### 登陆系统 ####
     if not already_login:
         bs.login()
-    
+
     #获取历史行情数据
     freq_val='d'#日k线
-    fields = "date,code,open,high,low,close,preclose,volume,amount,adjustflag,turn,tradestatus,pctChg,isST"
+    fields = BS_DAILY_FIELDS
     df_bs = bs.query_history_k_data_plus(code_val,fields,start_date=start_val,end_date=end_val,frequency=freq_val, adjustflag=adjust_val)
     #adjustflag 2:默认前复权 1:后复权 3:不复权
 
     data_list=[]
 
-    #合并数据为DataFrame
     while (df_bs.error_code == '0') & df_bs.next():
         data_list.append(df_bs.get_row_data())
-    result = pd.DataFrame(data_list, columns=df_bs.fields)
+
+    #查询失败时抛出异常，由调用方记录
+    if df_bs.error_code != '0':
+        if not already_login:
+            bs.logout()
+        raise RuntimeError(f"baostock查询失败: {df_bs.error_msg}")
 
     #退出系统
     if not already_login:
         bs.logout()
-    return result
+    return fields.split(','), data_list
 
 #----------------------------------------------------------------------------
 '''
@@ -8,6 +8,9 @@ from pytdx.hq import TdxHq_API
 #数据库引用
 from ..SQLbase.SQLite_manage import load_stock_mapping
 
+#服务器健康度排序
+from .tdx_server_health import get_server_health
+
 #----------------------------------------------------------------------------
 '''
 pytdx的获取股票数据的接口
@@ -41,9 +44,13 @@ active1/2：疑似交易所状态代码
 def change_szsh_to_tdx():
     # 加载股票代码-名称映射
     code_name_map = load_stock_mapping()
+    return codes_to_tdx(code_name_map.keys())
+
+#将指定的股票代码（sh./sz.前缀）转换为通达信的获取股票的形式
+def codes_to_tdx(codes):
     # 转换数据结构
     tdx_list = []
-    for full_code in code_name_map.keys():
+    for full_code in codes:
         # 分割市场代码和股票代码
         exchange, code = full_code.split('.')
 
@@ -57,6 +64,11 @@ def change_szsh_to_tdx():
 
     return tdx_list
 
+#去除接口返回的无意义的值
+def drop_useless_columns(df):
+    cols_to_drop = [f'reversed_bytes{i}' for i in range(10)] + ['active1', 'active2']
+    return df.drop(columns=cols_to_drop, errors='ignore')
+
 def api_disconnect(api):
     api.disconnect()
     return None
@@ -65,16 +77,8 @@ def api_disconnect(api):
 def connect_tdx():
     #加载通达信连接服务器
     api = TdxHq_API(heartbeat=True)
-    #ip可以参考pytdx的各个服务器地址，多次尝试可用的
-    #这里给出若干可用的ip作备用
-    ips = [
-        ('218.6.170.47', 7709),  # 上证云成都电信一
-        ('123.125.108.14', 7709),  # 上证云北京联通一
-        ('180.153.18.170', 7709),  # 上海电信主站Z1
-        ('180.153.18.172', 80),  # 上海电信主站Z80
-        ('202.108.253.139', 80),  # 北京联通主站Z80
-        ('60.191.117.167', 7709),  # 杭州电信主站J1
-    ]
+    #按延迟和出错率排序，优先连接最快的可用服务器
+    ips = get_server_health().ranked_servers()
 
     #尝试连接
     for ip, port in ips:
@@ -89,6 +93,17 @@ def connect_tdx():
 
 
 def pytdx_nowdata_stock(api=None,verbose=False):  # 添加verbose参数控制输出
+    # 获取全市场股票
+    return pytdx_quotes_stock(change_szsh_to_tdx(), api=api, verbose=verbose)
+
+#只获取指定股票的实时数据
+#codes:股票代码列表，sh.或sz.加6位代码
+def pytdx_nowdata_for_codes(codes, api=None, verbose=False):
+    return pytdx_quotes_stock(codes_to_tdx(codes), api=api, verbose=verbose)
+
+#按通达信格式的股票列表分批获取实时数据
+#tdx_list:[(market, code), ...]
+def pytdx_quotes_stock(tdx_list, api=None, verbose=False):
 
     disconnect_needed = False
 
@@ -100,7 +115,13 @@ def pytdx_nowdata_stock(api=None,verbose=False):  # 添加verbose参数控制输
             return pd.DataFrame()
         disconnect_needed = True  # 标记需要断开连接
 
-    tdx_list = change_szsh_to_tdx()
+    # 连接池：多个服务器连接并行获取
+    if hasattr(api, 'get_quotes_df'):
+        final_df = api.get_quotes_df(tdx_list, verbose=verbose)
+        if disconnect_needed:
+            api_disconnect(api)
+        return final_df
+
     batch_size = 80
     all_data = []
     total_stocks = len(tdx_list)
@@ -174,8 +195,7 @@ def pytdx_nowdata_stock(api=None,verbose=False):  # 添加verbose参数控制输
         if verbose:  # 控制最终统计输出
             print(f"成功获取 {len(final_df)} 条股票数据")
 
-        cols_to_drop = [f'reversed_bytes{i}' for i in range(10)] + ['active1', 'active2']
-        final_df = final_df.drop(columns=cols_to_drop, errors='ignore')
+        final_df = drop_useless_columns(final_df)
         return final_df
     else:
         if verbose:  # 控制空数据提示
@@ -0,0 +1,267 @@
+#pytdx多服务器连接池
+#同时保持多个到不同服务器的连接，把全市场行情按批次分发到各连接并行获取
+#某个连接出错时自动重连其他服务器，未完成的批次由其他连接接手
+#服务器按tdx_server_health的排序选择，出错和成功都会记录到健康度中
+
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+#接口
+from pytdx.hq import TdxHq_API
+
+from .stock_get_tdx import drop_useless_columns
+from .tdx_server_health import get_server_health
+
+
+class TdxQuotePool:
+    """
+    参数:
+    size -- 同时保持的连接数（每个连接对应不同的服务器）
+    servers -- 候选服务器列表[(ip, port), ...]，默认按健康度排序的全部服务器
+    batch_size -- 每次请求的股票数量，通达信单次上限约80只
+    time_out -- 连接超时（秒）
+    max_retries -- 单个批次因连接出错最多重试的次数
+    """
+
+    def __init__(self, size=4, servers=None, batch_size=80, time_out=1.5, max_retries=2):
+        self.size = size
+        self.health = get_server_health()
+        self.servers = list(servers) if servers is not None else self.health.ranked_servers()
+        self.batch_size = batch_size
+        self.time_out = time_out
+        self.max_retries = max_retries
+
+        # 每项为[api, (ip, port)]，api为None表示该连接已失效
+        self.connections = []
+        self._lock = threading.Lock()
+        # 正在重连、尚未连上的服务器
+        self._reserved = set()
+        # 上次按健康度调整连接时的探测版本
+        self._health_version = None
+        # 最近一次获取行情时未取到的股票代码
+        self.last_missing_codes = []
+
+    def __len__(self):
+        return sum(1 for api, _ in self.connections if api is not None)
+
+    #尝试连接单个服务器，失败返回None
+    def _try_connect(self, server):
+        ip, port = server
+        api = TdxHq_API(heartbeat=True, raise_exception=True)
+        try:
+            api.connect(ip, port, time_out=self.time_out)
+            return api
+        except Exception as e:
+            print(f"连接失败 {ip}:{port} - {str(e)}")
+            self.health.record_error(server)
+            return None
+
+    #并行连接排序最靠前的size个服务器，连接失败的位置再按顺序逐个尝试后面的服务器
+    def connect(self):
+        if not self.servers:
+            return None
+
+        first = self.servers[:self.size]
+        with ThreadPoolExecutor(max_workers=len(first)) as executor:
+            apis = list(executor.map(self._try_connect, first))
+        self.connections = [[api, server] for api, server in zip(apis, first) if api is not None]
+
+        for server in self.servers[self.size:]:
+            if len(self.connections) >= self.size:
+                break
+            api = self._try_connect(server)
+            if api is not None:
+                self.connections.append([api, server])
+
+        if not self.connections:
+            print("所有服务器连接失败，请检查网络")
+            return None
+        for _, server in self.connections:
+            print(f"成功连接到服务器: {server[0]}:{server[1]}")
+        self._health_version = self.health.version
+        return self
+
+    #重连指定位置的连接，优先选择未被其他连接占用的服务器
+    #候选服务器在锁内预留后再连接，多个连接同时出错时不会选到同一个服务器
+    def _reconnect(self, slot):
+        old_api, old_server = self.connections[slot]
+        if old_api is not None:
+            try:
+                old_api.disconnect()
+            except Exception:
+                pass
+        self.connections[slot] = [None, old_server]
+
+        # 按最新的健康度排序，优先切换到最快的可用服务器
+        ranked = self.health.ranked_servers()
+        ranked += [s for s in self.servers if s not in ranked]
+        candidates = [s for s in ranked if s != old_server] + [old_server]
+
+        for server in candidates:
+            with self._lock:
+                taken = self._reserved | {s for api, s in self.connections if api is not None}
+                if server in taken:
+                    continue
+                self._reserved.add(server)
+
+            api = self._try_connect(server)
+            with self._lock:
+                self._reserved.discard(server)
+                if api is not None:
+                    self.connections[slot] = [api, server]
+
+            if api is not None:
+                print(f"连接 {slot} 已切换到服务器: {server[0]}:{server[1]}")
+                return api
+        return None
+
+    #按最新的健康度排序调整连接：不在前size个可用服务器中的连接，切换到未被占用的更快服务器
+    #健康度每次重新探测后，在下一次获取行情前调用（此时没有取行情的线程在运行）
+    def rebalance(self):
+        self._health_version = self.health.version
+        best = [server for server in self.health.ranked_servers() if self.health.is_healthy(server)][:self.size]
+        in_use = {server for api, server in self.connections if api is not None}
+
+        for slot, (api, server) in enumerate(self.connections):
+            if api is not None and server in best:
+                continue
+            candidates = [candidate for candidate in best if candidate not in in_use]
+            if not candidates:
+                break
+            new_api = self._try_connect(candidates[0])
+            if new_api is None:
+                best.remove(candidates[0])
+                continue
+            if api is not None:
+                try:
+                    api.disconnect()
+                except Exception:
+                    pass
+            in_use.discard(server)
+            in_use.add(candidates[0])
+            self.connections[slot] = [new_api, candidates[0]]
+            print(f"连接 {slot} 已切换到更快的服务器: {candidates[0][0]}:{candidates[0][1]}")
+        return None
+
+    #批量返回空数据时逐个获取
+    @staticmethod
+    def _get_single_quotes(api, batch):
+        data = []
+        for market, code in batch:
+            try:
+                single_result = api.get_security_quotes([(market, code)])
+                if single_result:
+                    data.append(api.to_df(single_result))
+            except Exception:
+                continue
+        return data
+
+    #单个连接不断从任务队列领取批次，直到队列为空或连接无法恢复
+    def _drain(self, slot, work, results, failed):
+        while True:
+            try:
+                batch_idx, batch, tries = work.get_nowait()
+            except queue.Empty:
+                return
+
+            api = self.connections[slot][0]
+            if api is None:
+                api = self._reconnect(slot)
+                if api is None:
+                    work.put((batch_idx, batch, tries))
+                    return
+
+            try:
+                result = api.get_security_quotes(batch)
+            except Exception as e:
+                server = self.connections[slot][1]
+                print(f"服务器 {server[0]}:{server[1]} 获取批次 {batch_idx + 1} 出错: {str(e)}")
+                self.health.record_error(server)
+                if tries < self.max_retries:
+                    work.put((batch_idx, batch, tries + 1))
+                else:
+                    failed.append(batch_idx)
+                if self._reconnect(slot) is None:
+                    return
+                continue
+
+            self.health.record_success(self.connections[slot][1])
+            if result:
+                results[batch_idx] = [api.to_df(result)]
+            else:
+                results[batch_idx] = self._get_single_quotes(api, batch)
+
+    #并行获取行情，返回合并后的DataFrame
+    #tdx_list:[(market, code), ...]
+    def get_quotes_df(self, tdx_list, verbose=False):
+        if self.health.version != self._health_version:
+            self.rebalance()
+
+        batches = [tdx_list[i:i + self.batch_size] for i in range(0, len(tdx_list), self.batch_size)]
+
+        work = queue.Queue()
+        for batch_idx, batch in enumerate(batches):
+            work.put((batch_idx, batch, 0))
+
+        results = {}
+        failed = []
+
+        # 连接失效的线程会提前退出，剩余批次再分给仍可用的连接
+        rounds = 0
+        while not work.empty() and rounds <= self.max_retries and self.connections:
+            with ThreadPoolExecutor(max_workers=len(self.connections)) as executor:
+                list(executor.map(lambda slot: self._drain(slot, work, results, failed),
+                                  range(len(self.connections))))
+            rounds += 1
+
+        if verbose:
+            print(f"共 {len(batches)} 个批次，使用 {len(self)} 个连接，失败 {len(failed) + work.qsize()} 个批次")
+
+        all_data = [df for batch_idx in sorted(results) for df in results[batch_idx]]
+        final_df = pd.concat(all_data, ignore_index=True) if all_data else pd.DataFrame()
+
+        # 未取到行情的股票总会提示，并记录在final_df.attrs['missing_codes']，调用方可据此判断快照是否完整
+        missing = self._missing_codes(tdx_list, final_df)
+        self.last_missing_codes = missing
+        if missing:
+            print(f"警告: {len(missing)} 只股票未获取到行情: "
+                  f"{', '.join(missing[:5])}{'...' if len(missing) > 5 else ''}")
+
+        if final_df.empty:
+            final_df.attrs['missing_codes'] = missing
+            return final_df
+
+        if verbose:
+            print(f"成功获取 {len(final_df)} 条股票数据")
+        final_df = drop_useless_columns(final_df)
+        final_df.attrs['missing_codes'] = missing
+        return final_df
+
+    #请求了但未返回的股票代码（sh./sz.前缀）
+    @staticmethod
+    def _missing_codes(tdx_list, df):
+        returned = set()
+        if not df.empty:
+            returned = set(zip(df['market'].astype(int), df['code'].astype(str).str.zfill(6)))
+        return [f"{'sh' if market == 1 else 'sz'}.{code}" for market, code in tdx_list
+                if (int(market), str(code).zfill(6)) not in returned]
+
+    #与TdxHq_API保持一致的断开接口
+    def disconnect(self):
+        for api, _ in self.connections:
+            if api is not None:
+                try:
+                    api.disconnect()
+                except Exception:
+                    pass
+        self.connections = []
+        return None
+
+
+#创建并连接连接池，全部连接失败时返回None
+def connect_tdx_pool(size=4):
+    pool = TdxQuotePool(size=size)
+    return pool.connect()
@@ -0,0 +1,206 @@
+#通达信服务器健康度管理
+#启动时并行探测全部候选服务器，按往返延迟和近期出错率排序
+#排序结果保存在data/config/tdx_servers.json，下次启动时先使用上次的排序
+#后台线程定时重新探测，取行情出错时记录错误，连接与切换服务器时始终优先最快的可用服务器
+
+import os
+import json
+import time
+import threading
+from collections import deque
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+#接口
+from pytdx.hq import TdxHq_API
+
+#ip可以参考pytdx的各个服务器地址，多次尝试可用的
+#这里给出若干可用的ip作备用
+TDX_SERVERS = [
+    ('218.6.170.47', 7709),  # 上证云成都电信一
+    ('123.125.108.14', 7709),  # 上证云北京联通一
+    ('180.153.18.170', 7709),  # 上海电信主站Z1
+    ('180.153.18.172', 80),  # 上海电信主站Z80
+    ('202.108.253.139', 80),  # 北京联通主站Z80
+    ('60.191.117.167', 7709),  # 杭州电信主站J1
+]
+
+#获取配置路径
+#内置函数，无需使用
+def get_config_dir():
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    config_dir = os.path.join(base_dir, '../../data/config')
+    os.makedirs(config_dir, exist_ok=True)  # 确保目录存在
+    return config_dir
+
+#探测单个服务器：连接并请求一次股票数量，返回耗时（秒），失败返回None
+def probe_server(server, time_out=1.5):
+    ip, port = server
+    api = TdxHq_API(raise_exception=True)
+    try:
+        start_time = time.perf_counter()
+        api.connect(ip, port, time_out=time_out)
+        api.get_security_count(0)
+        return time.perf_counter() - start_time
+    except Exception:
+        return None
+    finally:
+        try:
+            api.disconnect()
+        except Exception:
+            pass
+
+
+class TdxServerHealth:
+    """
+    参数:
+    servers -- 候选服务器列表[(ip, port), ...]，默认使用TDX_SERVERS
+    window -- 计算出错率时参考的最近事件数
+    time_out -- 探测超时（秒）
+    """
+
+    def __init__(self, servers=None, window=20, time_out=1.5):
+        self.servers = list(servers) if servers is not None else list(TDX_SERVERS)
+        self.window = window
+        self.time_out = time_out
+
+        # 每个服务器的延迟（秒，None为不可用）与最近事件（True为出错）
+        self.rtt = {server: None for server in self.servers}
+        self.events = {server: deque(maxlen=window) for server in self.servers}
+        self.probed = False
+        # 每次探测后加1，连接池据此判断是否需要按新的排序调整连接
+        self.version = 0
+
+        # 可重入锁：排序时会在持锁状态下计算出错率
+        self._lock = threading.RLock()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+        self.file_path = os.path.join(get_config_dir(), 'tdx_servers.json')
+        self.load()
+
+    #近期出错率
+    #取行情的线程会同时追加事件，读取时持锁
+    def error_rate(self, server):
+        with self._lock:
+            events = self.events.get(server)
+            if not events:
+                return 0.0
+            return sum(events) / len(events)
+
+    #延迟已知且出错率低于一半视为可用
+    def is_healthy(self, server):
+        with self._lock:
+            return self.rtt.get(server) is not None and self.error_rate(server) < 0.5
+
+    #按健康度排序：可用的在前，再按延迟乘以出错惩罚升序
+    def ranked_servers(self):
+        if not self.probed:
+            self.probe_all()
+
+        def score(server):
+            rtt = self.rtt.get(server)
+            if rtt is None:
+                return (1, float('inf'))
+            return (0 if self.is_healthy(server) else 1, rtt * (1 + 4 * self.error_rate(server)))
+
+        with self._lock:
+            return sorted(self.servers, key=score)
+
+    #并行探测全部服务器，更新延迟并保存排序
+    def probe_all(self):
+        with ThreadPoolExecutor(max_workers=len(self.servers)) as executor:
+            rtts = list(executor.map(lambda server: probe_server(server, self.time_out), self.servers))
+
+        with self._lock:
+            for server, rtt in zip(self.servers, rtts):
+                self.rtt[server] = rtt
+                self.events[server].append(rtt is None)
+            self.probed = True
+            self.version += 1
+
+        self.save()
+        return None
+
+    #取行情成功/出错时调用，更新近期出错率
+    def record_success(self, server):
+        with self._lock:
+            if server in self.events:
+                self.events[server].append(False)
+
+    def record_error(self, server):
+        with self._lock:
+            if server in self.events:
+                self.events[server].append(True)
+
+    #保存排序结果到data/config/tdx_servers.json
+    def save(self):
+        # 在锁内生成快照，避免与记录事件的线程同时读写
+        with self._lock:
+            data = {
+                "updated": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                "servers": [
+                    {"ip": ip, "port": port, "rtt": self.rtt.get((ip, port)),
+                     "error_rate": round(self.error_rate((ip, port)), 3)}
+                    for ip, port in self.ranked_servers()
+                ]
+            }
+        try:
+            with open(self.file_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False, indent=4)
+        except OSError as e:
+            print(f"保存服务器排序出错: {str(e)}")
+
+    #读取上次保存的排序，上次的延迟作为初始值
+    def load(self):
+        if not os.path.exists(self.file_path):
+            return None
+        try:
+            with open(self.file_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"读取服务器排序出错: {str(e)}")
+            return None
+
+        order = []
+        for item in data.get("servers", []):
+            server = (item["ip"], item["port"])
+            if server in self.rtt:
+                self.rtt[server] = item.get("rtt")
+                order.append(server)
+        # 保持上次的排序，新增的候选服务器排在最后
+        self.servers = order + [server for server in self.servers if server not in order]
+        return None
+
+    #后台定时重新探测
+    def start_background(self, interval=300):
+        if self._thread is not None and self._thread.is_alive():
+            return None
+
+        def run():
+            while not self._stop_event.wait(interval):
+                try:
+                    self.probe_all()
+                except Exception as e:
+                    print(f"服务器探测出错: {str(e)}")
+
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=run, daemon=True)
+        self._thread.start()
+        return None
+
+    def stop_background(self):
+        self._stop_event.set()
+        return None
+
+
+_server_health = None
+_server_health_lock = threading.Lock()
+
+#全局共享的服务器健康度对象
+def get_server_health():
+    global _server_health
+    with _server_health_lock:
+        if _server_health is None:
+            _server_health = TdxServerHealth()
+    return _server_health
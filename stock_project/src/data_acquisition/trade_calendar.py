@@ -0,0 +1,178 @@
+#交易日历
+#每个年份只用chinese_calendar计算一次全年交易日（工作日且非周末），保存在data/config/trade_calendar.json
+#之后所有查询都在排好序的日期数组上二分查找，不再逐日调用日历判断
+
+import os
+import json
+import threading
+from datetime import date, datetime, timedelta
+
+import numpy as np
+
+#交易日判断
+from chinese_calendar import is_workday
+
+
+#获取配置路径
+#内置函数，无需使用
+def get_config_dir():
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    config_dir = os.path.join(base_dir, '../../data/config')
+    os.makedirs(config_dir, exist_ok=True)  # 确保目录存在
+    return config_dir
+
+#统一转换为numpy日期，支持date、datetime和YYYY-MM-DD字符串
+def to_day(value):
+    if isinstance(value, datetime):
+        value = value.date()
+    return np.datetime64(value, 'D')
+
+#计算某一年的全部交易日
+#chinese_calendar不支持的年份只剔除周末，返回(日期列表, 是否完整)
+def compute_year_trade_days(year):
+    days = []
+    complete = True
+    current = date(year, 1, 1)
+    while current.year == year:
+        if current.isoweekday() < 6:
+            try:
+                if is_workday(current):
+                    days.append(current.strftime("%Y-%m-%d"))
+            except NotImplementedError:
+                complete = False
+                days.append(current.strftime("%Y-%m-%d"))
+        current += timedelta(days=1)
+    return days, complete
+
+
+class TradeCalendar:
+    """
+    参数:
+    file_path -- 缓存文件路径，默认data/config/trade_calendar.json
+    """
+
+    def __init__(self, file_path=None):
+        self.file_path = file_path or os.path.join(get_config_dir(), 'trade_calendar.json')
+        self.days = np.array([], dtype='datetime64[D]')
+        self.years = set()
+        # chinese_calendar不支持、只剔除了周末的年份，不写入缓存
+        self.approximate_years = set()
+        self._lock = threading.Lock()
+
+        # 磁盘缓存：{年份: [YYYY-MM-DD, ...]}，只保存完整的年份
+        self._saved = {}
+        if os.path.exists(self.file_path):
+            try:
+                with open(self.file_path, 'r', encoding='utf-8') as f:
+                    self._saved = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"读取交易日历出错: {str(e)}")
+
+    #确保覆盖first_year到last_year的交易日已加载
+    def _ensure_years(self, first_year, last_year):
+        missing = [year for year in range(first_year, last_year + 1) if year not in self.years]
+        if not missing:
+            return None
+
+        with self._lock:
+            new_days = []
+            changed = False
+            approximate = []
+            for year in missing:
+                if year in self.years:
+                    continue
+                days = self._saved.get(str(year))
+                if days is None:
+                    days, complete = compute_year_trade_days(year)
+                    if complete:
+                        self._saved[str(year)] = days
+                        changed = True
+                    else:
+                        approximate.append(year)
+                new_days.extend(days)
+                self.years.add(year)
+
+            self.days = np.unique(np.concatenate([self.days, np.array(new_days, dtype='datetime64[D]')]))
+            if changed:
+                self._save()
+            if approximate:
+                self.approximate_years.update(approximate)
+                years_text = str(approximate[0]) if len(approximate) == 1 else f"{approximate[0]}-{approximate[-1]}"
+                print(f"警告: chinese_calendar不支持{years_text}年，按周一至周五计算交易日，未剔除节假日")
+        return None
+
+    def _save(self):
+        try:
+            with open(self.file_path, 'w', encoding='utf-8') as f:
+                json.dump(self._saved, f, ensure_ascii=False)
+        except OSError as e:
+            print(f"保存交易日历出错: {str(e)}")
+
+    #加载某日期所在年份及前后各一年，保证跨年查询不越界
+    def _prepare(self, day):
+        year = day.astype(object).year
+        self._ensure_years(year - 1, year + 1)
+
+    #numpy日期转换为date
+    @staticmethod
+    def _to_date(day):
+        return day.astype(object)
+
+    #按下标取交易日，超出已加载范围时报错，避免负下标从数组末尾取值
+    def _day_at(self, index):
+        if index < 0 or index >= len(self.days):
+            raise IndexError("超出交易日历范围")
+        return self._to_date(self.days[index])
+
+    def is_trade_day(self, value):
+        day = to_day(value)
+        self._prepare(day)
+        index = np.searchsorted(self.days, day)
+        return bool(index < len(self.days) and self.days[index] == day)
+
+    #之后的第一个交易日（不含当日）
+    def next_trade_day(self, value):
+        day = to_day(value)
+        self._prepare(day)
+        return self._day_at(np.searchsorted(self.days, day, side='right'))
+
+    #之前的第一个交易日（不含当日）
+    def prev_trade_day(self, value):
+        day = to_day(value)
+        self._prepare(day)
+        return self._day_at(np.searchsorted(self.days, day, side='left') - 1)
+
+    #当日为交易日时返回当日，否则返回之前的第一个交易日
+    def latest_trade_day(self, value=None):
+        day = to_day(value if value is not None else date.today())
+        self._prepare(day)
+        return self._day_at(np.searchsorted(self.days, day, side='right') - 1)
+
+    #start到end之间（含两端）的全部交易日，返回date列表
+    def trade_days_between(self, start, end):
+        start_day, end_day = to_day(start), to_day(end)
+        self._ensure_years(start_day.astype(object).year - 1, end_day.astype(object).year + 1)
+        left = np.searchsorted(self.days, start_day, side='left')
+        right = np.searchsorted(self.days, end_day, side='right')
+        return self.days[left:right].astype(object).tolist()
+
+    #value之前第n个交易日，n为0时即latest_trade_day
+    def trade_days_ago(self, n, value=None):
+        day = to_day(value if value is not None else date.today())
+        # 按每年约240个交易日预先加载足够的年份
+        year = day.astype(object).year
+        self._ensure_years(year - n // 240 - 2, year + 1)
+        index = np.searchsorted(self.days, day, side='right') - 1 - n
+        return self._day_at(index)
+
+
+_trade_calendar = None
+_trade_calendar_lock = threading.Lock()
+
+#全局共享的交易日历对象
+def get_trade_calendar():
+    global _trade_calendar
+    with _trade_calendar_lock:
+        if _trade_calendar is None:
+            _trade_calendar = TradeCalendar()
+    return _trade_calendar
@@ -0,0 +1,465 @@
+#DTZS多头择时策略回测
+#把STOCK000001读取为按字段的二维数组（交易日 × 股票），一次计算全部交易日的初筛与二筛信号，
+#再逐日模拟买卖（T+1、整手、手续费），输出成交记录与资金曲线
+
+"""
+与实盘的对应关系：
+    实盘的“当前价格”对应回测当日的收盘价，信号在收盘时产生
+    默认次一交易日开盘价成交（execution='next_open'），也可设为当日收盘价成交（execution='close'）
+    均线、阳包阴、阴包阳、回撤都按每只股票自身的交易日序列计算（停牌日不计入），与实盘一致
+    流通市值使用前一交易日的数据，ST使用当日的isST标记，新股按数据中的首个交易日计算上市时间
+    当日可开仓数量不足时，按股票代码顺序买入
+    未模拟涨跌停无法成交的情况
+"""
+
+import os
+import json
+
+import numpy as np
+import pandas as pd
+
+#数据库
+from ..SQLbase.SQLite_manage import (
+    query_many_stocks,
+    query_stock_codes
+)
+
+#分仓策略
+from ...stock_strategy.DTZS_strategy import stock_position_sizing
+
+#与实盘共用的形态判断
+from ...technocal_indicators.get_bullish_bearish import (
+    bullish_cover_bearish_mask,
+    bearish_cover_bullish_mask
+)
+from ...technocal_indicators.profit_pulled_back import pulled_back_mask
+from ...technocal_indicators.stock_universe import get_board
+
+# 回测读取的字段
+MARKET_FIELDS = ('open', 'high', 'low', 'close', 'volume', 'turn', 'isST')
+
+# 回测参数，默认值与DTZS_strategy中的实盘参数一致
+DEFAULT_BACKTEST_PARAMS = {
+    # 初筛
+    "exclude_gem": True,  # 剔除创业板
+    "exclude_star_market": True,  # 剔除科创板
+    "exclude_st": True,  # 剔除ST股
+    "exclude_new_stock": True,  # 剔除新股
+    "exclude_market_value": True,  # 市值筛选
+    "ipo_months": 4,  # 上市不足几个月视为新股
+    "max_market_cap": 5e10,  # 流通市值上限（元）
+    # 二筛（买入）
+    "sma_periods": (5, 10, 20, 60),  # 均线多头排列的周期，股价需高于第一条均线
+    "max_search_days": 5,  # 阳包阴/阴包阳向前搜索的天数
+    # 卖出
+    "pullback_lookback": 3,  # 回撤参考最近几日的最高收盘价
+    "pulled_back": 0.1,  # 回撤比例阈值
+    # 仓位与成交
+    "initial_capital": 1e6,  # 初始资金
+    "min_position_size": 10000,  # 最小分仓金额
+    "max_positions": 80,  # 最大开仓数量
+    "lot_size": 100,  # 每手股数
+    "commission_rate": 0.00025,  # 佣金费率（买卖双向）
+    "min_commission": 5.0,  # 最低佣金
+    "stamp_tax": 0.0005,  # 印花税（卖出）
+    "execution": "next_open",  # 成交价格：next_open次日开盘价，close当日收盘价
+}
+
+
+#合并默认参数并检查取值，参数不合法时抛出ValueError
+def parse_params(params=None):
+    params = {**DEFAULT_BACKTEST_PARAMS, **(params or {})}
+    sma_periods = tuple(params["sma_periods"])
+    if len(sma_periods) < 2:
+        raise ValueError("sma_periods至少需要2个周期：第一条用于买入和阴包阳卖出，第二条用于跌破卖出")
+    if any(int(period) < 1 for period in sma_periods):
+        raise ValueError("sma_periods的周期必须为正整数")
+    if params["execution"] not in ("next_open", "close"):
+        raise ValueError("execution只能为'next_open'或'close'")
+    params["sma_periods"] = sma_periods
+    return params
+
+
+class MarketArrays:
+    """
+    参数:
+    dates -- 交易日数组（datetime64[D]）
+    codes -- 股票代码数组
+    fields -- 字典，键为字段名，值为(交易日 × 股票)的float32数组，停牌或无数据为NaN
+    """
+
+    def __init__(self, dates, codes, fields):
+        self.dates = np.asarray(dates, dtype='datetime64[D]')
+        self.codes = np.asarray(codes, dtype=str)
+        self.fields = fields
+
+    #由长表（code、date及各字段）向量化构建
+    @classmethod
+    def from_frame(cls, data, codes=None):
+        if codes is None:
+            codes = np.unique(data['code'].to_numpy(dtype=str))
+        dates, date_index = np.unique(data['date'].to_numpy(dtype=str).astype('datetime64[D]'),
+                                      return_inverse=True)
+        code_index = pd.Index(codes).get_indexer(data['code'])
+        keep = code_index >= 0
+
+        fields = {}
+        for field in MARKET_FIELDS:
+            values = np.full((len(dates), len(codes)), np.nan, dtype=np.float32)
+            values[date_index[keep], code_index[keep]] = data[field].to_numpy(dtype=np.float32)[keep]
+            fields[field] = values
+        return cls(dates, codes, fields)
+
+    #从数据库读取，只读取正常交易的数据（停牌日为NaN）
+    @classmethod
+    def from_db(cls, table_name='STOCK000001', start=None, end=None, codes=None):
+        if codes is None:
+            codes = query_stock_codes(table_name)
+        data = query_many_stocks(table_name, list(codes), start=start, end=end,
+                                 columns=list(MARKET_FIELDS), trading_only=True)
+        if isinstance(data, str):
+            print(data)
+            return None
+        return cls.from_frame(data, codes)
+
+    #保存为.npy文件，之后可用load按内存映射方式读取
+    #meta:附加信息（如读取的表名、日期范围），与字段列表一起保存在fields.json
+    def save(self, directory, **meta):
+        os.makedirs(directory, exist_ok=True)
+        np.save(os.path.join(directory, 'dates.npy'), self.dates)
+        np.save(os.path.join(directory, 'codes.npy'), self.codes)
+        for field, values in self.fields.items():
+            np.save(os.path.join(directory, f'{field}.npy'), values)
+        with open(os.path.join(directory, 'fields.json'), 'w', encoding='utf-8') as f:
+            json.dump({'fields': list(self.fields.keys()), **meta}, f, ensure_ascii=False)
+        return directory
+
+    #读取fields.json，旧版只保存了字段列表
+    @staticmethod
+    def read_meta(directory):
+        with open(os.path.join(directory, 'fields.json'), 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        if isinstance(meta, list):
+            meta = {'fields': meta}
+        return meta
+
+    #mmap_mode为'r'时以只读内存映射方式读取，多个进程共享同一份数据
+    @classmethod
+    def load(cls, directory, mmap_mode=None):
+        field_names = cls.read_meta(directory)['fields']
+        fields = {field: np.load(os.path.join(directory, f'{field}.npy'), mmap_mode=mmap_mode)
+                  for field in field_names}
+        return cls(np.load(os.path.join(directory, 'dates.npy')),
+                   np.load(os.path.join(directory, 'codes.npy')), fields)
+
+    def __getitem__(self, field):
+        return self.fields[field]
+
+    @property
+    def shape(self):
+        return len(self.dates), len(self.codes)
+
+
+class TradingAxis:
+    """
+    每只股票自身的交易日序列
+    把每列的有效数据按时间顺序移到数组顶部（压缩），第r行即该股票的第r个交易日，
+    在压缩数组上按行平移即为“前n个交易日”，计算完成后再展开回原日期
+    """
+
+    def __init__(self, valid):
+        days = valid.shape[0]
+        self.valid = valid
+        self.order = np.argsort(~valid, axis=0, kind='stable')
+        self.rank = np.cumsum(valid, axis=0) - 1
+        self.filled = np.arange(days)[:, None] < valid.sum(axis=0)[None, :]
+
+    def compress(self, values):
+        result = np.take_along_axis(np.asarray(values), self.order, axis=0)
+        if result.dtype == bool:
+            return result & self.filled
+        result = result.astype(np.float64)
+        result[~self.filled] = np.nan
+        return result
+
+    def expand(self, values):
+        result = np.take_along_axis(values, np.maximum(self.rank, 0), axis=0)
+        if result.dtype == bool:
+            return result & self.valid
+        result = result.astype(np.float64)
+        result[~self.valid] = np.nan
+        return result
+
+    #按行向下平移k行（即前k个交易日的值），顶部填充fill
+    @staticmethod
+    def shift(values, k, fill=np.nan):
+        result = np.empty_like(values)
+        result[:k] = fill
+        result[k:] = values[:-k] if k else values
+        return result
+
+
+#压缩数组上的简单移动平均，数据不足周期长度时使用全部可用数据（与SMAEngine.compute一致）
+def compressed_sma(close, period):
+    days = close.shape[0]
+    cumulative = np.zeros((days + 1, close.shape[1]))
+    np.cumsum(np.nan_to_num(close, nan=0.0), axis=0, out=cumulative[1:])
+    rows = np.arange(days)
+    start = np.maximum(rows + 1 - period, 0)
+    return (cumulative[rows + 1] - cumulative[start]) / (rows + 1 - start)[:, None]
+
+
+#把前window个交易日的值拼成窗口，最后一列为前一个交易日（与KlineStore的列顺序相同）
+#只取压缩数组中[start, stop)的行，返回(行数 × 股票, window)的数组
+def _history_window(values, window, start, stop, fill=np.nan):
+    result = np.full((stop - start, values.shape[1], window), fill, dtype=values.dtype)
+    for k in range(1, window + 1):
+        first = max(start - k, 0)
+        if stop - k <= first:
+            continue
+        result[first + k - start:, :, window - k] = values[first:stop - k]
+    return result.reshape(-1, window)
+
+
+def compute_signals(market, params=None, chunk_days=250):
+    """
+    一次计算全部交易日的买入、卖出信号
+
+    返回:
+        (buy_signal, sell_signal)，均为(交易日 × 股票)的布尔数组
+    """
+    params = parse_params(params)
+    days, stocks = market.shape
+
+    open_price = market['open']
+    close_price = market['close']
+    valid = ~np.isnan(close_price) & ~np.isnan(open_price)
+    axis = TradingAxis(valid)
+
+    close = axis.compress(close_price)
+    open_ = axis.compress(open_price)
+    high = axis.compress(market['high'])
+    low = axis.compress(market['low'])
+    status = np.sign(np.nan_to_num(close - open_, nan=0.0)).astype(np.int8)
+
+    # ------------------------------------------------------------------
+    # 初筛（按日期）
+    universe = np.ones((days, stocks), dtype=bool)
+    board = get_board(market.codes)
+    if params["exclude_gem"]:
+        universe &= (board != '创业板')[None, :]
+    if params["exclude_star_market"]:
+        universe &= (board != '科创板')[None, :]
+    if params["exclude_st"]:
+        universe &= ~(market['isST'] == 1)
+    if params["exclude_new_stock"]:
+        # 数据中首个交易日晚于回测起始日的股票视为期间上市
+        first_day = market.dates[np.argmax(valid, axis=0)]
+        listed_in_range = valid.any(axis=0) & (first_day > market.dates[0])
+        days_listed = (market.dates[:, None] - first_day[None, :]).astype(np.int64)
+        universe &= ~(listed_in_range[None, :] & (days_listed < 30 * params["ipo_months"]))
+    if params["exclude_market_value"]:
+        # 前一交易日的流通市值 = 成交量 / (换手率/100) × 收盘价，换手率为0时无法计算
+        turn = axis.compress(market['turn'])
+        with np.errstate(invalid='ignore', divide='ignore'):
+            market_cap = axis.compress(market['volume']) / (np.where(turn == 0, np.nan, turn) / 100) * close
+        universe &= axis.expand(TradingAxis.shift(market_cap, 1) < params["max_market_cap"])
+
+    # ------------------------------------------------------------------
+    # 二筛与卖出条件（按每只股票的交易日序列）
+    sma_periods = params["sma_periods"]
+    sma = {period: compressed_sma(close, period) for period in set(sma_periods)}
+    short_sma, mid_sma = sma[sma_periods[0]], sma[sma_periods[1]]
+
+    buy = close > short_sma
+    for fast, slow in zip(sma_periods[:-1], sma_periods[1:]):
+        buy &= sma[fast] > sma[slow]
+
+    bullish = np.zeros((days, stocks), dtype=bool)
+    bearish = np.zeros((days, stocks), dtype=bool)
+    pulled_back = np.zeros((days, stocks), dtype=bool)
+    search_days = params["max_search_days"]
+    lookback = params["pullback_lookback"]
+    for start in range(0, days, chunk_days):
+        stop = min(start + chunk_days, days)
+        rows = slice(start, stop)
+        current = close[rows].ravel()
+        today_open = open_[rows].ravel()
+        status_window = _history_window(status, search_days, start, stop, fill=0)
+
+        bullish[rows] = bullish_cover_bearish_mask(
+            current, today_open, _history_window(high, search_days, start, stop), status_window,
+            search_days).reshape(-1, stocks)
+        bearish[rows] = bearish_cover_bullish_mask(
+            current, today_open, _history_window(low, search_days, start, stop), status_window,
+            search_days).reshape(-1, stocks)
+        pulled_back[rows] = pulled_back_mask(
+            current, _history_window(close, lookback, start, stop), lookback, params["pulled_back"]).reshape(-1, stocks)
+
+    buy &= bullish
+    sell = (bearish & (close < short_sma)) | pulled_back | (close < mid_sma)
+
+    buy_signal = axis.expand(buy & axis.filled) & universe
+    sell_signal = axis.expand(sell & axis.filled)
+    return buy_signal, sell_signal
+
+
+class BacktestResult:
+    """
+    trades -- 成交记录DataFrame：date、code、action、price、shares、amount、fee、pnl
+    equity -- 资金曲线DataFrame：以日期为索引，cash、market_value、equity、positions
+    summary -- 汇总指标字典
+    """
+
+    def __init__(self, trades, equity, params):
+        self.trades = trades
+        self.equity = equity
+        self.params = params
+        self.summary = self._summarize()
+
+    def _summarize(self):
+        equity = self.equity['equity']
+        if equity.empty:
+            return {}
+        initial = self.params["initial_capital"]
+        daily_return = equity.pct_change().fillna(equity.iloc[0] / initial - 1)
+        drawdown = equity / equity.cummax() - 1
+        sells = self.trades[self.trades['action'] == 'sell']
+        years = max(len(equity) / 252, 1 / 252)
+        return {
+            'total_return': equity.iloc[-1] / initial - 1,
+            'annual_return': (equity.iloc[-1] / initial) ** (1 / years) - 1,
+            'max_drawdown': drawdown.min(),
+            'sharpe': daily_return.mean() / daily_return.std() * np.sqrt(252) if daily_return.std() > 0 else 0.0,
+            'trades': len(self.trades),
+            'win_rate': (sells['pnl'] > 0).mean() if len(sells) else 0.0,
+        }
+
+    def __str__(self):
+        if not self.summary:
+            return "回测结果为空"
+        return (f"回测区间：{self.equity.index[0].date()} 至 {self.equity.index[-1].date()}"
+                f"\n  总收益率：{self.summary['total_return']:.2%}"
+                f"\n  年化收益：{self.summary['annual_return']:.2%}"
+                f"\n  最大回撤：{self.summary['max_drawdown']:.2%}"
+                f"\n  夏普比率：{self.summary['sharpe']:.2f}"
+                f"\n  成交笔数：{self.summary['trades']}"
+                f"\n  卖出胜率：{self.summary['win_rate']:.2%}")
+
+
+#手续费：佣金（不低于最低佣金），卖出另收印花税
+def _trade_fee(amount, params, is_sell):
+    fee = np.maximum(amount * params["commission_rate"], params["min_commission"])
+    if is_sell:
+        fee = fee + amount * params["stamp_tax"]
+    return np.where(amount > 0, fee, 0.0)
+
+
+def simulate(market, buy_signal, sell_signal, params=None):
+    """
+    逐日模拟买卖
+    T+1：当日买入的股票最早下一交易日卖出；卖出信号出现后若停牌，复牌后卖出
+    整手：买入股数为lot_size的整数倍
+    """
+    params = parse_params(params)
+    days, stocks = market.shape
+    next_open = params["execution"] == "next_open"
+    price_field = market['open'] if next_open else market['close']
+    close_price = market['close']
+    lot_size = params["lot_size"]
+
+    cash = float(params["initial_capital"])
+    shares = np.zeros(stocks, dtype=np.int64)
+    cost = np.zeros(stocks)  # 持仓成本（含买入手续费）
+    entry_day = np.full(stocks, -1)
+    pending_sell = np.zeros(stocks, dtype=bool)
+    last_close = np.full(stocks, np.nan)
+
+    trade_parts = []
+    equity_rows = np.zeros((days, 4))
+
+    for i in range(days):
+        signal_day = i - 1 if next_open else i
+        price = price_field[i].astype(np.float64)
+        tradable = ~np.isnan(price) & (price > 0)
+        held = shares > 0
+
+        if signal_day >= 0:
+            # ------------------------------------------------------------------
+            # 卖出
+            pending_sell |= held & sell_signal[signal_day]
+            sell = pending_sell & held & tradable & (entry_day < i)
+            sell_idx = np.nonzero(sell)[0]
+            if len(sell_idx):
+                amount = shares[sell_idx] * price[sell_idx]
+                fee = _trade_fee(amount, params, is_sell=True)
+                pnl = amount - fee - cost[sell_idx]
+                cash += float(np.sum(amount - fee))
+                trade_parts.append((i, sell_idx, 'sell', price[sell_idx], shares[sell_idx], amount, fee, pnl))
+                shares[sell_idx] = 0
+                cost[sell_idx] = 0.0
+                pending_sell[sell_idx] = False
+
+            # ------------------------------------------------------------------
+            # 买入：按当前总资产分仓，填满剩余仓位
+            market_value = float(np.nansum(shares * last_close))
+            position_count, capital_per_stock = stock_position_sizing(
+                cash + market_value, params["min_position_size"], params["max_positions"])
+            slots = position_count - int(np.count_nonzero(shares))
+            if slots > 0:
+                candidates = buy_signal[signal_day] & (shares == 0) & tradable & ~sell
+                buy_idx = np.nonzero(candidates)[0][:slots]
+                if len(buy_idx):
+                    buy_price = price[buy_idx]
+                    budget = min(capital_per_stock, cash)
+                    buy_shares = (np.floor(budget / (buy_price * (1 + params["commission_rate"]) * lot_size))
+                                  * lot_size).astype(np.int64)
+                    amount = buy_shares * buy_price
+                    fee = _trade_fee(amount, params, is_sell=False)
+                    # 资金不足时按顺序买入，直到现金用完
+                    affordable = (buy_shares > 0) & (np.cumsum(amount + fee) <= cash)
+                    buy_idx, buy_price = buy_idx[affordable], buy_price[affordable]
+                    buy_shares, amount, fee = buy_shares[affordable], amount[affordable], fee[affordable]
+                    if len(buy_idx):
+                        cash -= float(np.sum(amount + fee))
+                        shares[buy_idx] = buy_shares
+                        cost[buy_idx] = amount + fee
+                        entry_day[buy_idx] = i
+                        trade_parts.append((i, buy_idx, 'buy', buy_price, buy_shares, amount, fee,
+                                            np.zeros(len(buy_idx))))
+
+        # ------------------------------------------------------------------
+        # 按收盘价计算市值，停牌股票使用最近一次收盘价
+        today_close = close_price[i]
+        last_close = np.where(np.isnan(today_close), last_close, today_close)
+        market_value = float(np.nansum(shares * last_close))
+        equity_rows[i] = (cash, market_value, cash + market_value, np.count_nonzero(shares))
+
+    equity = pd.DataFrame(equity_rows, columns=['cash', 'market_value', 'equity', 'positions'],
+                          index=pd.DatetimeIndex(market.dates, name='date'))
+    equity['positions'] = equity['positions'].astype(int)
+
+    if trade_parts:
+        trades = pd.DataFrame({
+            'date': np.concatenate([np.full(len(idx), market.dates[i]) for i, idx, *_ in trade_parts]),
+            'code': np.concatenate([market.codes[idx] for _, idx, *_ in trade_parts]),
+            'action': np.concatenate([np.full(len(idx), action) for _, idx, action, *_ in trade_parts]),
+            'price': np.concatenate([part[3] for part in trade_parts]),
+            'shares': np.concatenate([part[4] for part in trade_parts]),
+            'amount': np.concatenate([part[5] for part in trade_parts]),
+            'fee': np.concatenate([part[6] for part in trade_parts]),
+            'pnl': np.concatenate([part[7] for part in trade_parts]),
+        })
+    else:
+        trades = pd.DataFrame(columns=['date', 'code', 'action', 'price', 'shares', 'amount', 'fee', 'pnl'])
+
+    return BacktestResult(trades, equity, params)
+
+
+#回测入口
+#market:MarketArrays，可由MarketArrays.from_db读取
+#params:回测参数，未给出的使用DEFAULT_BACKTEST_PARAMS
+def run_backtest(market, params=None):
+    params = parse_params(params)
+    buy_signal, sell_signal = compute_signals(market, params)
+    return simulate(market, buy_signal, sell_signal, params)
@@ -0,0 +1,213 @@
+#DTZS策略参数扫描
+#按网格或随机抽样生成参数组合，在进程池中并行回测，结果汇总为可排序的DataFrame
+#行情数组先用MarketArrays.save保存为.npy文件，各子进程以只读内存映射方式打开，
+#所有进程共享操作系统页缓存中的同一份数据，任务只传递参数字典，不序列化行情数组
+#
+#只影响成交的参数（仓位、费率、成交价格）不改变信号，同一组信号参数的组合放在同一个任务中，
+#信号只计算一次，再分别模拟
+
+import os
+import itertools
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+import pandas as pd
+
+#回测
+from .dtzs_backtest import (
+    DEFAULT_BACKTEST_PARAMS,
+    MarketArrays,
+    compute_signals,
+    simulate
+)
+
+#数据库路径
+from ..SQLbase.SQLite_manage import get_data_dir
+
+# 只影响逐日模拟、不影响信号计算的参数
+SIMULATION_PARAMS = ('initial_capital', 'min_position_size', 'max_positions', 'lot_size',
+                     'commission_rate', 'min_commission', 'stamp_tax', 'execution')
+
+# 示例搜索空间，值为候选列表
+DEFAULT_SEARCH_SPACE = {
+    "sma_periods": [(5, 10, 20, 60), (5, 10, 30, 60), (3, 8, 20, 60)],
+    "max_search_days": [3, 5, 8],
+    "pulled_back": [0.05, 0.08, 0.1, 0.15],
+    "max_market_cap": [3e10, 5e10, 1e11],
+    "ipo_months": [2, 4, 6],
+    "min_position_size": [10000, 20000],
+    "max_positions": [20, 40, 80],
+}
+
+
+#行情数组缓存目录
+#内置函数，无需使用
+def get_market_dir(table_name='STOCK000001'):
+    return os.path.join(get_data_dir(), 'backtest', table_name)
+
+
+def prepare_market(directory=None, table_name='STOCK000001', start=None, end=None, refresh=False):
+    """
+    从数据库读取行情并保存为.npy文件
+    已保存的数据表名和日期范围与本次相同时直接使用，否则重新读取
+
+    返回:
+        行情数组目录，读取失败时返回None
+    """
+    directory = directory or get_market_dir(table_name)
+    data_range = {'table_name': table_name, 'start': start, 'end': end}
+    if not refresh and os.path.exists(os.path.join(directory, 'fields.json')):
+        meta = MarketArrays.read_meta(directory)
+        if all(meta.get(key) == value for key, value in data_range.items()):
+            return directory
+        print("已保存的行情范围与本次不同，重新读取")
+
+    print(f"从数据库读取 {table_name} 行情")
+    market = MarketArrays.from_db(table_name, start=start, end=end)
+    if market is None:
+        return None
+    market.save(directory, **data_range)
+    days, stocks = market.shape
+    print(f"行情已保存到 {directory}：{days} 个交易日 x {stocks} 只股票")
+    return directory
+
+
+#网格搜索：全部参数组合
+def grid_space(space):
+    keys = list(space.keys())
+    return [dict(zip(keys, values)) for values in itertools.product(*(space[key] for key in keys))]
+
+#随机搜索：从网格中不放回地抽取n_samples个组合，不展开整个网格
+def random_space(space, n_samples, seed=None):
+    keys = list(space.keys())
+    sizes = [len(space[key]) for key in keys]
+    total = int(np.prod(sizes, dtype=np.int64))
+    rng = np.random.default_rng(seed)
+    picks = rng.choice(total, size=min(n_samples, total), replace=False)
+    indices = np.unravel_index(picks, sizes)
+    return [{key: space[key][int(index[i])] for key, index in zip(keys, indices)}
+            for i in range(len(picks))]
+
+
+#按信号参数分组，同组的组合共用一次信号计算
+def _group_by_signal(configs, base_params):
+    groups = {}
+    for number, config in enumerate(configs):
+        params = {**base_params, **config}
+        signal_key = repr(sorted((key, value) for key, value in params.items()
+                                 if key not in SIMULATION_PARAMS))
+        groups.setdefault(signal_key, []).append((number, params))
+    return list(groups.values())
+
+
+# 子进程中以内存映射方式打开的行情
+_worker_market = None
+
+#子进程初始化：只读内存映射打开行情数组
+#内置函数，无需使用
+def _init_worker(market_dir):
+    global _worker_market
+    _worker_market = MarketArrays.load(market_dir, mmap_mode='r')
+
+#子进程任务：计算一次信号，模拟同组的全部组合，返回[(编号, 汇总指标或错误信息), ...]
+#内置函数，无需使用
+def _run_group(group):
+    try:
+        buy_signal, sell_signal = compute_signals(_worker_market, group[0][1])
+    except Exception as e:
+        return [(number, f"计算信号出错: {str(e)}") for number, _ in group]
+
+    results = []
+    for number, params in group:
+        try:
+            results.append((number, simulate(_worker_market, buy_signal, sell_signal, params).summary))
+        except Exception as e:
+            results.append((number, f"模拟出错: {str(e)}"))
+    return results
+
+
+#在一个进程池中运行指定的组，返回因进程池失效而未完成的组
+#内置函数，无需使用
+def _run_groups(groups, group_indices, market_dir, max_workers, collect):
+    broken = []
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker,
+                             initargs=(market_dir,)) as executor:
+        futures = {executor.submit(_run_group, groups[group_idx]): group_idx for group_idx in group_indices}
+        for future in as_completed(futures):
+            try:
+                results = future.result()
+            except BrokenProcessPool:
+                broken.append(futures[future])
+                continue
+            collect(results)
+    return sorted(broken)
+
+
+def run_sweep(configs, market_dir=None, base_params=None, max_workers=None,
+              sort_by='annual_return', ascending=False, output_file=None):
+    """
+    并行回测参数组合
+
+    参数:
+    configs -- 参数组合列表，可由grid_space或random_space生成
+    market_dir -- 行情数组目录，默认由prepare_market准备
+    base_params -- 各组合共用的参数，未给出的使用DEFAULT_BACKTEST_PARAMS
+    max_workers -- 进程数，默认CPU核数；每个进程计算信号时约需行情数组3倍的内存
+    sort_by -- 排序列
+    output_file -- 结果csv路径，每完成一个任务写入一次，中途停止也保留已完成的结果
+
+    返回:
+        DataFrame，每行一个组合：参数列、汇总指标列与error列
+    """
+    market_dir = market_dir or prepare_market()
+    if market_dir is None:
+        print("行情数据读取失败，无法回测")
+        return None
+
+    base_params = {**DEFAULT_BACKTEST_PARAMS, **(base_params or {})}
+    groups = _group_by_signal(configs, base_params)
+    print(f"共 {len(configs)} 个参数组合，{len(groups)} 组信号参数")
+
+    rows = [None] * len(configs)
+    done = 0
+
+    #记录一组结果，并按需写入csv
+    def collect(results):
+        nonlocal done
+        for number, summary in results:
+            row = {key: configs[number][key] for key in configs[number]}
+            if isinstance(summary, str):
+                row['error'] = summary
+            else:
+                row.update(summary)
+                row['error'] = None
+            rows[number] = row
+        done += 1
+        print(f"进度：{done}/{len(groups)}")
+        if output_file:
+            _sweep_frame([row for row in rows if row is not None], sort_by, ascending).to_csv(
+                output_file, index=False, encoding='utf-8')
+
+    # 子进程异常退出（如内存不足被系统结束）时进程池整体失效，未完成的任务都会失败，
+    # 这些任务改为每组单独一个进程重新运行，仍失败的记为错误，已完成的结果不受影响
+    broken = _run_groups(groups, range(len(groups)), market_dir, max_workers, collect)
+    if broken:
+        print(f"子进程异常退出，{len(broken)} 组参数逐组重新运行")
+    for group_idx in broken:
+        if _run_groups(groups, [group_idx], market_dir, 1, collect):
+            collect([(number, "子进程异常退出") for number, _ in groups[group_idx]])
+
+    return _sweep_frame(rows, sort_by, ascending)
+
+
+#汇总为DataFrame，元组参数（如sma_periods）转为字符串便于排序和保存
+def _sweep_frame(rows, sort_by, ascending):
+    df = pd.DataFrame(rows)
+    for column in df.columns:
+        if df[column].map(lambda value: isinstance(value, tuple)).any():
+            df[column] = df[column].map(lambda value: '/'.join(map(str, value))
+                                        if isinstance(value, tuple) else value)
+    if sort_by in df.columns:
+        df = df.sort_values(sort_by, ascending=ascending, na_position='last').reset_index(drop=True)
+    return df
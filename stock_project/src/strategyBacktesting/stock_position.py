@@ -0,0 +1,252 @@
+#单只股票的持仓管理与交易重放
+#只依赖numpy和pandas，不引入可视化模块，可单独使用和测试
+
+import numpy as np
+import pandas as pd
+
+#数据库
+from ..SQLbase.SQLite_manage import (
+    query_trade_table
+)
+
+"""
+股票持仓管理类，用于跟踪单只股票的持仓状态和收益变化
+"""
+
+
+class StockPosition:
+    #构造函数
+    def __init__(self, table_name: str):
+        """
+        参数:
+        trade_data -- 交易数据DataFrame，需包含字段：
+            trade_date: 交易日期 (str)
+            code: 股票代码 (str)
+            trade_price: 交易价格 (float)
+            trade_number: 交易数量 (float)
+            isbuy: 是否买入 (1=买入, 0=卖出)
+        """
+
+        # 从数据库获取交易数据
+        try:
+            self.trade_data = query_trade_table(table_name)
+        except Exception as e:
+            raise RuntimeError(f"数据库查询失败: {str(e)}") from e
+
+        # 检查数据是否为空
+        if not hasattr(self.trade_data, 'empty') or self.trade_data.empty:
+            raise ValueError(f"表 '{table_name}' 中无有效交易数据，检查输入表名是否正确")
+
+        # 从第一条交易记录获取股票基本信息
+        first_trade = self.trade_data.iloc[0]
+        self.stock_code = first_trade['code']
+        self.stock_name = first_trade['code_name']
+
+        # 动态状态
+        self.current_shares = 0.0  # 当前持仓数量
+        self.total_investment = 0.0  # 当前持仓总金额（买入总金额 - 卖出总金额）
+        self.average_cost = 0.0  # 当前持仓成本（总金额/持仓数量）
+        self.realized_profit = 0.0  # 累计实现收益（卖出收益）
+
+        self.aligned_history = None
+
+        # 历史记录
+        self.history = []  # 记录每次交易后的持仓变化
+
+    def __str__(self):
+        """返回当前持仓状态的字符串表示"""
+        return (f"股票 [{self.stock_code}-{self.stock_name}] 持仓状态："
+                f"\n  当前数量：{self.current_shares:.2f}股"
+                f"\n  持仓金额：{self.total_investment:.2f}元"
+                f"\n  持仓成本：{self.average_cost:.5f}元/股"
+                f"\n  累计收益：{self.realized_profit:.2f}元")
+
+    #处理交易数据
+    #vectorized为True时整体向量化计算（replay_trades），卖出按未取整的平均成本结转；
+    #为False时逐笔处理（原先的计算方式），卖出按取整到5位小数的平均成本结转
+    #两者的实现收益和持仓金额会有差异，每卖出一股最多相差5e-6元，默认的向量化结果更精确
+    def process_trades(self, vectorized=True):
+        # 按日期排序，同一日期保持导入顺序
+        stock_trades = self.trade_data.sort_values('trade_date', kind='stable')
+
+        # 每次都从空仓开始重放，可重复调用或切换计算方式
+        self.current_shares = 0.0
+        self.total_investment = 0.0
+        self.average_cost = 0.0
+        self.realized_profit = 0.0
+        self.history = []
+
+        if vectorized:
+            self.history = replay_trades(stock_trades)
+            if not self.history.empty:
+                last_state = self.history.iloc[-1]
+                self.current_shares = float(last_state['shares'])
+                self.total_investment = float(last_state['total_investment'])
+                self.average_cost = float(last_state['average_cost'])
+                self.realized_profit = float(last_state['realized_profit'])
+            return None
+
+        # 处理每一条交易记录
+        for _, trade in stock_trades.iterrows():
+            #trade_type = "买入" if trade['isbuy'] else "卖出"
+
+            # 打印交易详情
+            #print(f"处理 {trade['trade_date']} {trade_type}: "
+            #      f"{trade['trade_number']}股 @ {trade['trade_price']}元")
+
+            # 更新持仓状态
+            if trade['isbuy']:  # 买入操作
+                self._handle_buy(trade['trade_number'], trade['trade_price'])
+            else:  # 卖出操作
+                self._handle_sell(trade['trade_number'], trade['trade_price'])
+
+            # 记录交易后状态
+            self._record_state(trade['trade_date'])
+
+    def _handle_buy(self, quantity: float, price: float):
+        """处理买入交易逻辑"""
+        self.current_shares += quantity
+        self.total_investment += quantity * price
+
+        # 计算新的持仓成本（避免除零错误）
+        if self.current_shares == 0:
+            self.average_cost = 0.0
+        else:
+            self.average_cost = round(self.total_investment / self.current_shares, 5)
+
+    def _handle_sell(self, quantity: float, price: float):
+        # 检查卖出数量是否超过当前持仓
+        if quantity > self.current_shares:
+            actual_sell = self.current_shares
+            print(f"警告: 卖出数量({quantity}) > 当前持仓({self.current_shares})，已调整为卖出{actual_sell}股")
+        else:
+            actual_sell = quantity
+
+        # 卖出成本 = 本次卖出数量 * 当前平均成本
+        sold_cost = actual_sell * self.average_cost
+        # 卖出所得现金 = 卖出数量 * 卖出价格
+        sale_value = actual_sell * price
+
+        # 准确计算本次交易的收益
+        trade_profit = sale_value - sold_cost
+
+        # 更新账户状态
+        self.realized_profit += trade_profit
+        self.current_shares -= actual_sell
+
+        # 按成本减少总金额
+        self.total_investment -= sold_cost
+
+        # 重新计算平均成本（避免除零错误）
+        if self.current_shares == 0:
+            self.average_cost = 0.0
+        else:
+            self.average_cost = round(self.total_investment / self.current_shares, 5)
+
+    def _record_state(self, date: str):
+        """记录当前持仓状态到历史"""
+        self.history.append({
+            'date': date,
+            'shares': self.current_shares,
+            'total_investment': self.total_investment,
+            'average_cost': self.average_cost,
+            'realized_profit': self.realized_profit
+        })
+
+    def get_history(self) -> pd.DataFrame:
+        """获取持仓变化历史"""
+        return pd.DataFrame(self.history)
+
+    def get_stock_code(self) -> str:
+        """返回当前持仓的股票代码"""
+        return self.stock_code
+
+    def get_full_history(self, stock_data: pd.DataFrame) -> pd.DataFrame:
+        """获取扩展到整个交易日期间的完整持仓历史"""
+        # 检查是否为空
+        if len(self.history) == 0:
+            raise RuntimeError("先调用process_trades()计算交易历史")
+
+        # 处理股票数据中的重复日期 - 保留每个日期的最后一条记录
+        stock_data = stock_data[~stock_data.index.duplicated(keep='last')]
+
+        # 将历史交易记录转为DataFrame，同一日期保留最后一次交易后的状态
+        history_df = self.get_history()
+        cols = ['shares', 'total_investment', 'average_cost', 'realized_profit']
+
+        # 只保留交易日期之后的数据
+        start_date = history_df['date'].iloc[0]
+        filtered_stock = stock_data[stock_data.index >= start_date]
+
+        history_df['date'] = pd.to_datetime(history_df['date'])
+        daily_state = history_df.groupby('date')[cols].last()
+
+        # 对齐到股票数据的交易日（不在股票数据中的交易日期忽略），前向填充（持仓状态保持不变）
+        full_history = daily_state.reindex(filtered_stock.index).astype(float).ffill()
+
+        # 在首次交易前，持仓和收益均为0
+        full_history = full_history.fillna(0)
+
+        return full_history
+
+
+#线性递推 x[k] = m[k] * x[k-1] + b[k]（x[-1] = 0）的前缀扫描
+#每轮把相隔step的两段复合：(m1, b1)之后接(m2, b2)等于(m1*m2, m2*b1 + b2)，共log2(n)轮
+#m均在[0, 1]之间，只做乘加，不会溢出
+#内置函数，无需使用
+def _linear_scan(m, b):
+    m = np.array(m, dtype=float)
+    b = np.array(b, dtype=float)
+    step = 1
+    while step < len(b):
+        b[step:] = m[step:] * b[:-step] + b[step:]
+        m[step:] = m[step:] * m[:-step]
+        step *= 2
+    return b
+
+def replay_trades(stock_trades: pd.DataFrame) -> pd.DataFrame:
+    """
+    向量化重放交易记录（需已按日期排序）
+
+    持仓数量：带下限0的累计和，卖出数量超过持仓时按持仓卖出
+    持仓金额：买入增加成交金额，卖出按平均成本同比例减少，
+              即 金额[k] = 金额[k-1] × 持仓[k]/持仓[k-1] + 买入金额[k]，用前缀扫描求解
+    实现收益：卖出数量 × (卖出价格 - 卖出前平均成本) 的累计和
+
+    返回:
+        DataFrame，列为date、shares、total_investment、average_cost、realized_profit，每笔交易一行
+    """
+    quantity = stock_trades['trade_number'].to_numpy(dtype=float)
+    price = stock_trades['trade_price'].to_numpy(dtype=float)
+    is_buy = stock_trades['isbuy'].to_numpy().astype(bool)
+
+    # 持仓数量：原始累计和减去其历史最低值（不低于0）
+    raw = np.cumsum(np.where(is_buy, quantity, -quantity))
+    shares = raw - np.minimum(np.minimum.accumulate(raw), 0)
+    prev_shares = np.concatenate(([0.0], shares[:-1]))
+    sold = np.where(is_buy, 0.0, prev_shares - shares)
+
+    clipped = ~is_buy & (quantity > sold)
+    if clipped.any():
+        print(f"警告: {int(clipped.sum())} 笔卖出数量超过当前持仓，已调整为卖出全部持仓")
+
+    # 持仓金额
+    with np.errstate(invalid='ignore', divide='ignore'):
+        keep_ratio = np.where(is_buy | (prev_shares == 0), 1.0, shares / prev_shares)
+    total_investment = _linear_scan(keep_ratio, np.where(is_buy, quantity * price, 0.0))
+    total_investment[shares == 0] = 0.0
+
+    # 卖出前的平均成本（未取整）与实现收益
+    prev_investment = np.concatenate(([0.0], total_investment[:-1]))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        prev_cost = np.where(prev_shares > 0, prev_investment / prev_shares, 0.0)
+        average_cost = np.where(shares > 0, np.round(total_investment / shares, 5), 0.0)
+    realized_profit = np.cumsum(sold * (price - prev_cost))
+
+    return pd.DataFrame({
+        'date': stock_trades['trade_date'].to_numpy(),
+        'shares': shares,
+        'total_investment': total_investment,
+        'average_cost': average_cost,
+        'realized_profit': realized_profit
+    })
@@ -3,16 +3,17 @@ import os
 import glob
 
 #数据库
-import sqlite3
 from ..SQLbase.SQLite_manage import (
     get_data_dir,
 )
+from ..SQLbase.SQLite_connect import get_connection
 
 #-----------------------------------------------------------------------
 # 数据库文件固定存储在trade-data.db中
+# 连接由SQLite_connect按线程统一管理，keep_open为True时返回该连接（调用方无需关闭）
 # 内置函数，无需使用
 def create_trade_db(table_name, db_path, keep_open=False):
-    conn = sqlite3.connect(db_path)
+    conn = get_connection(db_path)
 
     # cursor对象
     c = conn.cursor()
@@ -37,7 +38,6 @@ def create_trade_db(table_name, db_path, keep_open=False):
         return conn
     else:
         print("已创建数据库（关闭连接模式）")
-        conn.close()
         return None
 
 #-----------------------------------------------------------------------
@@ -149,7 +149,6 @@ def process_xls_files(table_name):
 
     if not xls_files:
         print(f"在 {target_dir} 中未找到任何Excel文件")
-        conn.close()
         return
 
     for file_path in xls_files:
@@ -230,6 +229,5 @@ def process_xls_files(table_name):
             print(f"数据加入到数据库失败: {str(e)}")
             continue
 
-    conn.close()
     print("=" * 50)
     print("读取文件到数据库函数运行结束")
@@ -59,34 +59,32 @@ from ..src.SQLbase.SQLite_manage import (
     load_stock_mapping
 )
 
-#获取股票基本数据
-from ..src.data_acquisition.stock_get import bs_query_ipodate
+#获取股票基本数据（按交易日缓存）
+from ..src.data_acquisition.stock_basic_cache import get_stock_basic
 
-#获取上市日期
-from ..technocal_indicators.get_recent_ipo import get_recent_ipo_stocks
-
-#获取均线
-from ..technocal_indicators.get_sma import (
-    calculate_sma
+#初筛表
+from ..technocal_indicators.stock_universe import (
+    build_universe,
+    filter_universe
 )
 
+#盘中增量指标（均线等）
+from ..technocal_indicators.indicator_state import IndicatorState
+
 #获取59日数据，整合当前实时数据为60日数据
-from ..technocal_indicators.get_data_for_indicators import (
-    get_59days_data,
-    get_60days_close_data
-)
+from ..technocal_indicators.get_data_for_indicators import get_59days_data
 
-#获取当前实时价格
-from ..technocal_indicators.get_now_price import get_now_price
+#每轮循环共享的行情快照
+from ..technocal_indicators.market_snapshot import MarketSnapshot
 
 #阳包阴/阴包阳技术获取
 from ..technocal_indicators.get_bullish_bearish import (
-    get_bullish_cover_bearish,
-    get_bearish_cover_bullish
+    bullish_cover_bearish_mask,
+    bearish_cover_bullish_mask
 )
 
 #回撤函数
-from ..technocal_indicators.profit_pulled_back import profit_pulled_back
+from ..technocal_indicators.profit_pulled_back import pulled_back_mask
 
 #股票池
 from ..technocal_indicators.connect_monitoring_pool import (
@@ -94,9 +92,6 @@ from ..technocal_indicators.connect_monitoring_pool import (
     remove_from_monitoring_pool
 )
 
-#市值计算
-from ..technocal_indicators.get_stock_market_value import  filter_by_market_cap
-
 #获取全名称代码，在初筛使用
 def get_all_stock_code():
     code_name_map = load_stock_mapping()
@@ -118,108 +113,39 @@ def apply_stock_filters_first(code_name_map):
         "exclude_market_value":True  #市值筛选
     }
 
-    # 检查每个筛选条件
-    #------------------------------------------------------------------
-    #筛选创业板股票（代码以3开头）
-    if filter_conditions.get("exclude_gem", True):
-        # 创建待删除的键列表
-        to_remove = []
-
-        # 遍历字典
-        for stock_code, stock_name in code_name_map.items():
-            # 提取数字部分（去掉'sz.'或'sh.'前缀）
-            if '.' in stock_code:
-                code_num = stock_code.split('.')[1]
-
-                # 判断是否为创业板（代码以3开头）
-                if code_num.startswith('3'):
-                    to_remove.append(stock_code)
-            else:
-                # 对于没有点号的代码，直接检查是否以3开头
-                if stock_code.startswith('3'):
-                    to_remove.append(stock_code)
-
-        # 从原字典中删除创业板股票
-        for stock_code in to_remove:
-            if stock_code in code_name_map:
-                del code_name_map[stock_code]
-
-    # ------------------------------------------------------------------
-    #筛选科创，以68开头的股票
-    if filter_conditions.get("exclude_star_market", True):
-        # 创建待删除的键列表
-        to_remove = []
-
-        # 遍历字典，筛选科创板股票（代码以68开头）
-        for stock_code, stock_name in code_name_map.items():
-            # 提取数字部分（去掉'sz.'或'sh.'前缀）
-            if '.' in stock_code:
-                code_num = stock_code.split('.')[1]
-
-                # 判断是否为科创板（代码以68开头）
-                if code_num.startswith('68'):
-                    to_remove.append(stock_code)
-            else:
-                # 对于没有点号的代码，直接检查是否以68开头
-                if stock_code.startswith('68'):
-                    to_remove.append(stock_code)
-
-        # 从原字典中删除科创板股票
-        for stock_code in to_remove:
-            if stock_code in code_name_map:
-                del code_name_map[stock_code]
-
-    # ------------------------------------------------------------------
-    #剔除st股票
-    if filter_conditions.get("exclude_st", True):
-        # 创建待删除的键列表
-        to_remove = []
-
-        # 遍历字典，筛选ST股票（名称中包含"ST"）
-        for stock_code, stock_name in code_name_map.items():
-            if "ST" in stock_name:
-                to_remove.append(stock_code)
-
-        # 从原字典中删除ST股票
-        for stock_code in to_remove:
-            if stock_code in code_name_map:
-                del code_name_map[stock_code]
-
-    # ------------------------------------------------------------------
-    #剔除新股
+    # 新股筛选需要股票基本资料（上市日期）
+    stock_basic_df = None
     if filter_conditions.get("exclude_new_stock", True):
-        # 创建待删除的键列表
-        to_remove = []
+        stock_basic_df = get_stock_basic()
 
-        stock_basic_df = bs_query_ipodate()
+    # 构建筛选表，各条件为布尔掩码一次合并，被剔除的股票记录原因
+    universe = build_universe(code_name_map, stock_basic_df,
+                              with_market_cap=filter_conditions.get("exclude_market_value", True))
+    universe = filter_universe(universe, filter_conditions, months=4, max_market_cap=5e10)
 
-        # 获取上市4个月以内的股票代码列表
-        recent_ipo_stocks = get_recent_ipo_stocks(stock_basic_df, months=4)
-
-        # 遍历股票代码映射，检查是否在新股列表中
-        for stock_code, stock_name in code_name_map.items():
-            if stock_code in recent_ipo_stocks:
-                to_remove.append(stock_code)
-
-        # 从原字典中删除新股
-        for stock_code in to_remove:
-            if stock_code in code_name_map:
-                del code_name_map[stock_code]
-
-    # ------------------------------------------------------------------
-    #剔除市值x亿以上的股票
-    if filter_conditions.get("exclude_market_value", True):
-        code_name_map = filter_by_market_cap(code_name_map)
+    passed = universe[universe['passed']]
+    code_name_map = dict(zip(passed.index, passed['name']))
+    print(f"初筛完成：共 {len(universe)} 只，通过 {len(passed)} 只")
 
     stock_59days_close_data , kline_10days_data = get_59days_data(code_name_map)
     stock_require_data_buy = {
         'close_data': stock_59days_close_data,  # 59天收盘价数据
-        'kline_data': kline_10days_data  # 10天K线数据
+        'kline_data': kline_10days_data,  # 10天K线数据（KlineStore）
+        'indicator_state': IndicatorState(stock_59days_close_data, kline_10days_data),  # 预先计算的指标状态
+        'universe': universe  # 初筛表，reason列为剔除原因
     }
     return code_name_map, stock_require_data_buy
 
+#获取本轮循环的行情快照，买入和卖出的所有阶段共用
+#code_name_maps:买入候选池、监控池等需要行情的股票字典
+def get_market_snapshot(api, *code_name_maps):
+    codes = set()
+    for code_name_map in code_name_maps:
+        codes.update(code_name_map.keys())
+    return MarketSnapshot(codes, api)
+
 # 二筛，实时判断
-def apply_stock_filters_second(code_name_map,stock_require_data_buy,api):
+def apply_stock_filters_second(code_name_map,stock_require_data_buy,snapshot):
     filter_conditions = {
         "sma_bullish_alignment": True,  # 均线多头排列
         "price_greater_sma": True, #当前股价高于5均
@@ -228,69 +154,38 @@ def apply_stock_filters_second(code_name_map,stock_require_data_buy,api):
         "price_increased_within_year": True #年内涨幅已经增长为x
     }
 
-    stock_59days_close_data = stock_require_data_buy['close_data']
     kline_10days_data = stock_require_data_buy['kline_data']
+    indicator_state = stock_require_data_buy['indicator_state']
 
-    now_price , open_prices = get_now_price(code_name_map,api)
-    stock_60days_close_data = get_60days_close_data(stock_59days_close_data, now_price)
-
-    # 创建字典来存储每只股票的均线值
-    ma_results = {}
-
-    # 遍历所有股票
-    for stock_code, prices in stock_60days_close_data.items():
-        # 计算5日、20日、60日均线
-        ma5 = calculate_sma(prices, 5)
-        ma10 = calculate_sma(prices, 10)
-        ma20 = calculate_sma(prices, 20)
-        ma60 = calculate_sma(prices, 60)
-
-        # 存储计算结果
-        ma_results[stock_code] = {
-            'ma5': ma5,
-            'ma10': ma10,
-            'ma20': ma20,
-            'ma60': ma60,
-            'current_price': prices[-1]  # 最后一个是当前价格
-        }
-    # ------------------------------------------------------------------
-    #均线多头排列
-    if filter_conditions.get("sma_bullish_alignment", True):
-        # 创建待删除的键列表
-        to_remove = []
+    now_price , open_prices = snapshot.get_now_price(code_name_map)
 
-        # 遍历所有股票，筛选均线多头排列
-        for stock_code, ma_data in ma_results.items():
-            # 检查均线多头排列条件：5日 > 10日 > 20日 > 60日
-            if not (ma_data['ma5'] > ma_data['ma10'] >
-                    ma_data['ma20'] > ma_data['ma60']):
-                to_remove.append(stock_code)
+    # 由预先计算的历史部分更新今日均线，结果为与indicator_state.codes对齐的数组
+    ma = indicator_state.update(now_price)
 
-        # 从原字典中删除不满足条件的股票
-        for stock_code in to_remove:
-            if stock_code in code_name_map:
-                del code_name_map[stock_code]
+    # 没有实时价格的股票不参与筛选
+    passed = ma['valid'].copy()
+
+    # ------------------------------------------------------------------
+    #均线多头排列：5日 > 10日 > 20日 > 60日
+    if filter_conditions.get("sma_bullish_alignment", True):
+        passed &= (ma['ma5'] > ma['ma10']) & (ma['ma10'] > ma['ma20']) & (ma['ma20'] > ma['ma60'])
 
     # ------------------------------------------------------------------
     # 当前股价高于5均
     if filter_conditions.get("price_greater_sma", True):
-        # 创建待删除的键列表
-        to_remove = []
-
-        # 遍历所有股票，筛选股价大于5均
-        for stock_code, ma_data in ma_results.items():
-            if not (ma_data['current_price'] > ma_data['ma5']):
-                to_remove.append(stock_code)
-
-        # 从原字典中删除不满足条件的股票
-        for stock_code in to_remove:
-            if stock_code in code_name_map:
-                del code_name_map[stock_code]
+        passed &= ma['current_price'] > ma['ma5']
 
     # ------------------------------------------------------------------
     # 当前股价出现阳包阴
     if filter_conditions.get("bullish_cover_bearish", True):
-        code_name_map = get_bullish_cover_bearish(code_name_map, kline_10days_data, now_price, open_prices)
+        codes = indicator_state.codes
+        passed &= bullish_cover_bearish_mask(ma['current_price'], indicator_state.engine.align_prices(open_prices),
+                                             kline_10days_data.take('high', codes),
+                                             kline_10days_data.take('status', codes))
+
+    # 生成新的字典，不修改初筛结果，下一轮循环仍使用完整的初筛股票
+    code_name_map = {stock_code: code_name_map[stock_code]
+                     for stock_code in indicator_state.codes[passed] if stock_code in code_name_map}
 
     # ------------------------------------------------------------------
     # 剔除震荡格局的股票
@@ -300,27 +195,29 @@ def apply_stock_filters_second(code_name_map,stock_require_data_buy,api):
     return code_name_map
 
 #处理股票为股票池
-def add_to_monitoring_pool(code_name_map,api):
-    now_price, open_prices = get_now_price(code_name_map,api)
+def add_to_monitoring_pool(code_name_map,snapshot):
+    now_price, open_prices = snapshot.get_now_price(code_name_map)
     connect_monitoring_pool(code_name_map, now_price)
     return None
 
 #
-def remove_stock_from_monitoring_pool(code_name_map,api):
-    now_price, open_prices = get_now_price(code_name_map,api)
+def remove_stock_from_monitoring_pool(code_name_map,snapshot):
+    now_price, open_prices = snapshot.get_now_price(code_name_map)
     remove_from_monitoring_pool(code_name_map, now_price)
     return None
 
 #分仓策略
-def stock_position_sizing(total_capital):
+def stock_position_sizing(total_capital, min_position_size=10000, max_positions=80):
     """
     股票分仓策略函数
     :param total_capital: 总资金量（单位：元）
+    :param min_position_size: 最小分仓金额（默认1万元）
+    :param max_positions: 最大开仓数量（默认80）
     :return: (开仓数量, 每只股票分配资金)
     """
     # 定义策略参数
-    MIN_POSITION_SIZE = 10000  # 最小分仓金额1万元
-    MAX_POSITIONS = 80  # 最大开仓数量
+    MIN_POSITION_SIZE = min_position_size  # 最小分仓金额
+    MAX_POSITIONS = max_positions  # 最大开仓数量
 
     # 如果资金不足最小分仓金额，无法开仓
     if total_capital < MIN_POSITION_SIZE:
@@ -346,75 +243,60 @@ def apply_selling_stocks_first(code_name_map):
     stock_59days_close_data, kline_10days_data = get_59days_data(code_name_map)
     stock_require_data_sell = {
         'close_data': stock_59days_close_data,  # 59天收盘价数据
-        'kline_data': kline_10days_data  # 10天K线数据
+        'kline_data': kline_10days_data,  # 10天K线数据（KlineStore）
+        'indicator_state': IndicatorState(stock_59days_close_data, kline_10days_data)  # 预先计算的指标状态
     }
     return code_name_map, stock_require_data_sell
 
 #第二次，正式处理
-def apply_selling_stocks_second(code_name_map,stock_require_data_sell,api):
+def apply_selling_stocks_second(code_name_map,stock_require_data_sell,snapshot):
     filter_conditions = {
         "price_lower_5sma_and_bearish_cover_bullish": True,  #股价跌破5日均线并且阴包阳
         "recent_high_retreated": True,  #股价在距离近日最高点回撤超过x%
+        "recent_high_include_intraday": False,  #回撤的最高点包含今日盘中最高价
         "price_lower_10sma": True, #股价跌破10日均线
     }
 
-    stock_59days_close_data = stock_require_data_sell['close_data']
     kline_10days_data = stock_require_data_sell['kline_data']
+    indicator_state = stock_require_data_sell['indicator_state']
 
-    now_price, open_prices = get_now_price(code_name_map,api)
-    stock_60days_close_data = get_60days_close_data(stock_59days_close_data, now_price)
+    now_price, open_prices = snapshot.get_now_price(code_name_map)
 
-    # 创建字典来存储每只股票的均线值
-    ma_results = {}
+    # 由预先计算的历史部分更新今日均线，结果为与indicator_state.codes对齐的数组
+    ma = indicator_state.update(now_price)
 
     # 初始化卖出股票列表
     selling_stocks_dict = {}
 
-    # 遍历所有股票
-    for stock_code, prices in stock_60days_close_data.items():
-        # 计算5日、20日、60日均线
-        ma5 = calculate_sma(prices, 5)
-        ma10 = calculate_sma(prices, 10)
-        ma20 = calculate_sma(prices, 20)
-        ma60 = calculate_sma(prices, 60)
-
-        # 存储计算结果
-        ma_results[stock_code] = {
-            'ma5': ma5,
-            'ma10': ma10,
-            'ma20': ma20,
-            'ma60': ma60,
-            'current_price': prices[-1]  # 最后一个是当前价格
-        }
+    #把满足条件的股票按顺序加入卖出字典，已存在的不重复添加
+    def add_selling_stocks(mask):
+        for stock_code in indicator_state.codes[mask & ma['valid']]:
+            if stock_code not in selling_stocks_dict:
+                selling_stocks_dict[stock_code] = code_name_map.get(stock_code, "未知股票")
 
     # ------------------------------------------------------------------
     # 股价出现阴包阳并且跌破5日均线
     if filter_conditions.get("price_lower_5sma_and_bearish_cover_bullish", True):
-        # 获取阴包阳的股票列表
-        bearish_stocks = get_bearish_cover_bullish(code_name_map, kline_10days_data, now_price, open_prices)
-
-        for stock_code, ma_data in ma_results.items():
-            if stock_code not in selling_stocks_dict:
-                if stock_code in bearish_stocks and ma_data['current_price'] < ma_data['ma5']:
-                    # 直接添加到字典
-                    selling_stocks_dict[stock_code] = code_name_map.get(stock_code, "未知股票")
+        # 阴包阳的股票掩码
+        codes = indicator_state.codes
+        is_bearish = bearish_cover_bullish_mask(ma['current_price'], indicator_state.engine.align_prices(open_prices),
+                                                kline_10days_data.take('low', codes),
+                                                kline_10days_data.take('status', codes))
+        add_selling_stocks(is_bearish & (ma['current_price'] < ma['ma5']))
 
     # ------------------------------------------------------------------
     #股价在距离近日最高收盘价回撤超过10%
     if filter_conditions.get("recent_high_retreated", True):
-        pulled_back_stocks = profit_pulled_back(code_name_map,kline_10days_data,now_price)
-        for stock_code, stock_name in pulled_back_stocks.items():
-            # 只添加尚未存在的股票
-            if stock_code not in selling_stocks_dict:
-                selling_stocks_dict[stock_code] = stock_name
+        intraday_high = None
+        if filter_conditions.get("recent_high_include_intraday", False):
+            intraday_high = indicator_state.engine.align_prices(snapshot.get_high_prices(code_name_map))
+        add_selling_stocks(pulled_back_mask(ma['current_price'],
+                                            kline_10days_data.take('close', indicator_state.codes),
+                                            lookback=3, threshold=0.1, intraday_high=intraday_high))
 
     # ------------------------------------------------------------------
     # 股价跌破10日均线
     if filter_conditions.get("price_lower_10sma", True):
-        for stock_code, ma_data in ma_results.items():
-            # 检查股价是否低于10日均线
-            if ma_data['current_price'] < ma_data['ma10']:
-                if stock_code not in selling_stocks_dict:
-                    selling_stocks_dict[stock_code] = code_name_map.get(stock_code, "未知股票")
+        add_selling_stocks(ma['current_price'] < ma['ma10'])
 
     return selling_stocks_dict
\ No newline at end of file
@@ -1,165 +1,236 @@
+#监控池
+#监控池保存在trade-data.db的MONITORING_POOL表，进程内保留一份内存镜像，
+#每轮循环只对变化的股票批量写入/删除（同一事务）
+#出入池记录交给monitoring_journal缓存后批量写入（按日日志与MONITORING_HISTORY索引表）
+#monitoring_pool.csv仅作为导出文件保留，旧版csv数据只在首次运行时导入一次（导入标记保存在MONITORING_META表）
+
 import os
 import csv
+import threading
 from datetime import datetime
 
+#数据库
+from ..src.SQLbase.SQLite_manage import get_data_dir
+from ..src.SQLbase.SQLite_connect import get_connection
+
+#出入池记录日志
+from .monitoring_journal import (
+    HISTORY_TABLE,
+    create_history_table,
+    get_monitoring_journal
+)
+
+POOL_TABLE = 'MONITORING_POOL'
+META_TABLE = 'MONITORING_META'
+CSV_IMPORTED_KEY = 'csv_imported'
+
+
+#监控池csv所在目录
+#内置函数，无需使用
+def get_monitoring_dir():
+    data_dir = os.path.join(get_data_dir(), 'monitoring_pool')
+    os.makedirs(data_dir, exist_ok=True)  # 确保目录存在
+    return data_dir
+
+
+class MonitoringPool:
+    """
+    参数:
+    db_path -- 数据库路径，默认data/trade-data.db
+    journal -- 出入池记录日志，默认全局共享的MonitoringJournal
+    """
+
+    def __init__(self, db_path=None, journal=None):
+        self.db_path = db_path or os.path.join(get_data_dir(), 'trade-data.db')
+        self.journal = journal or get_monitoring_journal()
+        # 内存镜像：{code: (stock_name, entry_time, entry_price)}
+        self.entries = {}
+        self._lock = threading.Lock()
+
+        conn = get_connection(self.db_path)
+        self.create_tables(conn)
+        self.load(conn)
+
+    @staticmethod
+    def create_tables(conn):
+        conn.execute(f"""
+            CREATE TABLE IF NOT EXISTS {POOL_TABLE} (
+                stock_code    TEXT    PRIMARY KEY,
+                stock_name    TEXT,
+                entry_time    TEXT,
+                entry_price   REAL
+            )
+        """)
+        conn.execute(f"""
+            CREATE TABLE IF NOT EXISTS {META_TABLE} (
+                key           TEXT    PRIMARY KEY,
+                value         TEXT
+            )
+        """)
+        conn.commit()
+        create_history_table(conn)
+        return None
 
-def connect_monitoring_pool(code_name_map, now_price):
-    # 确定目标文件夹路径
-    base_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-    data_dir = os.path.join(base_dir, 'stock_project', 'data', 'monitoring_pool')
-
-    # 如果目标文件夹不存在，则创建
-    os.makedirs(data_dir, exist_ok=True)
-
-    pool_file = os.path.join(data_dir, 'monitoring_pool.csv')
-    history_file = os.path.join(data_dir, 'monitoring_history.csv')
+    #读取监控池到内存，首次运行时导入旧的csv文件
+    def load(self, conn):
+        if conn.execute(f"SELECT 1 FROM {META_TABLE} WHERE key = ?", (CSV_IMPORTED_KEY,)).fetchone() is None:
+            self.import_csv(conn)
+        rows = conn.execute(f"SELECT stock_code, stock_name, entry_time, entry_price FROM {POOL_TABLE}").fetchall()
+        self.entries = {code: (name, entry_time, price) for code, name, entry_time, price in rows}
+        return None
 
-    current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    #导入旧版monitoring_pool.csv与monitoring_history.csv，并写入导入标记，之后不再导入
+    #数据库中已有监控池或出入池记录（由之前的版本导入过）时只写入标记
+    #monitoring_pool.csv退出时会重新导出，不能以文件是否存在判断是否已导入
+    def import_csv(self, conn):
+        data_dir = get_monitoring_dir()
+        pool_file = os.path.join(data_dir, 'monitoring_pool.csv')
+        history_file = os.path.join(data_dir, 'monitoring_history.csv')
+        imported_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        mark_sql = f"INSERT OR REPLACE INTO {META_TABLE} (key, value) VALUES (?, ?)"
+
+        has_data = any(conn.execute(f"SELECT 1 FROM {table} LIMIT 1").fetchone()
+                       for table in (POOL_TABLE, HISTORY_TABLE))
+        if has_data or not os.path.exists(pool_file):
+            with conn:
+                conn.execute(mark_sql, (CSV_IMPORTED_KEY, imported_at))
+            return None
+
+        with open(pool_file, 'r', newline='', encoding='utf-8') as f:
+            pool_rows = [(row['stock_code'], row['stock_name'], row['entry_time'], _to_price(row['entry_price']))
+                         for row in csv.DictReader(f)]
+
+        history_rows = []
+        if os.path.exists(history_file):
+            with open(history_file, 'r', newline='', encoding='utf-8') as f:
+                history_rows = [(row['stock_code'], row['stock_name'], row['action'], row['time'],
+                                 _to_price(row['price']))
+                                for row in csv.DictReader(f)]
+
+        with conn:
+            conn.executemany(f"INSERT OR REPLACE INTO {POOL_TABLE} VALUES (?, ?, ?, ?)", pool_rows)
+            conn.executemany(f"""
+                INSERT INTO {HISTORY_TABLE} (stock_code, stock_name, action, time, price)
+                VALUES (?, ?, ?, ?, ?)
+            """, history_rows)
+            conn.execute(mark_sql, (CSV_IMPORTED_KEY, imported_at))
+        print(f"已导入监控池csv：{len(pool_rows)} 只股票，{len(history_rows)} 条出入池记录")
+        return None
 
-    # 情况1: 监控池文件不存在（首次运行）
-    if not os.path.exists(pool_file):
-        # 创建监控池文件并写入标题行
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, code):
+        return code in self.entries
+
+    #股票代码-名称字典
+    def to_code_name_map(self):
+        return {code: entry[0] for code, entry in self.entries.items()}
+
+    #批量入池，返回新增的[(code, name, price), ...]
+    def add(self, code_name_map, now_price, current_time):
+        with self._lock:
+            added = [(code, name, now_price.get(code, None))
+                     for code, name in code_name_map.items() if code not in self.entries]
+            if not added:
+                return added
+
+            conn = get_connection(self.db_path)
+            with conn:
+                conn.executemany(f"INSERT OR REPLACE INTO {POOL_TABLE} VALUES (?, ?, ?, ?)",
+                                 [(code, name, current_time, price) for code, name, price in added])
+            self.journal.record([(code, name, 'entry', current_time, price) for code, name, price in added])
+
+            for code, name, price in added:
+                self.entries[code] = (name, current_time, price)
+            return added
+
+    #批量出池，返回移出的[(code, name, price), ...]
+    def remove(self, codes, now_price, current_time):
+        with self._lock:
+            removed = [(code, self.entries[code][0], now_price.get(code, None))
+                       for code in codes if code in self.entries]
+            if not removed:
+                return removed
+
+            conn = get_connection(self.db_path)
+            with conn:
+                conn.executemany(f"DELETE FROM {POOL_TABLE} WHERE stock_code = ?",
+                                 [(code,) for code, _, _ in removed])
+            self.journal.record([(code, name, 'remove', current_time, price) for code, name, price in removed])
+
+            for code, _, _ in removed:
+                del self.entries[code]
+            return removed
+
+    #某只股票的出入池记录（按时间排序）
+    def query_history(self, stock_code):
+        return self.journal.query_history(stock_code)
+
+    #导出为monitoring_pool.csv（兼容旧格式）
+    def export_csv(self):
+        pool_file = os.path.join(get_monitoring_dir(), 'monitoring_pool.csv')
+        with self._lock:
+            entries = list(self.entries.items())
         with open(pool_file, 'w', newline='', encoding='utf-8') as f:
             writer = csv.writer(f)
             writer.writerow(['stock_code', 'stock_name', 'entry_time', 'entry_price'])
+            for code, (name, entry_time, price) in entries:
+                writer.writerow([code, name, entry_time, price])
+        return pool_file
+
 
-            # 写入所有股票数据
-            for code, name in code_name_map.items():
-                # 获取当前价格，如果now_price中没有该股票代码，则用None表示
-                price = now_price.get(code, None)
-                writer.writerow([code, name, current_time, price])
+#csv中的价格为字符串，空值或None转换为None
+def _to_price(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
         return None
 
-    # 情况2: 监控池文件已存在
-    # 读取现有监控池数据，构建现有股票代码集合
-    existing_codes = set()
-    # 检查哪些是新增的
-    with open(pool_file, 'r', newline='', encoding='utf-8') as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            code = row['stock_code']
-            existing_codes.add(code)
-
-    # 获取当前股票代码集合
-    current_codes = set(code_name_map.keys())
-
-    # 计算新增的股票代码（当前有但监控池中没有的）
-    added_codes = current_codes - existing_codes
-
-    # 处理新增的股票
-    if added_codes:
-        # 将新增股票追加到监控池文件
-        with open(pool_file, 'a', newline='', encoding='utf-8') as f_pool:
-            writer_pool = csv.writer(f_pool)
-            for code in added_codes:
-                name = code_name_map[code]
-                price = now_price.get(code, None)
-                writer_pool.writerow([code, name, current_time, price])
-
-        # 将新增股票记录到历史文件（入池记录）
-        with open(history_file, 'a', newline='', encoding='utf-8') as f_hist:
-            writer_hist = csv.writer(f_hist)
-            # 如果历史文件不存在，则写入标题行
-            if not os.path.exists(history_file) or os.path.getsize(history_file) == 0:
-                writer_hist.writerow(['stock_code', 'stock_name', 'action', 'time', 'price'])
-
-            for code in added_codes:
-                name = code_name_map[code]
-                price = now_price.get(code, None)
-                writer_hist.writerow([code, name, 'entry', current_time, price])
-
-        # 打印入池提示信息
-        for code in added_codes:
-            name = code_name_map[code]
-            price = now_price.get(code, "未知")  # 处理价格可能为None的情况
-            print(f"{current_time} 股票 {name}({code}) 以价格 {price} 进入监控池。")
+
+_monitoring_pool = None
+_monitoring_pool_lock = threading.Lock()
+
+#全局共享的监控池对象
+def get_monitoring_pool_store():
+    global _monitoring_pool
+    with _monitoring_pool_lock:
+        if _monitoring_pool is None:
+            _monitoring_pool = MonitoringPool()
+    return _monitoring_pool
+
+
+#将符合条件的股票加入监控池，并记录入池信息
+def connect_monitoring_pool(code_name_map, now_price):
+    current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+    added = get_monitoring_pool_store().add(code_name_map, now_price, current_time)
+
+    # 打印入池提示信息
+    for code, name, price in added:
+        price = price if price is not None else "未知"  # 处理价格可能为None的情况
+        print(f"{current_time} 股票 {name}({code}) 以价格 {price} 进入监控池。")
 
     return None
 
 #将监控池中不再符合条件的股票移出，并记录移出信息
 def remove_from_monitoring_pool(code_name_map, now_price):
+    current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
-    # 确定目标文件夹路径
-    base_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-    data_dir = os.path.join(base_dir, 'stock_project', 'data', 'monitoring_pool')
-    pool_file = os.path.join(data_dir, 'monitoring_pool.csv')
-    history_file = os.path.join(data_dir, 'monitoring_history.csv')
+    removed = get_monitoring_pool_store().remove(code_name_map.keys(), now_price, current_time)
 
-    current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    # 打印移出提示信息
+    for code, name, price in removed:
+        price = price if price is not None else "未知"
+        print(f"{current_time} 股票 {name}({code}) 以价格 {price} 移出监控池。")
 
-    # 如果监控池文件不存在，则无需处理
-    if not os.path.exists(pool_file):
-        return
-
-    # 读取现有监控池数据
-    removed_stocks = []
-    updated_rows = []
-
-    with open(pool_file, 'r', newline='', encoding='utf-8') as f:
-        reader = csv.DictReader(f)
-        fieldnames = reader.fieldnames
-
-        for row in reader:
-            code = row['stock_code']
-            # 如果当前股票不在传入的code_name_map中，则需要移出
-            if code in code_name_map:
-                current_price = now_price.get(code, None)
-                removed_stocks.append({
-                    'code': code,
-                    'name': row['stock_name'],
-                    'entry_time': row['entry_time'],
-                    'exit_price': current_price
-                })
-            else:
-                updated_rows.append(row)
-
-    # 如果有需要移出的股票
-    if removed_stocks:
-        # 更新监控池文件（移除股票）
-        with open(pool_file, 'w', newline='', encoding='utf-8') as f_pool:
-            writer = csv.DictWriter(f_pool, fieldnames=fieldnames)
-            writer.writeheader()
-            writer.writerows(updated_rows)
-
-        # 将移出记录添加到历史文件
-        with open(history_file, 'a', newline='', encoding='utf-8') as f_hist:
-            writer_hist = csv.writer(f_hist)
-            # 如果历史文件不存在或为空，写入标题行
-            if not os.path.exists(history_file) or os.path.getsize(history_file) == 0:
-                writer_hist.writerow(['stock_code', 'stock_name', 'action', 'time', 'price'])
-
-            for stock in removed_stocks:
-                writer_hist.writerow([
-                    stock['code'],
-                    stock['name'],
-                    'remove',
-                    current_time,
-                    stock['exit_price']
-                ])
-
-        # 打印移出提示信息
-        for stock in removed_stocks:
-            price = stock['exit_price'] if stock['exit_price'] is not None else "未知"
-            print(f"{current_time} 股票 {stock['name']}({stock['code']}) 以价格 {price} 移出监控池。")
+    return None
 
 
 def get_monitoring_pool():
-    # 确定目标文件夹路径
-    base_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-    data_dir = os.path.join(base_dir, 'stock_project', 'data', 'monitoring_pool')
-    pool_file = os.path.join(data_dir, 'monitoring_pool.csv')
-
-    # 如果监控池文件不存在，返回空字典
-    if not os.path.exists(pool_file):
-        return {}
-
-    # 读取监控池文件
-    code_name_map = {}
-    with open(pool_file, 'r', newline='', encoding='utf-8') as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            code = row['stock_code']
-            name = row['stock_name']
-            code_name_map[code] = name
-
-    return code_name_map
\ No newline at end of file
+    return get_monitoring_pool_store().to_code_name_map()
+
+
+#导出监控池csv（程序退出时调用）
+def export_monitoring_pool():
+    return get_monitoring_pool_store().export_csv()
@@ -1,115 +1,43 @@
 #获取阳包阴的技术形态/阴包阳的技术形态
-
-#处理阳包阴数据
-def get_bullish_cover_bearish(code_name_map,kline_10days_data,now_price , open_prices):
-    filtered_data = {}
-    filtered_now_price = {}
-    filtered_open_prices = {}
-
-    #先筛选
-    for code in code_name_map.keys():
-        if code in kline_10days_data:
-            filtered_data[code] = kline_10days_data[code]
-
-        if code in now_price:
-            filtered_now_price[code] = now_price[code]
-
-        if code in open_prices:
-            filtered_open_prices[code] = open_prices[code]
-
-    result = {}
-    max_search_days = 5
-    for code, kline_data in filtered_data.items():
-        # 检查是否有必要的数据
-        if code not in filtered_now_price or code not in filtered_open_prices:
-            continue
-
-        # 获取当前价格和开盘价
-        current_price = filtered_now_price[code]
-        open_price = filtered_open_prices[code]
-
-        # 开盘价空值处理
-        if open_price is None:
-            open_price = current_price
-
-        # 检查是否为阳线（当前价大于开盘价）
-        if current_price <= open_price:
-            continue
-
-        # 在历史数据中寻找阴线（从后往前搜索）
-        found_bearish = False
-        bearish_high = 0
-
-        # 从最近一天开始向前搜索（最多max_search_days天）
-        for i in range(min(max_search_days, len(kline_data))):
-            # 获取历史数据（索引-1表示最近一天，-2表示前一天，依此类推）
-            day_data = kline_data[-1 - i]
-            status = day_data[2]  # 涨跌状态
-
-            # 找到阴线
-            if status == -1:
-                found_bearish = True
-                bearish_high = day_data[0]  # 阴线的最高价
-                break
-
-        # 如果找到阴线且当前价高于阴线最高价
-        if found_bearish and current_price > bearish_high:
-            result[code] = code_name_map[code]
-
-    return result
-
-
-# 处理阴包阳数据
-def get_bearish_cover_bullish(code_name_map, kline_10days_data, now_price, open_prices):
-    # 筛选有效数据
-    filtered_data = {}
-    filtered_now_price = {}
-    filtered_open_prices = {}
-
-    for code in code_name_map.keys():
-        if code in kline_10days_data:
-            filtered_data[code] = kline_10days_data[code]
-        if code in now_price:
-            filtered_now_price[code] = now_price[code]
-        if code in open_prices:
-            filtered_open_prices[code] = open_prices[code]
-
-    result = {}
-    max_search_days = 5
-
-    for code, kline_data in filtered_data.items():
-        # 确保有当前价格和开盘价数据
-        if code not in filtered_now_price or code not in filtered_open_prices:
-            continue
-
-        current_price = filtered_now_price[code]
-        open_price = filtered_open_prices[code]
-
-        # 开盘价空值处理
-        if open_price is None:
-            open_price = current_price
-
-        # 检查是否为阴线（当前价小于开盘价）
-        if current_price >= open_price:
-            continue
-
-        # 在历史数据中寻找阳线（从后往前搜索）
-        found_bullish = False
-        bullish_low = 0
-
-        # 从最近一天开始向前搜索（最多max_search_days天）
-        for i in range(min(max_search_days, len(kline_data))):
-            day_data = kline_data[-1 - i]
-            status = day_data[2]  # 涨跌状态
-
-            # 找到阳线
-            if status == 1:
-                found_bullish = True
-                bullish_low = day_data[1]  # 阳线的最低价
-                break
-
-        # 如果找到阳线且当前价低于阳线最低价
-        if found_bullish and current_price < bullish_low:
-            result[code] = code_name_map[code]
-
-    return result
\ No newline at end of file
+#按全部股票向量化计算：输入为对齐的数组，返回布尔掩码
+
+import numpy as np
+
+
+#在最近max_search_days天内寻找最近一根指定状态的K线
+#返回(是否找到, 该K线对应的价格)
+def find_latest_kline(status, values, target_status, max_search_days=5):
+    # 翻转为最近一天在前，只保留搜索窗口
+    recent_status = status[:, ::-1][:, :max_search_days]
+    recent_values = values[:, ::-1][:, :max_search_days]
+
+    hit = recent_status == target_status
+    found = hit.any(axis=1)
+    # argmax取第一个True，即最近的一根
+    latest = np.argmax(hit, axis=1)
+    latest_values = np.take_along_axis(recent_values, latest[:, None], axis=1)[:, 0]
+    return found, latest_values
+
+
+#阳包阴掩码：当前为阳线，且当前价格超过最近一根阴线的最高价
+def bullish_cover_bearish_mask(current_price, open_price, high, status, max_search_days=5):
+    """
+    current_price/open_price: 一维数组，当前价格与今日开盘价（开盘价缺失时视为当前价格）
+    high/status: 二维数组（股票 × 天数），最后一列为最近一天，与价格数组按行对齐
+    """
+    open_price = np.where(np.isnan(open_price), current_price, open_price)
+    found, bearish_high = find_latest_kline(status, high, -1, max_search_days)
+    with np.errstate(invalid='ignore'):
+        return (current_price > open_price) & found & (current_price > bearish_high)
+
+
+#阴包阳掩码：当前为阴线，且当前价格跌破最近一根阳线的最低价
+def bearish_cover_bullish_mask(current_price, open_price, low, status, max_search_days=5):
+    """
+    current_price/open_price: 一维数组，当前价格与今日开盘价（开盘价缺失时视为当前价格）
+    low/status: 二维数组（股票 × 天数），最后一列为最近一天，与价格数组按行对齐
+    """
+    open_price = np.where(np.isnan(open_price), current_price, open_price)
+    found, bullish_low = find_latest_kline(status, low, 1, max_search_days)
+    with np.errstate(invalid='ignore'):
+        return (current_price < open_price) & found & (current_price < bullish_low)
@@ -1,45 +1,68 @@
 #获取各种数据，用于该技术区域的数据获取
 
-from ..src.SQLbase.SQLite_manage import query_one_stock_table
+from ..src.SQLbase.SQLite_manage import query_many_stocks
+
+from ..src.data_acquisition.trade_calendar import get_trade_calendar
+
+from .kline_store import KlineStore
 
 import pandas as pd
 
 from datetime import datetime
 
 
-# 判断当前是否处于收盘后时间（周一到周五16点后到次日6点前，或周末全天）
-def is_after_close():
-    now = datetime.now()
-    weekday = now.weekday()  # 周一0 → 周日6
+# 判断当前是否处于收盘后时间（交易日16点后到次日6点前，或非交易日全天）
+# 非交易日（周末、节假日）数据库的最新数据即为最近交易日的收盘数据
+def is_after_close(now=None):
+    now = now or datetime.now()
     hour = now.hour
 
-    # 周末全天视为收盘后
-    if weekday >= 5:  # 周六(5)或周日(6)
+    # 非交易日全天视为收盘后
+    if not get_trade_calendar().is_trade_day(now.date()):
         return True
 
-    # 工作日：16点后到次日6点前
+    # 交易日：16点后到次日6点前
     if hour >= 16 or hour < 6:
         return True
 
     return False
 
+# 当前行情所属的交易日（盘中指标的历史部分按此判断是否需要重新计算）
+# 交易日6点起为当日；交易日6点前为上一交易日（与is_after_close一致，仍是上一交易日收盘后）；
+# 非交易日为最近的交易日
+def get_trade_session(now=None):
+    now = now or datetime.now()
+    calendar = get_trade_calendar()
+    if calendar.is_trade_day(now.date()):
+        if now.hour < 6:
+            return calendar.prev_trade_day(now.date())
+        return now.date()
+    return calendar.latest_trade_day(now.date())
+
 #首先获取59个交易日的股票数据
 #用于策略集的函数
-def get_59days_data(code_name_map):
+#as_of_date:可选，格式为YYYY-MM-DD，只使用该日期（含）之前的数据，默认数据库最新数据
+def get_59days_data(code_name_map, as_of_date=None):
     table_name = "STOCK000001"
     result_dict_close = {}
-    result_dict_kline = {}
 
     # 判断是否收盘后
     after_close = is_after_close()
 
-    for stock_code, stock_name in code_name_map.items():
+    # 一次查询全部股票，在数据库内过滤停牌并只取最近60个交易日
+    # 结果已按(code, date)升序排列
+    all_data = query_many_stocks(table_name, list(code_name_map.keys()), last_n=60, end=as_of_date,
+                                 columns=['open', 'high', 'low', 'close'], trading_only=True)
+    if isinstance(all_data, str):
+        print(all_data)
+        return result_dict_close, KlineStore(code_name_map.keys())
+
+    grouped_data = dict(tuple(all_data.groupby('code', sort=False)))
+    empty_data = all_data.iloc[0:0]
 
-        stock_data: pd.DataFrame = query_one_stock_table(table_name, stock_code)
-        stock_data = stock_data[stock_data['tradestatus'] == 1]
+    for stock_code, stock_name in code_name_map.items():
 
-        # 确保数据按日期升序排列（最早日期在前）
-        stock_data = stock_data.sort_values(by='date', ascending=True)
+        stock_data: pd.DataFrame = grouped_data.get(stock_code, empty_data)
         stock_data = stock_data.reset_index(drop=True)  # 重置索引确保顺序
 
         #----------------------------------------------------
@@ -54,57 +77,9 @@ def get_59days_data(code_name_map):
         # 将股票代码和收盘价列表组合成键值对
         result_dict_close[stock_code] = close_prices
 
-        #----------------------------------------------------
-        # 获取2：获取最后10个交易日的最高价、最低价和K线状态
-        if after_close:
-            # 收盘后：取倒数第2个到倒数第11个（共10条）
-            last_10_data = stock_data.iloc[-11:-1]
-        else:
-            # 交易时间：正常取最后10条
-            last_10_data = stock_data.tail(10)
-
-        kline_status_list = []
-
-        for i in range(len(last_10_data)):
-            current_day = last_10_data.iloc[i]
-
-            # 使用开盘价和收盘价判断K线状态
-            open_price = current_day['open']
-            close_price = current_day['close']
-
-            if close_price > open_price:
-                status = 1  # 阳线（收盘价高于开盘价）
-            elif close_price < open_price:
-                status = -1  # 阴线（收盘价低于开盘价）
-            else:
-                status = 0  # 平线（收盘价等于开盘价）
-
-            kline_status_list.append([
-                current_day['high'],
-                current_day['low'],
-                status,
-                current_day['open'],
-                current_day['close']
-            ])
-
-        result_dict_kline[stock_code] = kline_status_list
-
-    return result_dict_close , result_dict_kline
-
-def get_60days_close_data(stock_59days_close_data,now_price):
-    result = {}
-
-    # 遍历所有股票代码
-    for stock_code in stock_59days_close_data:
-        # 检查该股票是否有实时价格
-        if stock_code in now_price:
-            # 获取59个历史收盘价
-            historical_prices = stock_59days_close_data[stock_code]
-            # 获取实时价格
-            current_price = now_price[stock_code]
-            # 组合成60个价格的列表
-            combined_prices = historical_prices + [current_price]
-            # 添加到结果字典
-            result[stock_code] = combined_prices
-
-    return result
\ No newline at end of file
+    #----------------------------------------------------
+    # 获取2：获取最后10个交易日的最高价、最低价和K线状态
+    # 收盘后跳过当日数据，取倒数第2个到倒数第11个（共10条）
+    kline_store = KlineStore.from_frame(all_data, list(code_name_map.keys()), days=10, skip_last=after_close)
+
+    return result_dict_close , kline_store
@@ -1,72 +1,54 @@
 #计算流通市值的函数
 #以上一交易日的收盘流通市值为准，并非实时数据
+#全部股票一次查询计算，结果按日缓存，同一天内重复筛选不再查询数据库
 
-from ..src.SQLbase.SQLite_manage import query_one_stock_table
+from datetime import date
 
+import numpy as np
+import pandas as pd
 
-def get_float_market_cap(stock_code: str) -> float:
-    """
-    计算单个股票的流通市值（上一个交易日）
-
-    参数:
-        stock_code: 带前缀的股票代码 (如'sz.000001')
-
-    返回:
-        流通市值（单位：元），如果无法计算则返回None
-    """
-    table_name = "STOCK000001"
-
-    # 获取股票数据
-    stock_data = query_one_stock_table(table_name, stock_code)
-
-    # 过滤停牌数据
-    stock_data = stock_data[stock_data['tradestatus'] == 1]
-
-    # 检查是否有有效数据
-    if stock_data.empty:
-        return None
+from ..src.SQLbase.SQLite_manage import query_many_stocks
 
-    # 获取最后一个交易日的数据
-    last_row = stock_data.iloc[-1]
+# 流通市值缓存：{'date': 计算日期, 'caps': 股票代码为索引的流通市值Series}
+_market_cap_cache = {'date': None, 'caps': pd.Series(dtype=float)}
 
-    # 获取必要字段
-    volume = last_row['volume']  # 成交量（股）
-    turn = last_row['turn']  # 换手率（百分比）
-    close = last_row['close']  # 收盘价（元）
 
-    # 检查换手率是否为0（避免除零错误）
-    if turn == 0:
-        return None
-
-    # 计算流通股数量：成交量 / (换手率/100)
-    float_shares = volume / (turn / 100)
-
-    # 计算流通市值：流通股数量 × 收盘价
-    float_market_cap = float_shares * close
-
-    return float_market_cap
-
-
-def filter_by_market_cap(code_name_map: dict) -> dict:
+def get_float_market_caps(codes) -> pd.Series:
     """
-    筛选流通市值小于500亿的股票
+    一次计算多只股票的流通市值（上一个交易日），当天已计算过的股票直接使用缓存
 
     参数:
-        code_name_map: 股票代码-名称映射字典
+        codes: 带前缀的股票代码列表
 
     返回:
-        筛选后的股票代码-名称映射字典
+        以股票代码为索引的流通市值Series（单位：元），无法计算的为NaN
     """
-    filtered_map = {}
-
-    for stock_code, stock_name in code_name_map.items():
-        # 获取流通市值
-        market_cap = get_float_market_cap(stock_code)
-
-        max_market_cap = 5e10
-
-        # 检查市值是否有效且小于500亿
-        if market_cap is not None and market_cap < max_market_cap:  # 500亿 = 5e10
-            filtered_map[stock_code] = stock_name
-
-    return filtered_map
\ No newline at end of file
+    table_name = "STOCK000001"
+    codes = list(codes)
+
+    # 跨日后清空缓存
+    today = date.today()
+    if _market_cap_cache['date'] != today:
+        _market_cap_cache['date'] = today
+        _market_cap_cache['caps'] = pd.Series(dtype=float)
+
+    cached = _market_cap_cache['caps']
+    missing = [code for code in codes if code not in cached.index]
+    if missing:
+        # 一次查询全部股票，在数据库内过滤停牌数据，每只股票只取最后一个交易日
+        last_rows = query_many_stocks(table_name, missing, last_n=1,
+                                      columns=['volume', 'turn', 'close'], trading_only=True)
+        if isinstance(last_rows, str):
+            print(last_rows)
+            return pd.Series(np.nan, index=codes)
+
+        # 流通市值 = 成交量 / (换手率/100) × 收盘价，换手率为0时无法计算（避免除零错误）
+        turn = last_rows['turn'].where(last_rows['turn'] != 0)
+        market_caps = pd.Series((last_rows['volume'] / (turn / 100) * last_rows['close']).to_numpy(),
+                                index=last_rows['code'])
+
+        # 没有交易数据的股票同样缓存为NaN，避免重复查询
+        cached = pd.concat([cached, market_caps.reindex(missing)])
+        _market_cap_cache['caps'] = cached
+
+    return cached.reindex(codes)
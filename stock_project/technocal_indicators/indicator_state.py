@@ -0,0 +1,159 @@
+#盘中增量指标状态
+#盘中历史收盘价不会变化，每天只根据历史数据预先计算一次固定部分：
+#   均线：前(周期-1)日收盘价之和与有效天数
+#   EMA/MACD：昨日的EMA、DEA
+#   KDJ：昨日的K、D值，以及前8日的最高价、最低价
+#每次拿到新行情时，每只股票每个指标只需常数次运算即可得到今日的值，
+#计算量与均线周期、窗口长度无关，可以把轮询间隔缩短到几秒
+
+"""
+KDJ采用(9, 3, 3)参数，历史部分使用10日K线数据计算，K、D初始值为50
+MACD采用(12, 26, 9)参数，EMA使用59日收盘价计算
+"""
+
+import numpy as np
+import pandas as pd
+
+from .sma_engine import SMAEngine
+from .get_data_for_indicators import get_trade_session
+
+
+class IndicatorState:
+    """
+    参数:
+    close_data -- 字典，键为股票代码，值为历史收盘价列表（最新价格在最后）
+    kline_store -- KlineStore，最近10日K线，用于KDJ
+    sma_periods -- 需要预先计算的均线周期
+    ema_periods -- 需要预先计算的EMA周期（MACD使用的12、26总会计算）
+    """
+
+    def __init__(self, close_data, kline_store=None, sma_periods=(5, 10, 20, 60), ema_periods=()):
+        # 预先计算时行情所属的交易日，进入新的交易日后需要重新构建
+        self.trade_session = get_trade_session()
+
+        self.engine = SMAEngine(close_data)
+        self.codes = self.engine.codes
+        close = self.engine.close
+
+        # ------------------------------------------------------------------
+        # 均线：前(周期-1)日收盘价之和与有效天数
+        self.sma_sum = {}
+        self.sma_count = {}
+        for period in sma_periods:
+            if not 3 <= period <= self.engine.history_days + 1:
+                raise ValueError(f"均线周期必须在3到{self.engine.history_days + 1}之间")
+            window = close[:, close.shape[1] - (period - 1):]
+            self.sma_sum[period] = np.nansum(window, axis=1)
+            self.sma_count[period] = np.count_nonzero(~np.isnan(window), axis=1)
+
+        # ------------------------------------------------------------------
+        # EMA与MACD：昨日的EMA、DEA，没有历史数据的为NaN
+        ema_history = {period: self._history_ema_frame(close, period) for period in set(ema_periods) | {12, 26}}
+        self.ema_prev = {period: frame.iloc[-1].to_numpy() for period, frame in ema_history.items()}
+        dif_history = ema_history[12] - ema_history[26]
+        self.dea_prev = dif_history.ewm(span=9, adjust=False).mean().iloc[-1].to_numpy()
+
+        # ------------------------------------------------------------------
+        # KDJ：昨日的K、D值与前8日的最高价、最低价
+        self.k_prev = np.full(len(self.codes), 50.0)
+        self.d_prev = np.full(len(self.codes), 50.0)
+        self.high_8days = np.full(len(self.codes), np.nan)
+        self.low_8days = np.full(len(self.codes), np.nan)
+        if kline_store is not None:
+            self._prepare_kdj(kline_store)
+
+    def __len__(self):
+        return len(self.codes)
+
+    #历史EMA序列，行是日期，列是股票（左侧NaN会被跳过）
+    @staticmethod
+    def _history_ema_frame(close, period):
+        return pd.DataFrame(close.T).ewm(span=period, adjust=False).mean()
+
+    #根据K线数据逐日计算K、D值，按股票向量化
+    def _prepare_kdj(self, kline_store):
+        days = kline_store.days
+        high = kline_store.take('high', self.codes)
+        low = kline_store.take('low', self.codes)
+        close = kline_store.take('close', self.codes)
+
+        with np.errstate(invalid='ignore'):
+            for i in range(days):
+                start = max(0, i - 8)
+                rsv = self._rsv(close[:, i],
+                                self._nan_reduce(np.fmax, high[:, start:i + 1]),
+                                self._nan_reduce(np.fmin, low[:, start:i + 1]))
+                # 当日无数据的股票保持原值
+                has_data = ~np.isnan(rsv)
+                self.k_prev = np.where(has_data, self.k_prev * 2 / 3 + rsv / 3, self.k_prev)
+                self.d_prev = np.where(has_data, self.d_prev * 2 / 3 + self.k_prev / 3, self.d_prev)
+
+        self.high_8days = self._nan_reduce(np.fmax, high[:, -8:])
+        self.low_8days = self._nan_reduce(np.fmin, low[:, -8:])
+
+    #按列取最大/最小值，忽略NaN，整行为NaN时结果为NaN
+    @staticmethod
+    def _nan_reduce(func, values):
+        return func.reduce(values, axis=1)
+
+    #未成熟随机值，最高价等于最低价时取50
+    @staticmethod
+    def _rsv(price, highest, lowest):
+        price_range = highest - lowest
+        with np.errstate(invalid='ignore', divide='ignore'):
+            rsv = (price - lowest) / price_range * 100
+        return np.where(price_range == 0, 50.0, rsv)
+
+    #是否已进入新的交易日，需要重新预先计算
+    #按交易日历判断：交易日6点起切换到当日，午夜和非交易日不会触发
+    def is_stale(self, now=None):
+        return get_trade_session(now) != self.trade_session
+
+    def update(self, now_price, high_price=None, low_price=None):
+        """
+        根据最新行情计算今日的指标值
+        now_price: 字典，键为股票代码，值为当前价格
+        high_price/low_price: 可选，今日最高价、最低价字典，缺省时使用当前价格
+
+        返回字典（数组均与self.codes对齐）：
+            'valid' -- 是否有当前价格
+            'current_price' -- 当前价格
+            'ma5'、'ema12'等 -- 预先计算过的各周期均线
+            'dif'、'dea'、'macd' -- MACD
+            'k'、'd'、'j' -- KDJ
+        """
+        price = self.engine.align_prices(now_price)
+        result = {
+            'valid': ~np.isnan(price),
+            'current_price': price
+        }
+
+        # 均线
+        for period in self.sma_sum:
+            result[f'ma{period}'] = (self.sma_sum[period] + price) / (self.sma_count[period] + 1)
+
+        # EMA，没有历史数据时以当前价格作为初始值
+        ema = {}
+        for period, prev in self.ema_prev.items():
+            alpha = 2 / (period + 1)
+            ema[period] = np.where(np.isnan(prev), price, prev + alpha * (price - prev))
+            result[f'ema{period}'] = ema[period]
+
+        # MACD
+        dif = ema[12] - ema[26]
+        dea = np.where(np.isnan(self.dea_prev), dif, self.dea_prev + 0.2 * (dif - self.dea_prev))
+        result['dif'] = dif
+        result['dea'] = dea
+        result['macd'] = 2 * (dif - dea)
+
+        # KDJ，今日最高/最低价与前8日合并为9日区间
+        high = price if high_price is None else np.fmax(self.engine.align_prices(high_price), price)
+        low = price if low_price is None else np.fmin(self.engine.align_prices(low_price), price)
+        rsv = self._rsv(price, np.fmax(self.high_8days, high), np.fmin(self.low_8days, low))
+        k = self.k_prev * 2 / 3 + rsv / 3
+        d = self.d_prev * 2 / 3 + k / 3
+        result['k'] = k
+        result['d'] = d
+        result['j'] = 3 * k - 2 * d
+
+        return result
@@ -0,0 +1,95 @@
+#K线窗口存储
+#把全部股票最近10日的K线按字段存为连续的二维数组（股票 × 天数），
+#配合股票代码到行号的索引，替代每只股票一个[最高价, 最低价, 状态, 开盘价, 收盘价]列表的存储方式
+#数据右对齐：最后一列为最近一个交易日，历史不足的股票左侧用NaN补齐（状态补0）
+
+import numpy as np
+import pandas as pd
+
+# 兼容旧格式时的字段顺序
+KLINE_FIELDS = ('high', 'low', 'status', 'open', 'close')
+
+
+class KlineStore:
+    """
+    参数:
+    codes -- 股票代码列表，决定数组的行顺序
+    days -- 保留的交易日数
+    """
+
+    def __init__(self, codes, days=10):
+        self.days = days
+        self.codes = np.array(list(codes), dtype=object)
+        self.code_index = {code: i for i, code in enumerate(self.codes)}
+
+        n = len(self.codes)
+        self.high = np.full((n, days), np.nan)
+        self.low = np.full((n, days), np.nan)
+        self.open = np.full((n, days), np.nan)
+        self.close = np.full((n, days), np.nan)
+        # 1为阳线，-1为阴线，0为平线或无数据
+        self.status = np.zeros((n, days), dtype=np.int8)
+        # 每只股票实际的K线天数
+        self.length = np.zeros(n, dtype=np.int16)
+
+    @classmethod
+    def from_frame(cls, data, codes, days=10, skip_last=False):
+        """
+        由批量查询结果向量化构建
+        data: DataFrame，包含code、open、high、low、close列，按(code, date)升序排列
+        codes: 股票代码列表
+        skip_last: 为True时跳过每只股票最新的一条数据（收盘后数据库已包含当日数据）
+        """
+        store = cls(codes, days)
+        if data is None or data.empty:
+            return store
+
+        # 每条数据距离该股票最新一条的位置，0为最新
+        position = data.groupby('code', sort=False).cumcount(ascending=False).to_numpy()
+        if skip_last:
+            position = position - 1
+
+        rows = data['code'].map(store.code_index).to_numpy()
+        keep = (position >= 0) & (position < days) & ~pd.isna(rows)
+        rows = rows[keep].astype(np.intp)
+        columns = days - 1 - position[keep]
+
+        for field in ('high', 'low', 'open', 'close'):
+            getattr(store, field)[rows, columns] = data[field].to_numpy(dtype=float)[keep]
+        # 开盘价或收盘价缺失时记为0，np.sign(NaN)转换为int8的结果不确定
+        change = store.close[rows, columns] - store.open[rows, columns]
+        store.status[rows, columns] = np.where(np.isnan(change), 0, np.sign(change))
+        np.add.at(store.length, rows, 1)
+        return store
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __contains__(self, code):
+        return code in self.code_index
+
+    #兼容旧格式：返回(天数 × 5)数组，列顺序为[最高价, 最低价, 状态, 开盘价, 收盘价]
+    def __getitem__(self, code):
+        row = self.code_index[code]
+        start = self.days - self.length[row]
+        return np.column_stack([getattr(self, field)[row, start:] for field in KLINE_FIELDS])
+
+    #按给定代码顺序返回行号，不存在的为-1
+    def rows(self, codes):
+        return np.array([self.code_index.get(code, -1) for code in codes], dtype=np.intp)
+
+    #按给定代码顺序取出某个字段，不存在的股票整行为NaN（状态为0）
+    def take(self, field, codes):
+        values = getattr(self, field)
+        rows = self.rows(codes)
+        if len(self.codes) == 0:
+            return np.full((len(rows), self.days), 0 if field == 'status' else np.nan, dtype=values.dtype)
+        result = values[rows]
+        missing = rows < 0
+        result[missing] = 0 if field == 'status' else np.nan
+        return result
+
+    #占用内存（字节）
+    @property
+    def nbytes(self):
+        return sum(getattr(self, field).nbytes for field in KLINE_FIELDS) + self.length.nbytes
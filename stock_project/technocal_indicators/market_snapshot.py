@@ -0,0 +1,56 @@
+#每轮策略循环共享的行情快照
+#一轮循环只请求一次实时行情，买入、卖出各阶段都从同一份快照取价，保证各阶段价格一致
+
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+#获取实时数据（pytdx）
+from ..src.data_acquisition.stock_get_tdx import pytdx_nowdata_for_codes
+
+
+class MarketSnapshot:
+    """
+    参数:
+    codes -- 本轮需要行情的全部股票代码（sh./sz.前缀）
+    api -- pytdx连接或连接池
+    """
+
+    def __init__(self, codes, api):
+        # 快照时间，即请求行情的时间
+        self.timestamp = datetime.now()
+
+        data = pytdx_nowdata_for_codes(list(codes), api=api)
+        # 未取到行情的股票（连接池会给出），这些股票本轮没有价格
+        self.missing_codes = data.attrs.get('missing_codes', [])
+        if data.empty:
+            self.quotes = pd.DataFrame(columns=['price', 'open', 'high', 'low'])
+            return
+
+        # 构造完整股票代码作为索引（确保6位数字格式）
+        market_prefix = pd.Series(np.where(data['market'] == 1, 'sh.', 'sz.'), index=data.index)
+        data.index = market_prefix + data['code'].astype(str).str.zfill(6)
+        self.quotes = data[~data.index.duplicated(keep='last')]
+
+    def __len__(self):
+        return len(self.quotes)
+
+    def __str__(self):
+        text = f"行情快照 {self.timestamp.strftime('%H:%M:%S')}，共 {len(self.quotes)} 只股票"
+        if self.missing_codes:
+            text += f"，{len(self.missing_codes)} 只未获取到行情"
+        return text
+
+    #返回(当前价字典, 开盘价字典)
+    def get_now_price(self, code_name_map):
+        codes = self.quotes.index.intersection(list(code_name_map.keys()))
+        quotes = self.quotes.loc[codes]
+        now_price = dict(zip(codes, quotes['price']))
+        open_prices = dict(zip(codes, quotes['open']))
+        return now_price, open_prices
+
+    #今日盘中最高价字典，用作回撤止损的高水位
+    def get_high_prices(self, code_name_map):
+        codes = self.quotes.index.intersection(list(code_name_map.keys()))
+        return dict(zip(codes, self.quotes.loc[codes, 'high']))
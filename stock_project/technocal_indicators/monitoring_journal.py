@@ -0,0 +1,182 @@
+#监控池出入池记录日志
+#出入池事件先缓存在内存，由后台线程定时或在程序退出时批量写入：
+#   1.按交易日追加到data/monitoring_pool/journal/journal_YYYY-MM-DD.csv，往日文件压缩为.csv.gz
+#   2.同时批量写入trade-data.db的MONITORING_HISTORY表，作为按股票查询的索引
+
+import os
+import csv
+import gzip
+import shutil
+import threading
+from datetime import date
+
+#数据库
+from ..src.SQLbase.SQLite_manage import get_data_dir
+from ..src.SQLbase.SQLite_connect import get_connection
+
+HISTORY_TABLE = 'MONITORING_HISTORY'
+JOURNAL_FIELDS = ['stock_code', 'stock_name', 'action', 'time', 'price']
+
+
+#出入池记录索引表
+def create_history_table(conn):
+    conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS {HISTORY_TABLE} (
+            id            INTEGER PRIMARY KEY AUTOINCREMENT,
+            stock_code    TEXT    NOT NULL,
+            stock_name    TEXT,
+            action        TEXT    NOT NULL,
+            time          TEXT    NOT NULL,
+            price         REAL
+        )
+    """)
+    conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{HISTORY_TABLE}_code_time ON {HISTORY_TABLE} (stock_code, time)")
+    conn.commit()
+    return None
+
+
+class MonitoringJournal:
+    """
+    参数:
+    db_path -- 索引数据库路径，默认data/trade-data.db
+    journal_dir -- 日志目录，默认data/monitoring_pool/journal
+    max_buffer -- 缓存事件数达到该值时立即写入
+    """
+
+    def __init__(self, db_path=None, journal_dir=None, max_buffer=500):
+        self.db_path = db_path or os.path.join(get_data_dir(), 'trade-data.db')
+        self.journal_dir = journal_dir or os.path.join(get_data_dir(), 'monitoring_pool', 'journal')
+        os.makedirs(self.journal_dir, exist_ok=True)
+        self.max_buffer = max_buffer
+
+        # 每项为(stock_code, stock_name, action, time, price)
+        self.buffer = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+        create_history_table(get_connection(self.db_path))
+        self.rotate()
+
+    #缓存事件，缓存已满时立即写入
+    def record(self, events):
+        with self._lock:
+            self.buffer.extend(events)
+            full = len(self.buffer) >= self.max_buffer
+        if full:
+            self.flush()
+        return None
+
+    def _journal_file(self, day):
+        return os.path.join(self.journal_dir, f'journal_{day}.csv')
+
+    #按事件日期分组追加到当日日志
+    def _append_journal(self, events):
+        by_day = {}
+        for event in events:
+            by_day.setdefault(event[3][:10], []).append(event)
+        for day, day_events in by_day.items():
+            journal_file = self._journal_file(day)
+            new_file = not os.path.exists(journal_file)
+            with open(journal_file, 'a', newline='', encoding='utf-8') as f:
+                writer = csv.writer(f)
+                if new_file:
+                    writer.writerow(JOURNAL_FIELDS)
+                writer.writerows(day_events)
+        return None
+
+    #把缓存的事件写入日志文件和索引表
+    def flush(self):
+        with self._flush_lock:
+            with self._lock:
+                events, self.buffer = self.buffer, []
+            if not events:
+                return 0
+
+            # 先提交索引表，出错时回滚，事件放回缓存头部等待下次写入
+            try:
+                conn = get_connection(self.db_path)
+                with conn:
+                    conn.executemany(f"""
+                        INSERT INTO {HISTORY_TABLE} (stock_code, stock_name, action, time, price)
+                        VALUES (?, ?, ?, ?, ?)
+                    """, events)
+            except Exception:
+                with self._lock:
+                    self.buffer[:0] = events
+                raise
+
+            # 日志文件只写入已提交的这一批，不放回缓存，避免下次写入时重复追加
+            try:
+                self._append_journal(events)
+            except OSError as e:
+                print(f"写入监控日志文件出错，{len(events)} 条记录仅保存在索引表中: {str(e)}")
+
+            self.rotate()
+            return len(events)
+
+    #压缩往日的日志文件
+    def rotate(self):
+        today = date.today().strftime("%Y-%m-%d")
+        for file_name in os.listdir(self.journal_dir):
+            if not (file_name.startswith('journal_') and file_name.endswith('.csv')):
+                continue
+            if file_name[len('journal_'):-len('.csv')] >= today:
+                continue
+
+            file_path = os.path.join(self.journal_dir, file_name)
+            try:
+                with open(file_path, 'rb') as f_in, gzip.open(file_path + '.gz', 'ab') as f_out:
+                    shutil.copyfileobj(f_in, f_out)
+                os.remove(file_path)
+            except OSError as e:
+                print(f"压缩监控日志出错: {str(e)}")
+        return None
+
+    #某只股票的出入池记录（按时间排序），先写入缓存中的事件
+    def query_history(self, stock_code):
+        self.flush()
+        conn = get_connection(self.db_path)
+        return conn.execute(f"""
+            SELECT stock_code, stock_name, action, time, price FROM {HISTORY_TABLE}
+            WHERE stock_code = ? ORDER BY time, id
+        """, (stock_code,)).fetchall()
+
+    #后台定时写入
+    def start_background(self, interval=5):
+        if self._thread is not None and self._thread.is_alive():
+            return None
+
+        def run():
+            while not self._stop_event.wait(interval):
+                try:
+                    self.flush()
+                except Exception as e:
+                    print(f"写入监控日志出错: {str(e)}")
+
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=run, daemon=True)
+        self._thread.start()
+        return None
+
+    #停止后台线程并写入剩余事件
+    def stop_background(self):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.flush()
+        return None
+
+
+_monitoring_journal = None
+_monitoring_journal_lock = threading.Lock()
+
+#全局共享的监控日志对象
+def get_monitoring_journal():
+    global _monitoring_journal
+    with _monitoring_journal_lock:
+        if _monitoring_journal is None:
+            _monitoring_journal = MonitoringJournal()
+    return _monitoring_journal
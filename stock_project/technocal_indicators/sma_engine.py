@@ -0,0 +1,76 @@
+#全市场均线计算引擎
+#把所有股票的59日收盘价存为一个二维数组（股票 × 天数），拼接实时价格后
+#用一次累加和同时算出所有股票的各周期均线，返回与股票顺序对齐的数组
+#盘中策略使用IndicatorState在此基础上增量计算，compute用于一次性计算全部均线
+
+"""
+以五日均线为例，取前四日收盘价加当前价格求平均，
+历史数据不足周期长度时，使用全部可用数据计算
+"""
+
+import numpy as np
+import pandas as pd
+
+
+class SMAEngine:
+    """
+    参数:
+    close_data -- 字典，键为股票代码，值为历史收盘价列表（最新价格在最后）
+    history_days -- 保留的历史天数，默认59（拼接当前价格后为60）
+    """
+
+    def __init__(self, close_data, history_days=59):
+        self.history_days = history_days
+        self.codes = np.array(list(close_data.keys()), dtype=object)
+        self.code_index = {code: i for i, code in enumerate(self.codes)}
+
+        # 历史不足的股票左侧用NaN补齐
+        self.close = np.full((len(self.codes), history_days), np.nan)
+        for i, prices in enumerate(close_data.values()):
+            prices = list(prices)[-history_days:]
+            if prices:
+                self.close[i, history_days - len(prices):] = prices
+
+    def __len__(self):
+        return len(self.codes)
+
+    #按股票顺序取出当前价格，没有价格的为NaN
+    def align_prices(self, now_price):
+        return pd.Series(now_price, dtype=float).reindex(self.codes).to_numpy()
+
+    def compute(self, now_price, periods=(5, 10, 20, 60)):
+        """
+        计算全部股票的各周期均线
+        now_price: 字典，键为股票代码，值为当前价格
+        periods: 均线周期，整数，范围在3到history_days+1之间
+
+        返回字典：
+            'valid' -- 是否有当前价格（没有价格的股票不参与筛选）
+            'current_price' -- 当前价格
+            'ma5'、'ma10'等 -- 各周期均线
+        """
+        for period in periods:
+            if not 3 <= period <= self.history_days + 1:
+                raise ValueError(f"均线周期必须在3到{self.history_days + 1}之间")
+
+        current_price = self.align_prices(now_price)
+        prices = np.column_stack([self.close, current_price])
+
+        # 累加和前补一列0，任意窗口的和为两列之差
+        valid_data = ~np.isnan(prices)
+        price_sum = np.zeros((len(self.codes), prices.shape[1] + 1))
+        price_count = np.zeros((len(self.codes), prices.shape[1] + 1))
+        np.cumsum(np.where(valid_data, prices, 0.0), axis=1, out=price_sum[:, 1:])
+        np.cumsum(valid_data, axis=1, out=price_count[:, 1:])
+
+        result = {
+            'valid': ~np.isnan(current_price),
+            'current_price': current_price
+        }
+        for period in periods:
+            window_sum = price_sum[:, -1] - price_sum[:, -1 - period]
+            window_count = price_count[:, -1] - price_count[:, -1 - period]
+            with np.errstate(invalid='ignore', divide='ignore'):
+                result[f'ma{period}'] = window_sum / window_count
+
+        return result
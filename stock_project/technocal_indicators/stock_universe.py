@@ -0,0 +1,93 @@
+#股票池筛选表
+#把初筛需要的信息整理为一张表（板块、ST标记、上市日期、流通市值），
+#各筛选条件为布尔掩码，一次合并得到筛选结果，并记录每只被剔除股票的原因，便于核对
+
+import numpy as np
+import pandas as pd
+
+#市值计算
+from .get_stock_market_value import get_float_market_caps
+
+
+#根据代码判断板块：创业板以3开头，科创板以68开头，其余为主板
+def get_board(codes):
+    code_num = pd.Series(list(codes), dtype=object).str.split('.').str[-1]
+    return np.select([code_num.str.startswith('3'), code_num.str.startswith('68')],
+                     ['创业板', '科创板'], default='主板')
+
+
+def build_universe(code_name_map, stock_basic_df=None, with_market_cap=True):
+    """
+    构建股票池筛选表
+
+    参数:
+        code_name_map: 股票代码-名称映射字典
+        stock_basic_df: 可选，股票基本资料（get_stock_basic），包含code、ipo_date列
+        with_market_cap: 是否计算流通市值
+
+    返回:
+        以股票代码为索引的DataFrame，列为name、board、is_st、ipo_date、float_cap
+    """
+    codes = list(code_name_map.keys())
+    universe = pd.DataFrame({'name': list(code_name_map.values())}, index=pd.Index(codes, name='code'))
+
+    universe['board'] = get_board(codes)
+    universe['is_st'] = universe['name'].astype(str).str.contains('ST', regex=False).to_numpy()
+
+    # 上市日期，无法解析或没有资料的为NaT
+    if stock_basic_df is not None and not stock_basic_df.empty:
+        ipo_dates = pd.Series(stock_basic_df['ipo_date'].to_numpy(), index=stock_basic_df['code'])
+        ipo_dates = ipo_dates[~ipo_dates.index.duplicated(keep='last')]
+        universe['ipo_date'] = ipo_dates.reindex(codes).to_numpy()
+    else:
+        universe['ipo_date'] = pd.NaT
+
+    if with_market_cap:
+        universe['float_cap'] = get_float_market_caps(codes).to_numpy()
+    else:
+        universe['float_cap'] = np.nan
+
+    return universe
+
+
+def filter_universe(universe, filter_conditions, months=4, max_market_cap=5e10):
+    """
+    按筛选条件合并布尔掩码，在筛选表中写入passed、reason两列
+
+    参数:
+        universe: build_universe的结果
+        filter_conditions: 筛选条件字典，键与apply_stock_filters_first相同
+        months: 上市不足几个月视为新股（按30天每月计算）
+        max_market_cap: 流通市值上限（元）
+
+    返回:
+        写入结果后的筛选表
+    """
+    reasons = {}
+
+    if filter_conditions.get("exclude_gem", True):
+        reasons['创业板'] = (universe['board'] == '创业板').to_numpy()
+
+    if filter_conditions.get("exclude_star_market", True):
+        reasons['科创板'] = (universe['board'] == '科创板').to_numpy()
+
+    if filter_conditions.get("exclude_st", True):
+        reasons['ST'] = universe['is_st'].to_numpy(dtype=bool)
+
+    if filter_conditions.get("exclude_new_stock", True):
+        threshold_date = pd.Timestamp.now() - pd.Timedelta(days=30 * months)
+        reasons['新股'] = (universe['ipo_date'] > threshold_date).to_numpy()
+
+    if filter_conditions.get("exclude_market_value", True):
+        # 市值缺失（无交易数据或换手率为0）同样剔除
+        reasons['市值'] = ~(universe['float_cap'] < max_market_cap).to_numpy()
+
+    excluded = np.zeros(len(universe), dtype=bool)
+    reason = np.full(len(universe), '', dtype=object)
+    for name, mask in reasons.items():
+        excluded |= mask
+        reason[mask] = np.where(reason[mask] == '', name, reason[mask] + '、' + name)
+
+    universe['passed'] = ~excluded
+    universe['reason'] = reason
+    return universe
@@ -0,0 +1,63 @@
+#测试公共夹具
+#数据库和配置均写入pytest的临时目录，不读写项目的data目录
+
+import pytest
+
+from stock_project.src.SQLbase import SQLite_manage, SQLite_connect
+from stock_project.src.SQLbase.SQLite_connect import close_connection
+from stock_project.src.data_acquisition import trade_calendar as trade_calendar_module
+
+TABLE_NAME = 'STOCK000001'
+
+#测试用的日线数据：两只股票各5个交易日，sh.600000在2024-01-04停牌
+STOCK_ROWS = [
+    (date, code, name, 10.0 + i, 11.0 + i, 9.0 + i, 10.5 + i, 10.0 + i,
+     1e6, 1e7, 2, 1.0, 0 if (code, date) == ('sh.600000', '2024-01-04') else 1, 0.5, 0)
+    for code, name in (('sh.600000', '浦发银行'), ('sz.000001', '平安银行'))
+    for i, date in enumerate(['2024-01-02', '2024-01-03', '2024-01-04', '2024-01-05', '2024-01-08'])
+]
+
+
+#数据目录指向临时目录，测试结束后关闭本线程的数据库连接
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(SQLite_manage, 'get_data_dir', lambda: str(tmp_path))
+    monkeypatch.setattr(SQLite_connect, 'get_data_dir', lambda: str(tmp_path))
+    yield tmp_path
+    close_connection()
+
+
+#已写入STOCK_ROWS的stock-data.db，返回连接
+@pytest.fixture
+def stock_db(data_dir):
+    conn = SQLite_manage.create_stock_db(TABLE_NAME, str(data_dir / 'stock-data.db'), keep_open=True)
+    SQLite_manage.upsert_stock_rows(conn, TABLE_NAME, STOCK_ROWS)
+    return conn
+
+
+#全局交易日历替换为缓存在临时目录的新对象
+@pytest.fixture
+def trade_calendar(tmp_path, monkeypatch):
+    calendar = trade_calendar_module.TradeCalendar(str(tmp_path / 'trade_calendar.json'))
+    monkeypatch.setattr(trade_calendar_module, '_trade_calendar', calendar)
+    return calendar
+
+
+#测试用的K线数据（按(code, date)升序）：
+#   sh.600000 共12日，含平线（开盘价等于收盘价）和一条价格缺失的记录
+#   sz.000001 只有2日，少于各指标的回看天数
+#   sh.600001 无数据
+@pytest.fixture
+def kline_frame():
+    import pandas as pd
+    rows = []
+    opens = [10.0, 10.4, 10.2, 10.6, 10.6, 10.9, 11.3, None, 11.0, 11.5, 11.8, 11.2]
+    closes = [10.3, 10.1, 10.5, 10.6, 10.9, 11.4, 11.0, None, 11.6, 11.7, 11.3, 11.2]
+    for i, (open_price, close_price) in enumerate(zip(opens, closes)):
+        high = None if close_price is None else max(open_price, close_price) + 0.2
+        low = None if close_price is None else min(open_price, close_price) - 0.2
+        rows.append(('sh.600000', f'2024-01-{i + 2:02d}', open_price, high, low, close_price))
+    rows.append(('sz.000001', '2024-01-12', 9.0, 9.3, 8.8, 8.9))
+    rows.append(('sz.000001', '2024-01-13', 8.9, 9.4, 8.9, 9.2))
+    return pd.DataFrame(rows, columns=['code', 'date', 'open', 'high', 'low', 'close']).astype(
+        {'open': float, 'high': float, 'low': float, 'close': float})
@@ -0,0 +1,168 @@
+import sqlite3
+
+from stock_project.src.SQLbase.SQLite_manage import (
+    STOCK_COLUMNS,
+    _stock_index_name,
+    _migrated_tables,
+    migrate_stock_table,
+    query_many_stocks,
+    query_one_stock_table,
+    stock_rows_to_tuples,
+    upsert_stock_rows
+)
+
+from conftest import TABLE_NAME, STOCK_ROWS
+
+
+#----------------------------------------------------------
+#(code, date)索引迁移
+
+def _index_names(conn):
+    return [row[0] for row in conn.execute(
+        "SELECT name FROM sqlite_master WHERE type='index' AND tbl_name=?", (TABLE_NAME,))]
+
+
+def test_create_stock_db_builds_code_date_index(stock_db):
+    assert _stock_index_name(TABLE_NAME) in _index_names(stock_db)
+
+
+def test_migrate_existing_table_is_idempotent(data_dir):
+    # 旧版数据库：只有(date, code)主键，没有(code, date)索引
+    db_path = str(data_dir / 'old.db')
+    conn = sqlite3.connect(db_path)
+    conn.execute(f"CREATE TABLE {TABLE_NAME} (date TEXT NOT NULL, code TEXT NOT NULL, close REAL, "
+                 f"PRIMARY KEY (date, code))")
+    conn.execute(f"INSERT INTO {TABLE_NAME} VALUES ('2024-01-02', 'sh.600000', 10.0)")
+    conn.commit()
+
+    migrate_stock_table(conn, TABLE_NAME)
+    assert _stock_index_name(TABLE_NAME) in _index_names(conn)
+
+    # 重新检查（模拟新进程）时不会重复建立或报错
+    _migrated_tables.clear()
+    migrate_stock_table(conn, TABLE_NAME)
+    assert _index_names(conn).count(_stock_index_name(TABLE_NAME)) == 1
+    assert conn.execute(f"SELECT COUNT(*) FROM {TABLE_NAME}").fetchone()[0] == 1
+    conn.close()
+
+
+def test_migrate_missing_table_does_nothing(data_dir):
+    conn = sqlite3.connect(str(data_dir / 'empty.db'))
+    assert migrate_stock_table(conn, TABLE_NAME) is None
+    assert _index_names(conn) == []
+    conn.close()
+
+
+#----------------------------------------------------------
+#按股票和日期区间查询
+
+def test_query_one_stock_date_range(stock_db):
+    df = query_one_stock_table(TABLE_NAME, 'sz.000001', start='2024-01-03', end='2024-01-05')
+    assert df['date'].tolist() == ['2024-01-03', '2024-01-04', '2024-01-05']
+    assert set(df['code']) == {'sz.000001'}
+
+
+def test_query_one_stock_unknown_code_returns_message(stock_db):
+    result = query_one_stock_table(TABLE_NAME, 'sh.688000')
+    assert isinstance(result, str)
+
+
+
+#----------------------------------------------------------
+#一次查询多只股票
+
+def test_query_many_stocks_matches_per_stock_queries(stock_db):
+    codes = ['sz.000001', 'sh.600000', 'sh.688000']
+    df = query_many_stocks(TABLE_NAME, codes)
+    # 按(code, date)排序，不存在的股票没有记录
+    assert df['code'].tolist() == ['sh.600000'] * 5 + ['sz.000001'] * 5
+    for code in codes[:2]:
+        single = query_one_stock_table(TABLE_NAME, code)
+        assert df[df['code'] == code].reset_index(drop=True).equals(single)
+
+
+def test_query_many_stocks_columns_and_arrays(stock_db):
+    arrays = query_many_stocks(TABLE_NAME, ['sh.600000'], columns=['close'], as_arrays=True,
+                               start='2024-01-03', end='2024-01-04')
+    assert list(arrays.keys()) == ['code', 'date', 'close']
+    assert arrays['date'].tolist() == ['2024-01-03', '2024-01-04']
+    assert arrays['close'].tolist() == [11.5, 12.5]
+
+
+def test_query_many_stocks_errors_return_message(stock_db):
+    assert isinstance(query_many_stocks('STOCK_MISSING', ['sh.600000']), str)
+    assert isinstance(query_many_stocks(TABLE_NAME, ['sh.600000'], columns=['no_such_column']), str)
+
+
+def test_query_many_stocks_leaves_no_open_transaction(stock_db):
+    query_many_stocks(TABLE_NAME, ['sh.600000'])
+    query_many_stocks(TABLE_NAME, ['sh.600000'], columns=['no_such_column'])
+    assert not stock_db.in_transaction
+    assert stock_db.execute("SELECT name FROM temp.sqlite_master WHERE name='query_codes'").fetchone() is None
+
+
+#----------------------------------------------------------
+#最近n条与过滤停牌（在数据库内完成）
+
+def test_query_one_stock_last_n_as_of_end(stock_db):
+    df = query_one_stock_table(TABLE_NAME, 'sh.600000', end='2024-01-05', last_n=2)
+    assert df['date'].tolist() == ['2024-01-04', '2024-01-05']
+
+    df = query_one_stock_table(TABLE_NAME, 'sh.600000', end='2024-01-05', last_n=2, trading_only=True)
+    assert df['date'].tolist() == ['2024-01-03', '2024-01-05']
+
+
+def test_query_many_stocks_last_n_trading_only(stock_db):
+    codes = ['sh.600000', 'sz.000001']
+    df = query_many_stocks(TABLE_NAME, codes, last_n=3, end='2024-01-05', trading_only=True)
+    assert df[df['code'] == 'sh.600000']['date'].tolist() == ['2024-01-02', '2024-01-03', '2024-01-05']
+    assert df[df['code'] == 'sz.000001']['date'].tolist() == ['2024-01-03', '2024-01-04', '2024-01-05']
+
+
+def test_query_many_stocks_last_one_matches_window(stock_db):
+    codes = ['sh.600000', 'sz.000001']
+    for kwargs in ({}, {'end': '2024-01-04'}, {'end': '2024-01-04', 'trading_only': True}):
+        latest = query_many_stocks(TABLE_NAME, codes, last_n=1, **kwargs)
+        window = query_many_stocks(TABLE_NAME, codes, last_n=2, **kwargs).groupby('code').tail(1)
+        assert latest.reset_index(drop=True).equals(window.reset_index(drop=True))
+
+    latest = query_many_stocks(TABLE_NAME, codes, last_n=1, end='2024-01-04', trading_only=True)
+    assert latest['date'].tolist() == ['2024-01-03', '2024-01-04']
+
+
+#----------------------------------------------------------
+#批量写入
+
+def test_stock_rows_to_tuples_converts_types():
+    fields = ['date', 'code', 'open', 'close', 'volume', 'tradestatus', 'isST']
+    rows = [['2024-01-09', 'sh.600000', '10.1', '', '1200', '1', '0']]
+    values = dict(zip(STOCK_COLUMNS, stock_rows_to_tuples(fields, rows, '浦发银行')[0]))
+    assert values['code_name'] == '浦发银行'
+    assert values['open'] == 10.1
+    # 空字符串和未返回的字段写入NULL
+    assert values['close'] is None
+    assert values['high'] is None
+    assert values['tradestatus'] == 1
+
+
+def test_upsert_stock_rows_is_idempotent(stock_db):
+    count = f"SELECT COUNT(*) FROM {TABLE_NAME}"
+    assert stock_db.execute(count).fetchone()[0] == len(STOCK_ROWS)
+
+    # 重复写入同样的数据不报错，也不产生重复行
+    assert upsert_stock_rows(stock_db, TABLE_NAME, STOCK_ROWS) == len(STOCK_ROWS)
+    assert stock_db.execute(count).fetchone()[0] == len(STOCK_ROWS)
+
+    # 同一(date, code)再次写入时更新为新值
+    updated = list(STOCK_ROWS[0])
+    updated[STOCK_COLUMNS.index('close')] = 99.0
+    upsert_stock_rows(stock_db, TABLE_NAME, [tuple(updated)])
+    close = stock_db.execute(f"SELECT close FROM {TABLE_NAME} WHERE date = ? AND code = ?",
+                             (updated[0], updated[1])).fetchone()[0]
+    assert close == 99.0
+    assert stock_db.execute(count).fetchone()[0] == len(STOCK_ROWS)
+    assert not stock_db.in_transaction
+
+
+def test_upsert_stock_rows_nothing_to_write(stock_db):
+    assert upsert_stock_rows(stock_db, TABLE_NAME, []) == 0
@@ -0,0 +1,115 @@
+import csv
+import os
+
+import pytest
+
+from stock_project.technocal_indicators import connect_monitoring_pool
+from stock_project.technocal_indicators.connect_monitoring_pool import POOL_TABLE, MonitoringPool
+from stock_project.technocal_indicators.monitoring_journal import HISTORY_TABLE, MonitoringJournal
+from stock_project.src.SQLbase.SQLite_connect import close_connection, get_connection
+
+
+@pytest.fixture
+def pool_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(connect_monitoring_pool, 'get_data_dir', lambda: str(tmp_path))
+    yield tmp_path
+    close_connection()
+
+
+#每次调用都相当于重新启动程序：新的监控池和日志对象，读取同一个数据库
+@pytest.fixture
+def open_pool(pool_dir):
+    def build():
+        journal = MonitoringJournal(db_path=str(pool_dir / 'trade-data.db'),
+                                    journal_dir=str(pool_dir / 'journal'))
+        return MonitoringPool(db_path=str(pool_dir / 'trade-data.db'), journal=journal)
+    return build
+
+
+def _write_csv(path, header, rows):
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        writer.writerows(rows)
+
+
+@pytest.fixture
+def legacy_csv(pool_dir):
+    data_dir = pool_dir / 'monitoring_pool'
+    os.makedirs(data_dir, exist_ok=True)
+    _write_csv(data_dir / 'monitoring_pool.csv', ['stock_code', 'stock_name', 'entry_time', 'entry_price'],
+               [['sh.600000', '浦发银行', '2024-01-02 10:00:00', '10.5']])
+    _write_csv(data_dir / 'monitoring_history.csv', ['stock_code', 'stock_name', 'action', 'time', 'price'],
+               [['sh.600000', '浦发银行', 'entry', '2024-01-02 10:00:00', '10.5'],
+                ['sz.000001', '平安银行', 'remove', '2024-01-02 11:00:00', '']])
+    return data_dir
+
+
+def _count(pool, table):
+    return get_connection(pool.db_path).execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+
+#旧版csv只在首次运行时导入一次，之后监控池为空也不再导入
+def test_legacy_csv_imported_once(open_pool, legacy_csv):
+    pool = open_pool()
+    assert pool.to_code_name_map() == {'sh.600000': '浦发银行'}
+    assert pool.entries['sh.600000'][2] == 10.5
+    assert _count(pool, HISTORY_TABLE) == 2
+
+    pool.remove(['sh.600000'], {}, '2024-01-03 10:00:00')
+    pool.journal.flush()
+    pool.export_csv()
+    assert _count(pool, HISTORY_TABLE) == 3
+
+    for _ in range(3):
+        pool = open_pool()
+        assert len(pool) == 0
+        assert _count(pool, HISTORY_TABLE) == 3
+
+
+#已有数据的数据库（之前的版本导入过csv）不会再次导入
+def test_existing_database_is_not_reimported(open_pool, pool_dir):
+    pool = open_pool()
+    pool.add({'sh.600000': '浦发银行'}, {'sh.600000': 10.5}, '2024-01-02 10:00:00')
+    pool.journal.flush()
+    pool.export_csv()
+    conn = get_connection(pool.db_path)
+    conn.execute("DELETE FROM MONITORING_META")
+    conn.commit()
+
+    pool = open_pool()
+    assert pool.to_code_name_map() == {'sh.600000': '浦发银行'}
+    assert _count(pool, HISTORY_TABLE) == 1
+
+
+#出入池往返：内存镜像、数据库和出入池记录保持一致
+def test_add_remove_round_trip(open_pool):
+    pool = open_pool()
+    added = pool.add({'sh.600000': '浦发银行', 'sz.000001': '平安银行'},
+                     {'sh.600000': 10.5}, '2024-01-02 10:00:00')
+    assert sorted(code for code, _, _ in added) == ['sh.600000', 'sz.000001']
+    # 已在池中的股票不会重复入池
+    assert pool.add({'sh.600000': '浦发银行'}, {}, '2024-01-02 10:05:00') == []
+
+    removed = pool.remove(['sz.000001', 'sh.688000'], {'sz.000001': 9.8}, '2024-01-02 14:00:00')
+    assert removed == [('sz.000001', '平安银行', 9.8)]
+    assert 'sz.000001' not in pool
+    assert _count(pool, POOL_TABLE) == 1
+
+    history = pool.query_history('sz.000001')
+    assert [(row[2], row[4]) for row in history] == [('entry', None), ('remove', 9.8)]
+
+
+#重新加载后内存镜像与数据库中的监控池一致
+def test_mirror_matches_database_after_reload(open_pool):
+    pool = open_pool()
+    pool.add({'sh.600000': '浦发银行', 'sz.000001': '平安银行'}, {'sh.600000': 10.5, 'sz.000001': 9.8},
+             '2024-01-02 10:00:00')
+    pool.remove(['sz.000001'], {}, '2024-01-02 14:00:00')
+    expected = dict(pool.entries)
+
+    reloaded = open_pool()
+    assert reloaded.entries == expected
+    rows = get_connection(reloaded.db_path).execute(
+        f"SELECT stock_code, stock_name, entry_time, entry_price FROM {POOL_TABLE}").fetchall()
+    assert {code: (name, entry_time, price) for code, name, entry_time, price in rows} == expected
@@ -0,0 +1,189 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from stock_project.src.strategyBacktesting.dtzs_backtest import (
+    MarketArrays,
+    compute_signals,
+    parse_params,
+    simulate
+)
+from stock_project.technocal_indicators.get_bullish_bearish import (
+    bearish_cover_bullish_mask,
+    bullish_cover_bearish_mask
+)
+from stock_project.technocal_indicators.kline_store import KlineStore
+from stock_project.technocal_indicators.profit_pulled_back import pulled_back_mask
+from stock_project.technocal_indicators.sma_engine import SMAEngine
+
+# 不计初筛、成交参数取整便于手工核对
+PARAMS = {
+    "exclude_gem": False, "exclude_star_market": False, "exclude_st": False,
+    "exclude_new_stock": False, "exclude_market_value": False,
+    "initial_capital": 100000, "min_position_size": 50000, "max_positions": 2,
+    "commission_rate": 0.001, "min_commission": 5.0, "stamp_tax": 0.001,
+}
+
+
+#手工构造的行情：open/close为(交易日 × 股票)列表，其他字段由此推出
+def _market(opens, closes, codes=('sh.600000',)):
+    opens = np.array(opens, dtype=np.float32).reshape(len(opens), -1)
+    closes = np.array(closes, dtype=np.float32).reshape(len(closes), -1)
+    days = opens.shape[0]
+    fields = {
+        'open': opens,
+        'close': closes,
+        'high': np.fmax(opens, closes) + np.float32(0.1),
+        'low': np.fmin(opens, closes) - np.float32(0.1),
+        'volume': np.full(opens.shape, 1e6, dtype=np.float32),
+        'turn': np.full(opens.shape, 1.0, dtype=np.float32),
+        'isST': np.zeros(opens.shape, dtype=np.float32),
+    }
+    dates = np.busday_offset('2024-01-02', np.arange(days), roll='forward')
+    return MarketArrays(dates, np.array(codes), fields)
+
+
+def _signals(days, buy_days=(), sell_days=(), stocks=1):
+    buy = np.zeros((days, stocks), dtype=bool)
+    sell = np.zeros((days, stocks), dtype=bool)
+    buy[list(buy_days), 0] = True
+    sell[list(sell_days), 0] = True
+    return buy, sell
+
+
+#----------------------------------------------------------
+#逐日模拟
+
+def test_next_open_execution_and_t_plus_one():
+    market = _market(opens=[10.0, 10.2, 10.4, 10.6], closes=[10.1, 10.3, 10.5, 10.7])
+    # 第0日收盘出现买入信号，第1日收盘就出现卖出信号
+    buy, sell = _signals(4, buy_days=[0], sell_days=[1])
+    trades = simulate(market, buy, sell, PARAMS).trades
+
+    assert trades['action'].tolist() == ['buy', 'sell']
+    # 次日开盘价成交：第1日开盘买入，第2日开盘卖出
+    assert trades['date'].tolist() == list(pd.to_datetime(market.dates[[1, 2]]))
+    assert trades['price'].tolist() == pytest.approx([10.2, 10.4])
+
+
+def test_same_day_sell_is_not_allowed():
+    market = _market(opens=[10.0, 10.2, 10.4], closes=[10.1, 10.3, 10.5])
+    # 收盘价成交：当日买入后同日就有卖出信号，最早下一交易日卖出
+    buy, sell = _signals(3, buy_days=[0], sell_days=[0, 1])
+    trades = simulate(market, buy, sell, {**PARAMS, "execution": "close"}).trades
+
+    assert trades['action'].tolist() == ['buy', 'sell']
+    assert trades['date'].tolist() == list(pd.to_datetime(market.dates[[0, 1]]))
+    assert trades['price'].tolist() == pytest.approx([10.1, 10.3])
+
+
+def test_lot_rounding_and_fees():
+    market = _market(opens=[13.0, 13.37, 14.0], closes=[13.1, 13.5, 14.2])
+    buy, sell = _signals(3, buy_days=[0], sell_days=[1])
+    result = simulate(market, buy, sell, PARAMS)
+    buy_trade, sell_trade = result.trades.iloc[0], result.trades.iloc[1]
+
+    # 资金100000，每仓50000：50000 / (13.37 × 1.001) = 3735.8股，取整手为3700股
+    assert buy_trade['shares'] == 3700
+    assert buy_trade['shares'] % 100 == 0
+    buy_amount = 3700 * 13.37
+    assert buy_trade['amount'] == pytest.approx(buy_amount)
+    assert buy_trade['fee'] == pytest.approx(buy_amount * 0.001)
+
+    sell_amount = 3700 * 14.0
+    sell_fee = sell_amount * 0.001 + sell_amount * 0.001
+    assert sell_trade['fee'] == pytest.approx(sell_fee)
+    assert sell_trade['pnl'] == pytest.approx(sell_amount - sell_fee - buy_amount - buy_amount * 0.001)
+
+    final_cash = 100000 - buy_amount * 1.001 + sell_amount - sell_fee
+    assert result.equity['cash'].iloc[-1] == pytest.approx(final_cash)
+    assert result.equity['equity'].iloc[-1] == pytest.approx(final_cash)
+
+
+def test_minimum_commission():
+    market = _market(opens=[10.0, 10.0, 10.0], closes=[10.0, 10.0, 10.0])
+    buy, sell = _signals(3, buy_days=[0], sell_days=[1])
+    params = {**PARAMS, "initial_capital": 2000, "min_position_size": 1000, "max_positions": 1}
+    trades = simulate(market, buy, sell, params).trades
+    # 成交金额1000元，佣金1元低于最低佣金，按5元收取；卖出另收印花税
+    assert trades['shares'].tolist() == [100, 100]
+    assert trades['fee'].tolist() == pytest.approx([5.0, 5.0 + 1000 * 0.001])
+
+
+def test_sell_after_suspension():
+    market = _market(opens=[10.0, 10.2, np.nan, 10.6], closes=[10.1, 10.3, np.nan, 10.7])
+    # 第1日收盘出现卖出信号，第2日停牌，复牌后卖出
+    buy, sell = _signals(4, buy_days=[0], sell_days=[1])
+    trades = simulate(market, buy, sell, PARAMS).trades
+    assert trades['date'].tolist() == list(pd.to_datetime(market.dates[[1, 3]]))
+
+
+def test_parse_params_rejects_bad_values():
+    with pytest.raises(ValueError):
+        parse_params({"sma_periods": (5,)})
+    with pytest.raises(ValueError):
+        parse_params({"sma_periods": (0, 5)})
+    with pytest.raises(ValueError):
+        parse_params({"execution": "vwap"})
+
+
+#----------------------------------------------------------
+#信号与实盘形态判断一致
+
+CODES = ('sh.600000', 'sz.000002')
+SIGNAL_PARAMS = {**PARAMS, "sma_periods": (3, 5), "max_search_days": 5,
+                 "pullback_lookback": 3, "pulled_back": 0.05}
+
+
+@pytest.fixture
+def random_market():
+    rng = np.random.default_rng(3)
+    days = 60
+    closes = np.round(10 * np.exp(np.cumsum(rng.normal(0, 0.04, (days, 2)), axis=0)), 2)
+    opens = np.round(closes * np.exp(rng.normal(0, 0.03, (days, 2))), 2)
+    # 第二只股票有两段停牌
+    opens[[10, 11, 30], 1] = np.nan
+    closes[[10, 11, 30], 1] = np.nan
+    return _market(opens, closes, CODES)
+
+
+#按实盘方式逐日计算：用当日之前的交易日数据构建SMAEngine与KlineStore，当日收盘价作为当前价格
+def _live_signals(market, day, params):
+    valid = ~np.isnan(market['close'][:day + 1]) & ~np.isnan(market['open'][:day + 1])
+    rows = []
+    for j, code in enumerate(market.codes):
+        for i in np.nonzero(valid[:day, j])[0]:
+            rows.append((code, float(market['open'][i, j]), float(market['high'][i, j]),
+                         float(market['low'][i, j]), float(market['close'][i, j])))
+    frame = pd.DataFrame(rows, columns=['code', 'open', 'high', 'low', 'close'])
+    codes = list(market.codes)
+
+    close_data = {code: list(frame.loc[frame['code'] == code, 'close'])[-59:] for code in codes}
+    now_price = {code: float(market['close'][day, j]) for j, code in enumerate(codes) if valid[day, j]}
+    ma = SMAEngine(close_data).compute(now_price, periods=params["sma_periods"])
+    store = KlineStore.from_frame(frame, codes, days=10)
+
+    current = ma['current_price']
+    today_open = np.array([market['open'][day, j] for j in range(len(codes))], dtype=float)
+    short, mid = (ma[f'ma{period}'] for period in params["sma_periods"])
+    bullish = bullish_cover_bearish_mask(current, today_open, store.take('high', codes),
+                                         store.take('status', codes), params["max_search_days"])
+    bearish = bearish_cover_bullish_mask(current, today_open, store.take('low', codes),
+                                         store.take('status', codes), params["max_search_days"])
+    pulled_back = pulled_back_mask(current, store.take('close', codes),
+                                   params["pullback_lookback"], params["pulled_back"])
+
+    with np.errstate(invalid='ignore'):
+        buy = ma['valid'] & (current > short) & (short > mid) & bullish
+        sell = ma['valid'] & ((bearish & (current < short)) | pulled_back | (current < mid))
+    return buy, sell
+
+
+def test_compute_signals_match_live_masks(random_market):
+    buy_signal, sell_signal = compute_signals(random_market, SIGNAL_PARAMS)
+    assert buy_signal.any() and sell_signal.any()
+
+    for day in range(random_market.shape[0]):
+        buy, sell = _live_signals(random_market, day, parse_params(SIGNAL_PARAMS))
+        assert buy_signal[day].tolist() == buy.tolist(), day
+        assert sell_signal[day].tolist() == sell.tolist(), day
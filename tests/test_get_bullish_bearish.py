@@ -0,0 +1,61 @@
+import itertools
+
+import numpy as np
+import pytest
+
+from stock_project.technocal_indicators.get_bullish_bearish import (
+    bearish_cover_bullish_mask,
+    bullish_cover_bearish_mask
+)
+from stock_project.technocal_indicators.kline_store import KlineStore
+
+CODES = ['sh.600000', 'sz.000001', 'sh.600001']
+
+
+#原先逐只股票的判断：今日K线方向符合，且当前价格越过最近max_search_days日内最近一根反向K线的最高/最低价
+#kline_data为[最高价, 最低价, 状态, 开盘价, 收盘价]列表
+def _cover(kline_data, current_price, open_price, bullish, max_search_days=5):
+    if open_price is None:
+        open_price = current_price
+    if (current_price <= open_price) if bullish else (current_price >= open_price):
+        return False
+    for i in range(min(max_search_days, len(kline_data))):
+        day_data = kline_data[-1 - i]
+        if day_data[2] == (-1 if bullish else 1):
+            return current_price > day_data[0] if bullish else current_price < day_data[1]
+    return False
+
+
+PRICES = [8.5, 9.25, 10.0, 11.0, 11.25, 11.5, 12.0, 12.5]
+OPENS = [None, 9.0, 11.2]
+
+
+@pytest.mark.parametrize('skip_last', [False, True])
+@pytest.mark.parametrize('max_search_days', [1, 2, 5])
+def test_masks_match_per_stock_loop(kline_frame, skip_last, max_search_days):
+    store = KlineStore.from_frame(kline_frame, CODES, days=10, skip_last=skip_last)
+    kline_lists = {code: store[code].tolist() if code in store else [] for code in CODES}
+
+    for current, open_price in itertools.product(PRICES, OPENS):
+        current_price = np.full(len(CODES), current)
+        open_prices = np.full(len(CODES), np.nan if open_price is None else open_price)
+
+        bullish = bullish_cover_bearish_mask(current_price, open_prices, store.take('high', CODES),
+                                             store.take('status', CODES), max_search_days)
+        bearish = bearish_cover_bullish_mask(current_price, open_prices, store.take('low', CODES),
+                                             store.take('status', CODES), max_search_days)
+        assert bullish.tolist() == [_cover(kline_lists[code], current, open_price, True, max_search_days)
+                                    for code in CODES]
+        assert bearish.tolist() == [_cover(kline_lists[code], current, open_price, False, max_search_days)
+                                    for code in CODES]
+
+
+#没有当前价格的股票不满足任何形态
+def test_masks_without_current_price(kline_frame):
+    store = KlineStore.from_frame(kline_frame, CODES, days=10)
+    current_price = np.full(len(CODES), np.nan)
+    open_prices = np.full(len(CODES), 10.0)
+    assert not bullish_cover_bearish_mask(current_price, open_prices, store.take('high', CODES),
+                                          store.take('status', CODES)).any()
+    assert not bearish_cover_bullish_mask(current_price, open_prices, store.take('low', CODES),
+                                          store.take('status', CODES)).any()
@@ -0,0 +1,85 @@
+import math
+from datetime import date
+
+import pytest
+
+from stock_project.src.SQLbase import SQLite_manage
+from stock_project.src.SQLbase.SQLite_manage import STOCK_COLUMNS
+from stock_project.technocal_indicators import get_stock_market_value
+from stock_project.technocal_indicators.get_stock_market_value import get_float_market_caps
+
+from conftest import TABLE_NAME, STOCK_ROWS
+
+CLOSE = STOCK_COLUMNS.index('close')
+TURN = STOCK_COLUMNS.index('turn')
+
+
+#可调整的日期，用于模拟跨日
+class FakeDate:
+    current = date(2024, 1, 9)
+
+    @classmethod
+    def today(cls):
+        return cls.current
+
+
+#每个测试使用空缓存，并记录查询数据库的次数
+@pytest.fixture
+def queries(stock_db, monkeypatch):
+    FakeDate.current = date(2024, 1, 9)
+    monkeypatch.setattr(get_stock_market_value, 'date', FakeDate)
+    monkeypatch.setitem(get_stock_market_value._market_cap_cache, 'date', None)
+    monkeypatch.setitem(get_stock_market_value._market_cap_cache, 'caps', get_stock_market_value._market_cap_cache['caps'])
+
+    calls = []
+
+    def counting_query(table_name, codes, **kwargs):
+        calls.append(list(codes))
+        return SQLite_manage.query_many_stocks(table_name, codes, **kwargs)
+    monkeypatch.setattr(get_stock_market_value, 'query_many_stocks', counting_query)
+    return calls
+
+
+#流通市值 = 成交量 / (换手率/100) × 收盘价，取最后一个交易日
+def test_float_market_caps_from_last_trading_day(queries):
+    caps = get_float_market_caps(['sz.000001', 'sh.600000'])
+    assert caps.index.tolist() == ['sz.000001', 'sh.600000']
+    last_close = STOCK_ROWS[-1][CLOSE]
+    assert caps.tolist() == pytest.approx([1e6 / 0.01 * last_close] * 2)
+
+
+#换手率为0或没有数据的股票为NaN
+def test_float_market_caps_missing_values_are_nan(queries, stock_db):
+    row = list(STOCK_ROWS[0])
+    row[1], row[TURN] = 'sh.688000', 0.0
+    SQLite_manage.upsert_stock_rows(stock_db, TABLE_NAME, [tuple(row)])
+
+    caps = get_float_market_caps(['sh.688000', 'sh.600001', 'sh.600000'])
+    assert math.isnan(caps['sh.688000'])
+    assert math.isnan(caps['sh.600001'])
+    assert caps['sh.600000'] > 0
+
+
+#同一天内只查询尚未缓存的股票，无法计算的股票同样缓存
+def test_float_market_caps_cached_within_day(queries):
+    first = get_float_market_caps(['sh.600000', 'sh.600001'])
+    again = get_float_market_caps(['sh.600001', 'sh.600000'])
+    assert queries == [['sh.600000', 'sh.600001']]
+    assert again['sh.600000'] == first['sh.600000']
+
+    get_float_market_caps(['sh.600000', 'sz.000001'])
+    assert queries[-1] == ['sz.000001']
+
+
+#跨日后重新查询，使用新的收盘数据
+def test_float_market_caps_refreshed_next_day(queries, stock_db):
+    before = get_float_market_caps(['sh.600000'])['sh.600000']
+
+    row = list(STOCK_ROWS[4])
+    row[0], row[CLOSE] = '2024-01-09', 20.0
+    SQLite_manage.upsert_stock_rows(stock_db, TABLE_NAME, [tuple(row)])
+    assert get_float_market_caps(['sh.600000'])['sh.600000'] == before
+
+    FakeDate.current = date(2024, 1, 10)
+    assert get_float_market_caps(['sh.600000'])['sh.600000'] == pytest.approx(1e6 / 0.01 * 20.0)
+    assert len(queries) == 2
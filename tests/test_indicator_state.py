@@ -0,0 +1,116 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from stock_project.technocal_indicators.indicator_state import IndicatorState
+from stock_project.technocal_indicators.kline_store import KlineStore
+from stock_project.technocal_indicators.sma_engine import SMAEngine
+
+PERIODS = (3, 5, 10, 20, 60)
+
+
+#随机收盘价：部分股票历史不足59日，最后一只没有当前价格
+@pytest.fixture
+def close_data():
+    rng = np.random.default_rng(0)
+    lengths = [59, 59, 30, 7, 2, 59]
+    return {f"sh.60{i:04d}": list(np.round(10 * np.exp(np.cumsum(rng.normal(0, 0.02, n))), 2))
+            for i, n in enumerate(lengths)}
+
+
+@pytest.fixture
+def now_price(close_data):
+    codes = list(close_data)
+    return {code: close_data[code][-1] * 1.01 for code in codes[:-1]}
+
+
+#有当前价格的股票，增量均线与一次性累加和计算的结果一致
+def test_indicator_state_sma_matches_engine(trade_calendar, close_data, now_price):
+    state = IndicatorState(close_data, sma_periods=PERIODS)
+    result = state.update(now_price)
+    expected = SMAEngine(close_data).compute(now_price, periods=PERIODS)
+
+    valid = expected['valid']
+    np.testing.assert_array_equal(result['valid'], valid)
+    assert not valid[-1]
+    for period in PERIODS:
+        np.testing.assert_allclose(result[f'ma{period}'][valid], expected[f'ma{period}'][valid], rtol=1e-12)
+
+
+def test_engine_compute_rejects_bad_period(close_data):
+    with pytest.raises(ValueError):
+        SMAEngine(close_data).compute({}, periods=(2,))
+
+
+#----------------------------------------------------------
+#增量指标与完整重新计算一致：逐日用截至前一日的数据构建状态，再用当日行情更新
+
+DAYS = 80
+
+
+#逐只股票的参考实现：均线取最近period个价格，数据不足时使用全部数据
+def _sma(prices, period):
+    window = prices[-period:]
+    return sum(window) / len(window)
+
+
+#KDJ(9, 3, 3)的逐日参考实现，K、D初始值为50
+def _kdj(high, low, close):
+    k = d = 50.0
+    for i in range(len(close)):
+        highest, lowest = max(high[max(0, i - 8):i + 1]), min(low[max(0, i - 8):i + 1])
+        rsv = 50.0 if highest == lowest else (close[i] - lowest) / (highest - lowest) * 100
+        k = k * 2 / 3 + rsv / 3
+        d = d * 2 / 3 + k / 3
+    return k, d, 3 * k - 2 * d
+
+
+@pytest.fixture
+def bars():
+    rng = np.random.default_rng(1)
+    codes = ['sh.600000', 'sh.600001', 'sz.000001']
+    close = 10 * np.exp(np.cumsum(rng.normal(0, 0.02, (len(codes), DAYS)), axis=1))
+    high = close * (1 + rng.uniform(0, 0.03, close.shape))
+    low = close * (1 - rng.uniform(0, 0.03, close.shape))
+    # 第二只股票上市较晚，只有最近20日数据
+    first_day = {'sh.600000': 0, 'sh.600001': DAYS - 20, 'sz.000001': 0}
+    return codes, first_day, np.round(high, 2), np.round(low, 2), np.round(close, 2)
+
+
+def _kline_frame(codes, first_day, high, low, close, end):
+    rows = [(code, close[i, day], high[i, day], low[i, day], close[i, day])
+            for i, code in enumerate(codes) for day in range(first_day[code], end)]
+    return pd.DataFrame(rows, columns=['code', 'open', 'high', 'low', 'close'])
+
+
+def test_update_matches_full_recompute(trade_calendar, bars):
+    codes, first_day, high, low, close = bars
+
+    for today in range(DAYS - 5, DAYS):
+        close_data = {code: list(close[i, max(first_day[code], today - 59):today]) for i, code in enumerate(codes)}
+        kline_store = KlineStore.from_frame(_kline_frame(codes, first_day, high, low, close, today), codes, days=10)
+        state = IndicatorState(close_data, kline_store, sma_periods=(5, 10, 20, 60), ema_periods=(5,))
+
+        now_price = {code: close[i, today] for i, code in enumerate(codes)}
+        result = state.update(now_price,
+                              {code: high[i, today] for i, code in enumerate(codes)},
+                              {code: low[i, today] for i, code in enumerate(codes)})
+
+        for i, code in enumerate(codes):
+            prices = close_data[code] + [now_price[code]]
+            for period in (5, 10, 20, 60):
+                assert result[f'ma{period}'][i] == pytest.approx(_sma(prices, period), rel=1e-12)
+
+            series = pd.Series(prices)
+            ema = {span: series.ewm(span=span, adjust=False).mean() for span in (5, 12, 26)}
+            assert result['ema5'][i] == pytest.approx(ema[5].iloc[-1], rel=1e-10)
+            dif = ema[12] - ema[26]
+            dea = dif.ewm(span=9, adjust=False).mean()
+            assert result['dif'][i] == pytest.approx(dif.iloc[-1], abs=1e-10)
+            assert result['dea'][i] == pytest.approx(dea.iloc[-1], abs=1e-10)
+            assert result['macd'][i] == pytest.approx(2 * (dif.iloc[-1] - dea.iloc[-1]), abs=1e-10)
+
+            # KDJ：最近10日K线加上今日
+            start = max(first_day[code], today - 10)
+            k, d, j = _kdj(high[i, start:today + 1], low[i, start:today + 1], close[i, start:today + 1])
+            assert (result['k'][i], result['d'][i], result['j'][i]) == pytest.approx((k, d, j), rel=1e-10)
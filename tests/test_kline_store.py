@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+
+from stock_project.technocal_indicators.kline_store import KlineStore
+
+CODES = ['sh.600000', 'sz.000001', 'sh.600001']
+
+
+#原先逐只股票、逐行构建的[最高价, 最低价, 状态, 开盘价, 收盘价]列表
+def _kline_lists(data, days=10, skip_last=False):
+    result = {}
+    for code, stock_data in data.groupby('code', sort=False):
+        last_data = stock_data.iloc[-days - 1:-1] if skip_last else stock_data.tail(days)
+        kline_list = []
+        for _, day in last_data.iterrows():
+            if day['close'] > day['open']:
+                status = 1
+            elif day['close'] < day['open']:
+                status = -1
+            else:
+                status = 0
+            kline_list.append([day['high'], day['low'], status, day['open'], day['close']])
+        result[code] = kline_list
+    return result
+
+
+@pytest.mark.parametrize('skip_last', [False, True])
+def test_from_frame_matches_per_row_lists(kline_frame, skip_last):
+    store = KlineStore.from_frame(kline_frame, CODES, days=10, skip_last=skip_last)
+    expected = _kline_lists(kline_frame, skip_last=skip_last)
+
+    for code in CODES:
+        np.testing.assert_array_equal(store[code], np.array(expected.get(code, []), dtype=float).reshape(-1, 5))
+    assert store.length.tolist() == [len(expected.get(code, [])) for code in CODES]
+
+
+#价格缺失的记录状态为0（不经过NaN到int8的转换），平线状态为0，历史不足的左侧补NaN
+@pytest.mark.filterwarnings('error')
+def test_status_for_doji_and_missing_prices(kline_frame):
+    store = KlineStore.from_frame(kline_frame, CODES, days=10)
+    status = store.take('status', ['sh.600000'])[0]
+    assert status.tolist() == [1, 0, 1, 1, -1, 0, 1, 1, -1, 0]
+
+    short = store.take('close', ['sz.000001'])[0]
+    assert np.isnan(short[:-2]).all()
+    assert store.take('status', ['sz.000001'])[0][:-2].tolist() == [0] * 8
+    assert np.isnan(store.take('high', ['sh.688000'])).all()
+
+
+def test_from_empty_frame(kline_frame):
+    store = KlineStore.from_frame(kline_frame.iloc[:0], CODES, days=10)
+    assert store.length.tolist() == [0, 0, 0]
+    assert (store.status == 0).all()
@@ -0,0 +1,106 @@
+import gzip
+import os
+import sqlite3
+from datetime import date
+
+import pytest
+
+from stock_project.technocal_indicators.monitoring_journal import (
+    HISTORY_TABLE,
+    MonitoringJournal,
+    create_history_table
+)
+from stock_project.src.SQLbase.SQLite_connect import close_connection, get_connection
+
+TODAY = date.today().strftime("%Y-%m-%d")
+
+
+@pytest.fixture
+def journal(tmp_path):
+    journal = MonitoringJournal(db_path=str(tmp_path / 'trade-data.db'),
+                                journal_dir=str(tmp_path / 'journal'), max_buffer=3)
+    yield journal
+    close_connection()
+
+
+def _event(code, action='entry', day=TODAY):
+    return (code, '测试股票', action, f"{day} 10:00:00", 10.0)
+
+
+def test_flush_writes_index_and_journal(journal):
+    journal.record([_event('sh.600000'), _event('sz.000001')])
+    assert journal.flush() == 2
+    assert journal.buffer == []
+    assert journal.flush() == 0
+
+    with open(journal._journal_file(TODAY), 'r', encoding='utf-8') as f:
+        lines = f.read().splitlines()
+    assert lines[0] == 'stock_code,stock_name,action,time,price'
+    assert len(lines) == 3
+
+    history = journal.query_history('sh.600000')
+    assert [row[2] for row in history] == ['entry']
+
+
+def test_record_flushes_when_buffer_full(journal):
+    journal.record([_event('sh.600000'), _event('sh.600000', 'remove')])
+    assert len(journal.buffer) == 2
+    journal.record([_event('sh.600000')])
+    assert journal.buffer == []
+    assert [row[2] for row in journal.query_history('sh.600000')] == ['entry', 'remove', 'entry']
+
+
+#索引表写入失败时回滚，事件放回缓存头部，下次写入不丢失也不重复
+def test_failed_commit_requeues_events(journal):
+    journal.record([_event('sh.600000')])
+    conn = get_connection(journal.db_path)
+    conn.execute(f"DROP TABLE {HISTORY_TABLE}")
+
+    with pytest.raises(sqlite3.OperationalError):
+        journal.flush()
+    journal.buffer.append(_event('sz.000001'))
+    assert [event[0] for event in journal.buffer] == ['sh.600000', 'sz.000001']
+    assert not os.path.exists(journal._journal_file(TODAY))
+
+    create_history_table(conn)
+    assert journal.flush() == 2
+    assert conn.execute(f"SELECT COUNT(*) FROM {HISTORY_TABLE}").fetchone()[0] == 2
+    with open(journal._journal_file(TODAY), 'r', encoding='utf-8') as f:
+        assert len(f.read().splitlines()) == 3
+
+
+#索引表已提交后日志文件写入失败，不放回缓存，之后的写入不会重复追加
+def test_failed_journal_append_does_not_requeue(journal, monkeypatch):
+    journal.record([_event('sh.600000')])
+
+    def fail(events):
+        raise OSError("磁盘已满")
+    monkeypatch.setattr(journal, '_append_journal', fail)
+    assert journal.flush() == 1
+    assert journal.buffer == []
+    assert len(journal.query_history('sh.600000')) == 1
+
+    monkeypatch.undo()
+    journal.record([_event('sz.000001')])
+    assert journal.flush() == 1
+    with open(journal._journal_file(TODAY), 'r', encoding='utf-8') as f:
+        assert [line.split(',')[0] for line in f.read().splitlines()[1:]] == ['sz.000001']
+
+
+#往日的日志压缩为.csv.gz，当日的保留
+def test_rotate_compresses_past_days(journal):
+    journal.record([_event('sh.600000', day='2024-01-02'), _event('sh.600000')])
+    journal.flush()
+
+    files = sorted(os.listdir(journal.journal_dir))
+    assert files == ['journal_2024-01-02.csv.gz', f'journal_{TODAY}.csv']
+    with gzip.open(os.path.join(journal.journal_dir, 'journal_2024-01-02.csv.gz'), 'rt', encoding='utf-8') as f:
+        assert '2024-01-02 10:00:00' in f.read()
+
+
+def test_stop_background_flushes_remaining(journal):
+    journal.start_background(interval=60)
+    journal.record([_event('sh.600000')])
+    journal.stop_background()
+    assert journal.buffer == []
+    assert len(journal.query_history('sh.600000')) == 1
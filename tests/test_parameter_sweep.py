@@ -0,0 +1,133 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from stock_project.src.strategyBacktesting import parameter_sweep
+from stock_project.src.strategyBacktesting.dtzs_backtest import (
+    MarketArrays,
+    compute_signals,
+    parse_params,
+    simulate
+)
+from stock_project.src.strategyBacktesting.parameter_sweep import (
+    _group_by_signal,
+    grid_space,
+    prepare_market,
+    random_space,
+    run_sweep
+)
+
+from test_dtzs_backtest import PARAMS, _market
+
+SPACE = {
+    "sma_periods": [(3, 5), (2, 4)],
+    "pulled_back": [0.05, 0.1],
+    "max_positions": [1, 2],
+    "min_position_size": [20000, 50000],
+}
+
+
+#----------------------------------------------------------
+#参数组合
+
+def test_grid_space_covers_every_combination():
+    configs = grid_space(SPACE)
+    assert len(configs) == 16
+    assert configs[0] == {"sma_periods": (3, 5), "pulled_back": 0.05, "max_positions": 1, "min_position_size": 20000}
+    assert len({repr(sorted(config.items())) for config in configs}) == 16
+
+
+def test_random_space_samples_without_replacement():
+    configs = random_space(SPACE, 6, seed=1)
+    grid = [repr(sorted(config.items())) for config in grid_space(SPACE)]
+    keys = [repr(sorted(config.items())) for config in configs]
+    assert len(set(keys)) == 6
+    assert set(keys) <= set(grid)
+    assert random_space(SPACE, 6, seed=1) == configs
+    # 抽样数超过网格大小时返回整个网格
+    assert len(random_space(SPACE, 100, seed=1)) == 16
+
+
+#只有成交参数不同的组合共用一次信号计算
+def test_group_by_signal_shares_signal_params():
+    groups = _group_by_signal(grid_space(SPACE), parse_params(PARAMS))
+    assert len(groups) == 4
+    for group in groups:
+        assert len(group) == 4
+        signal_keys = {(params["sma_periods"], params["pulled_back"]) for _, params in group}
+        assert len(signal_keys) == 1
+    assert sorted(number for group in groups for number, _ in group) == list(range(16))
+
+
+#----------------------------------------------------------
+#并行回测
+
+@pytest.fixture
+def market_dir(tmp_path):
+    rng = np.random.default_rng(5)
+    days = 40
+    closes = np.round(10 * np.exp(np.cumsum(rng.normal(0, 0.04, (days, 2)), axis=0)), 2)
+    opens = np.round(closes * np.exp(rng.normal(0, 0.03, (days, 2))), 2)
+    opens[[8, 9], 1] = np.nan
+    closes[[8, 9], 1] = np.nan
+    market = _market(opens, closes, ('sh.600000', 'sz.000002'))
+    return market.save(str(tmp_path / 'market'), table_name='STOCK000001', start=None, end=None)
+
+
+def test_run_sweep_matches_direct_simulation(market_dir, tmp_path):
+    configs = grid_space(SPACE)
+    output_file = tmp_path / 'sweep.csv'
+    df = run_sweep(configs, market_dir=market_dir, base_params=PARAMS, max_workers=2,
+                   sort_by=None, output_file=str(output_file))
+
+    market = MarketArrays.load(market_dir)
+    assert len(df) == len(configs)
+    assert df['error'].isna().all()
+    assert df['trades'].sum() > 0
+    for number, config in enumerate(configs):
+        params = {**PARAMS, **config}
+        expected = simulate(market, *compute_signals(market, params), params).summary
+        row = df.iloc[number]
+        assert row['sma_periods'] == '/'.join(map(str, config['sma_periods']))
+        for key, value in expected.items():
+            assert row[key] == pytest.approx(value), (number, key)
+
+    saved = pd.read_csv(output_file)
+    assert len(saved) == len(configs)
+
+
+def test_run_sweep_sorts_and_reports_errors(market_dir):
+    configs = [{"sma_periods": (3, 5)}, {"sma_periods": (5,)}, {"sma_periods": (2, 4)}]
+    df = run_sweep(configs, market_dir=market_dir, base_params=PARAMS, max_workers=1)
+
+    # 出错的组合记录错误信息并排在最后
+    assert df['error'].iloc[-1].startswith("计算信号出错")
+    assert df['sma_periods'].iloc[-1] == '5'
+    returns = df['annual_return'].iloc[:2].tolist()
+    assert returns == sorted(returns, reverse=True)
+
+
+#----------------------------------------------------------
+#行情数组缓存
+
+def test_prepare_market_rebuilds_when_range_changes(tmp_path, monkeypatch):
+    reads = []
+
+    def fake_from_db(table_name='STOCK000001', start=None, end=None, codes=None):
+        reads.append((start, end))
+        return _market([[10.0]], [[10.5]])
+    monkeypatch.setattr(MarketArrays, 'from_db', staticmethod(fake_from_db))
+
+    directory = str(tmp_path / 'market')
+    assert prepare_market(directory, start='2024-01-01') == directory
+    assert prepare_market(directory, start='2024-01-01') == directory
+    assert reads == [('2024-01-01', None)]
+
+    prepare_market(directory, start='2023-01-01')
+    assert reads == [('2024-01-01', None), ('2023-01-01', None)]
+    assert MarketArrays.read_meta(directory)['start'] == '2023-01-01'
+
+
+def test_run_sweep_without_market_returns_none(monkeypatch):
+    monkeypatch.setattr(parameter_sweep, 'prepare_market', lambda: None)
+    assert run_sweep([{}]) is None
@@ -0,0 +1,49 @@
+import math
+
+import numpy as np
+import pytest
+
+from stock_project.technocal_indicators.kline_store import KlineStore
+from stock_project.technocal_indicators.profit_pulled_back import pulled_back_mask
+
+CODES = ['sh.600000', 'sz.000001', 'sh.600001']
+
+
+#原先逐只股票的判断：近lookback日最高收盘价回撤达到threshold
+#价格缺失的收盘价不参与比较（原先的max遇到NaN时结果取决于顺序）
+def _pulled_back(kline_data, current_price, lookback=3, threshold=0.1):
+    if len(kline_data) == 0:
+        return False
+    closes = [day_data[4] for day_data in kline_data[-lookback:] if not math.isnan(day_data[4])]
+    if not closes:
+        return False
+    max_high = max(closes)
+    return max_high > 0 and (max_high - current_price) / max_high >= threshold
+
+
+@pytest.mark.parametrize('skip_last', [False, True])
+@pytest.mark.parametrize('lookback', [1, 3, 5, 12])
+def test_mask_matches_per_stock_loop(kline_frame, skip_last, lookback):
+    store = KlineStore.from_frame(kline_frame, CODES, days=10, skip_last=skip_last)
+    kline_lists = {code: store[code].tolist() if code in store else [] for code in CODES}
+
+    for current in (8.0, 8.3, 9.0, 10.4, 10.5, 11.0, 12.0):
+        mask = pulled_back_mask(np.full(len(CODES), current), store.take('close', CODES),
+                                lookback=lookback, threshold=0.1)
+        assert mask.tolist() == [_pulled_back(kline_lists[code], current, lookback) for code in CODES]
+
+
+#今日盘中最高价作为高水位参与比较
+def test_intraday_high_raises_the_high_water_mark(kline_frame):
+    store = KlineStore.from_frame(kline_frame, CODES, days=10)
+    close = store.take('close', CODES)
+    current_price = np.array([10.9, 8.5, 10.0])
+    assert pulled_back_mask(current_price, close).tolist() == [False, False, False]
+
+    intraday_high = np.array([12.5, np.nan, 12.0])
+    assert pulled_back_mask(current_price, close, intraday_high=intraday_high).tolist() == [True, False, True]
+
+
+def test_missing_current_price_is_not_pulled_back(kline_frame):
+    store = KlineStore.from_frame(kline_frame, CODES, days=10)
+    assert not pulled_back_mask(np.full(len(CODES), np.nan), store.take('close', CODES)).any()
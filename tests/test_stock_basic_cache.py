@@ -0,0 +1,129 @@
+from datetime import date, timedelta
+
+import pandas as pd
+import pytest
+
+from stock_project.src.SQLbase.SQLite_manage import load_stock_basic, save_stock_basic
+from stock_project.src.data_acquisition import stock_basic_cache
+from stock_project.src.data_acquisition.stock_basic_cache import get_stock_basic
+
+TODAY = date.today()
+
+BASIC_ROWS = pd.DataFrame({
+    'code': ['sh.600000', 'sh.603000'],
+    'code_name': ['浦发银行', '新股一号'],
+    'ipoDate': ['1999-11-10', ''],
+    'outDate': ['', ''],
+    'type': ['1', '1'],
+    'status': ['1', '1'],
+})
+
+
+#最近交易日固定为latest，下载函数替换为返回downloads中的下一份数据并记录次数
+class FakeSource:
+    def __init__(self, latest):
+        self.latest = latest
+        self.downloads = []
+        self.calls = 0
+
+    def latest_trade_day(self):
+        return self.latest
+
+    def bs_query_ipodate(self):
+        self.calls += 1
+        result = self.downloads.pop(0)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+
+@pytest.fixture
+def source(data_dir, monkeypatch):
+    source = FakeSource(TODAY)
+    monkeypatch.setattr(stock_basic_cache, 'get_trade_calendar', lambda: source)
+    monkeypatch.setattr(stock_basic_cache, 'bs_query_ipodate', source.bs_query_ipodate)
+    monkeypatch.setitem(stock_basic_cache._stock_basic_cache, 'update_date', None)
+    monkeypatch.setitem(stock_basic_cache._stock_basic_cache, 'data', None)
+    return source
+
+
+#模拟新进程：只清空进程内缓存，数据库保留
+def _new_process():
+    stock_basic_cache._stock_basic_cache.update({'update_date': None, 'data': None})
+
+
+def test_first_call_downloads_and_saves(source):
+    source.downloads = [BASIC_ROWS]
+    df = get_stock_basic()
+
+    assert source.calls == 1
+    assert df['code'].tolist() == ['sh.600000', 'sh.603000']
+    assert df['ipo_date'].tolist()[0] == pd.Timestamp('1999-11-10')
+    # 空字符串解析为NaT
+    assert pd.isna(df['ipo_date'].tolist()[1])
+
+    saved, update_date = load_stock_basic()
+    assert update_date == TODAY.strftime("%Y-%m-%d")
+    assert saved['code'].tolist() == ['sh.600000', 'sh.603000']
+
+
+def test_same_day_uses_cache(source):
+    source.downloads = [BASIC_ROWS]
+    first = get_stock_basic()
+    assert get_stock_basic() is first
+
+    # 新进程读取数据库中当日下载的数据，不再下载
+    _new_process()
+    assert get_stock_basic()['code'].tolist() == ['sh.600000', 'sh.603000']
+    assert source.calls == 1
+
+
+def test_stale_data_is_refreshed(source):
+    old_day = (TODAY - timedelta(days=10)).strftime("%Y-%m-%d")
+    save_stock_basic(BASIC_ROWS.iloc[:1], old_day)
+
+    source.downloads = [BASIC_ROWS]
+    df = get_stock_basic()
+    assert source.calls == 1
+    assert len(df) == 2
+    assert load_stock_basic()[1] == TODAY.strftime("%Y-%m-%d")
+
+
+#进程内缓存早于新的最近交易日时同样重新检查
+def test_process_cache_refreshed_after_new_trade_day(source):
+    source.latest = TODAY - timedelta(days=1)
+    save_stock_basic(BASIC_ROWS.iloc[:1], source.latest.strftime("%Y-%m-%d"))
+    assert len(get_stock_basic()) == 1
+
+    source.latest = TODAY
+    source.downloads = [BASIC_ROWS]
+    assert len(get_stock_basic()) == 2
+    assert source.calls == 1
+
+
+def test_force_refresh_downloads_again(source):
+    source.downloads = [BASIC_ROWS.iloc[:1], BASIC_ROWS]
+    get_stock_basic()
+    assert len(get_stock_basic(force_refresh=True)) == 2
+    assert source.calls == 2
+
+
+def test_download_failure_uses_old_data(source):
+    old_day = (TODAY - timedelta(days=10)).strftime("%Y-%m-%d")
+    save_stock_basic(BASIC_ROWS, old_day)
+
+    source.downloads = [RuntimeError("网络错误")]
+    df = get_stock_basic()
+    assert df['code'].tolist() == ['sh.600000', 'sh.603000']
+    assert load_stock_basic()[1] == old_day
+
+
+def test_download_failure_without_data_returns_empty_frame(source):
+    source.downloads = [BASIC_ROWS.iloc[:0]]
+    df = get_stock_basic()
+    assert df.empty
+    assert {'code', 'ipo_date', 'out_date'} <= set(df.columns)
+
+    # 没有数据时不缓存，下次调用重新下载
+    source.downloads = [BASIC_ROWS]
+    assert len(get_stock_basic()) == 2
@@ -0,0 +1,102 @@
+import json
+from datetime import date
+
+from stock_project.src.SQLbase import SQLite_manage
+from stock_project.src.SQLbase.SQLite_manage import (
+    create_progress_table,
+    load_download_progress,
+    stock_tasks_to_sql,
+    update_download_progress
+)
+from stock_project.src.data_acquisition.stock_data_complement import build_complement_tasks
+from stock_project.src.data_acquisition.stock_get import BS_DAILY_FIELDS
+
+from conftest import TABLE_NAME
+
+FIELDS = BS_DAILY_FIELDS.split(',')
+
+
+#last_date只会前进，为None时保留原值
+def test_update_download_progress_only_moves_forward(stock_db):
+    create_progress_table(stock_db)
+    update_download_progress(stock_db, TABLE_NAME, [('sh.600000', '2024-01-05', None, 'ok', None)])
+    update_download_progress(stock_db, TABLE_NAME, [('sh.600000', '2024-01-03', None, 'ok', None)])
+    update_download_progress(stock_db, TABLE_NAME, [('sh.600000', None, None, 'error', '超时')])
+
+    progress = load_download_progress(TABLE_NAME)['sh.600000']
+    assert progress['last_date'] == '2024-01-05'
+    assert progress['status'] == 'error'
+
+
+#首次读取时根据已有数据初始化进度
+def test_load_download_progress_initializes_from_table(stock_db):
+    progress = load_download_progress(TABLE_NAME)
+    assert {code: entry['last_date'] for code, entry in progress.items()} == {
+        'sh.600000': '2024-01-08', 'sz.000001': '2024-01-08'}
+
+
+def test_build_complement_tasks_resumes_after_last_date(stock_db, trade_calendar):
+    tasks = build_complement_tasks(TABLE_NAME, ['sh.600000', 'sz.000001', 'sh.688000'], date(2024, 1, 10))
+    # 已有数据的股票从下一个交易日开始，新股票从数据库最早日期开始
+    assert tasks == [('sh.600000', '2024-01-09', '2024-01-10'),
+                     ('sz.000001', '2024-01-09', '2024-01-10'),
+                     ('sh.688000', '2024-01-02', '2024-01-10')]
+    assert build_complement_tasks(TABLE_NAME, ['sh.600000'], date(2024, 1, 8)) == []
+
+
+#写入测试用的股票池，替换下载函数：downloads为{code: 原始字符串行列表}
+def _fake_download(data_dir, monkeypatch, downloads):
+    with open(data_dir / 'stock_pool.json', 'w', encoding='utf-8') as f:
+        json.dump({'股票': {code: code for code in downloads}}, f, ensure_ascii=False)
+
+    def fake_download(tasks, handle_result, **kwargs):
+        for code, start, end in tasks:
+            handle_result(code, FIELDS, downloads[code], None)
+        return len(tasks)
+    monkeypatch.setattr(SQLite_manage, 'parallel_download', fake_download)
+
+
+def _row(day, code):
+    return [day, code] + ['1'] * (len(FIELDS) - 2)
+
+
+#截止日期的数据已发布（早于今日）时，区间内没有数据的股票同样记录截止日期，下次不再重复下载
+def test_download_without_rows_records_published_end_date(stock_db, data_dir, monkeypatch):
+    _fake_download(data_dir, monkeypatch, {'sh.600000': [_row('2024-01-09', 'sh.600000')], 'sh.688000': []})
+
+    load_download_progress(TABLE_NAME)
+    stock_tasks_to_sql(TABLE_NAME, [('sh.600000', '2024-01-09', '2024-01-10'),
+                                    ('sh.688000', '2024-01-02', '2024-01-10')])
+
+    progress = load_download_progress(TABLE_NAME)
+    assert progress['sh.600000']['last_date'] == '2024-01-09'
+    assert progress['sh.688000']['last_date'] == '2024-01-10'
+    assert progress['sh.688000']['status'] == 'ok'
+
+
+#当日数据尚未发布时全部股票都没有数据，不能把今日记为已下载
+def test_download_before_publication_keeps_last_date(stock_db, data_dir, monkeypatch):
+    today = date.today().strftime("%Y-%m-%d")
+    _fake_download(data_dir, monkeypatch, {'sh.600000': [], 'sz.000001': []})
+
+    load_download_progress(TABLE_NAME)
+    stock_tasks_to_sql(TABLE_NAME, [('sh.600000', '2024-01-09', today),
+                                    ('sz.000001', '2024-01-09', today)])
+
+    progress = load_download_progress(TABLE_NAME)
+    assert progress['sh.600000']['last_date'] == '2024-01-08'
+    assert progress['sz.000001']['last_date'] == '2024-01-08'
+
+
+#其他股票已有今日数据，说明今日数据已发布，没有数据的股票（停牌）记录截止日期
+def test_download_after_publication_advances_empty_stocks(stock_db, data_dir, monkeypatch):
+    today = date.today().strftime("%Y-%m-%d")
+    _fake_download(data_dir, monkeypatch, {'sh.600000': [], 'sz.000001': [_row(today, 'sz.000001')]})
+
+    load_download_progress(TABLE_NAME)
+    stock_tasks_to_sql(TABLE_NAME, [('sh.600000', '2024-01-09', today),
+                                    ('sz.000001', '2024-01-09', today)])
+
+    progress = load_download_progress(TABLE_NAME)
+    assert progress['sh.600000']['last_date'] == today
+    assert progress['sz.000001']['last_date'] == today
@@ -0,0 +1,111 @@
+import json
+import threading
+from types import SimpleNamespace
+
+from stock_project.src.data_acquisition import stock_download_parallel
+from stock_project.src.data_acquisition.stock_download_parallel import (
+    DEFAULT_DOWNLOAD_SETTINGS,
+    _wait_rate_slot,
+    load_download_settings,
+    parallel_download
+)
+
+
+#----------------------------------------------------------
+#下载配置
+
+def test_load_download_settings_merges_config(tmp_path, monkeypatch):
+    monkeypatch.setattr(stock_download_parallel, 'get_config_dir', lambda: str(tmp_path))
+    assert load_download_settings() == DEFAULT_DOWNLOAD_SETTINGS
+
+    with open(tmp_path / 'config.json', 'w', encoding='utf-8') as f:
+        json.dump({'download': {'workers': 2}}, f)
+    assert load_download_settings() == {'workers': 2, 'rate_limit': DEFAULT_DOWNLOAD_SETTINGS['rate_limit']}
+
+
+#----------------------------------------------------------
+#共享限速
+
+#用假时钟记录每次请求的时间：sleep只推进时钟
+class FakeClock:
+    def __init__(self, now=100.0):
+        self.now = now
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+def test_wait_rate_slot_spaces_requests(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(stock_download_parallel, 'time', clock)
+    next_slot = SimpleNamespace(value=0.0)
+    lock = threading.Lock()
+
+    started = []
+    for _ in range(3):
+        _wait_rate_slot(lock, next_slot, 0.5)
+        started.append(clock.now)
+    assert started == [100.0, 100.5, 101.0]
+
+    # 空闲一段时间后不补发积压的时间片，下一次请求立即开始
+    clock.now = 110.0
+    _wait_rate_slot(lock, next_slot, 0.5)
+    assert clock.now == 110.0
+    assert next_slot.value == 110.5
+
+
+def test_wait_rate_slot_without_limit_does_not_wait(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(stock_download_parallel, 'time', clock)
+    next_slot = SimpleNamespace(value=500.0)
+    _wait_rate_slot(threading.Lock(), next_slot, 0)
+    assert clock.now == 100.0
+    assert next_slot.value == 500.0
+
+
+#----------------------------------------------------------
+#当前进程内顺序下载（workers为0）
+
+class FakeBaostock:
+    def __init__(self):
+        self.calls = []
+
+    def login(self):
+        self.calls.append('login')
+        return SimpleNamespace(error_code='0', error_msg='')
+
+    def logout(self):
+        self.calls.append('logout')
+
+
+def test_parallel_download_inline_reports_each_task(monkeypatch):
+    fake_bs = FakeBaostock()
+    monkeypatch.setattr(stock_download_parallel, 'bs', fake_bs)
+    monkeypatch.setattr(stock_download_parallel, 'time', FakeClock())
+
+    def fake_rows(code, start, end, adjust_val='2', already_login=False):
+        assert already_login
+        if code == 'sh.688000':
+            raise RuntimeError("baostock查询失败: 网络错误")
+        return ['date', 'code'], [[start, code]]
+    monkeypatch.setattr(stock_download_parallel, 'bs_daily_original_rows', fake_rows)
+
+    results = []
+    tasks = [('sh.600000', '2024-01-02', '2024-01-08'), ('sh.688000', '2024-01-02', '2024-01-08')]
+    handled = parallel_download(tasks, lambda *args: results.append(args), workers=0, rate_limit=10)
+
+    assert handled == 2
+    assert results == [('sh.600000', ['date', 'code'], [['2024-01-02', 'sh.600000']], None),
+                       ('sh.688000', None, None, "baostock查询失败: 网络错误")]
+    # 出错后仍然退出登录
+    assert fake_bs.calls == ['login', 'logout']
+
+
+def test_parallel_download_without_tasks_does_not_login(monkeypatch):
+    fake_bs = FakeBaostock()
+    monkeypatch.setattr(stock_download_parallel, 'bs', fake_bs)
+    assert parallel_download([], lambda *args: None, workers=4) == 0
+    assert fake_bs.calls == []
@@ -0,0 +1,22 @@
+from stock_project.src.data_acquisition import stock_get
+from stock_project.src.data_acquisition.stock_get import BS_DAILY_FIELDS, bs_daily_original_stock
+
+
+#查询出错时返回带全部列的空DataFrame，而不是抛出异常
+def test_bs_daily_original_stock_returns_empty_frame_on_error(monkeypatch):
+    def fail(*args, **kwargs):
+        raise RuntimeError("baostock查询失败: 网络错误")
+    monkeypatch.setattr(stock_get, 'bs_daily_original_rows', fail)
+
+    df = bs_daily_original_stock('sh.600000', '2024-01-02', '2024-01-08')
+    assert df.empty
+    assert list(df.columns) == BS_DAILY_FIELDS.split(',')
+
+
+def test_bs_daily_original_stock_builds_frame(monkeypatch):
+    fields = BS_DAILY_FIELDS.split(',')
+    row = ['2024-01-02', 'sh.600000'] + ['1'] * (len(fields) - 2)
+    monkeypatch.setattr(stock_get, 'bs_daily_original_rows', lambda *args, **kwargs: (fields, [row]))
+
+    df = bs_daily_original_stock('sh.600000', '2024-01-02', '2024-01-02')
+    assert df['date'].tolist() == ['2024-01-02']
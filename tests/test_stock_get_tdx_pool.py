@@ -0,0 +1,122 @@
+import pandas as pd
+import pytest
+
+from stock_project.src.data_acquisition import stock_get_tdx_pool, tdx_server_health
+from stock_project.src.data_acquisition.stock_get_tdx_pool import TdxQuotePool
+from stock_project.src.data_acquisition.tdx_server_health import TdxServerHealth
+
+SERVERS = [('10.0.0.1', 7709), ('10.0.0.2', 7709), ('10.0.0.3', 7709), ('10.0.0.4', 7709)]
+RTTS = dict(zip(SERVERS, [0.01, 0.02, 0.03, 0.04]))
+
+TDX_LIST = [(1, '600000'), (1, '600004'), (0, '000001'), (0, '000002'), (0, '300750')]
+
+
+#假的通达信接口
+#unreachable中的服务器无法连接，failing中的服务器连上后取行情出错，no_quote中的股票不返回行情
+class FakeApi:
+    unreachable = set()
+    failing = set()
+    no_quote = set()
+
+    def __init__(self, heartbeat=False, raise_exception=False):
+        self.server = None
+
+    def connect(self, ip, port, time_out=1.5):
+        if (ip, port) in self.unreachable:
+            raise ConnectionError("连接超时")
+        self.server = (ip, port)
+        return self
+
+    def disconnect(self):
+        self.server = None
+
+    def get_security_quotes(self, batch):
+        if self.server in self.failing:
+            raise ConnectionError("连接被重置")
+        return [{'market': market, 'code': code, 'price': 10.0, 'server': self.server[0], 'reversed_bytes0': 0}
+                for market, code in batch if code not in self.no_quote]
+
+    @staticmethod
+    def to_df(result):
+        return pd.DataFrame(result)
+
+
+#服务器健康度使用固定延迟，连接使用假接口
+@pytest.fixture
+def health(tmp_path, monkeypatch):
+    FakeApi.unreachable, FakeApi.failing, FakeApi.no_quote = set(), set(), set()
+    monkeypatch.setattr(tdx_server_health, 'get_config_dir', lambda: str(tmp_path))
+    monkeypatch.setattr(tdx_server_health, 'probe_server', lambda server, time_out=1.5: RTTS[server])
+    monkeypatch.setattr(stock_get_tdx_pool, 'TdxHq_API', FakeApi)
+
+    health = TdxServerHealth(servers=list(reversed(SERVERS)))
+    monkeypatch.setattr(stock_get_tdx_pool, 'get_server_health', lambda: health)
+    return health
+
+
+def _servers_in_use(pool):
+    return [server for api, server in pool.connections if api is not None]
+
+
+def test_connect_uses_fastest_servers(health):
+    pool = TdxQuotePool(size=2).connect()
+    assert _servers_in_use(pool) == SERVERS[:2]
+
+
+def test_connect_replaces_unreachable_server(health):
+    FakeApi.unreachable = {SERVERS[0]}
+    pool = TdxQuotePool(size=2).connect()
+    assert _servers_in_use(pool) == [SERVERS[1], SERVERS[2]]
+    assert health.error_rate(SERVERS[0]) > 0
+
+
+def test_connect_all_unreachable_returns_none(health):
+    FakeApi.unreachable = set(SERVERS)
+    assert TdxQuotePool(size=2).connect() is None
+
+
+def test_get_quotes_fails_over_to_spare_server(health):
+    pool = TdxQuotePool(size=2, batch_size=2).connect()
+    FakeApi.failing = {SERVERS[0]}
+
+    df = pool.get_quotes_df(TDX_LIST)
+
+    # 全部批次都由可用的连接取回，顺序与请求一致
+    assert df['code'].tolist() == [code for _, code in TDX_LIST]
+    assert df.attrs['missing_codes'] == []
+    assert 'reversed_bytes0' not in df.columns
+    assert SERVERS[0][0] not in set(df['server'])
+    # 出错的连接切换到未被占用的服务器，并记录出错
+    assert sorted(_servers_in_use(pool)) == [SERVERS[1], SERVERS[2]]
+    assert health.error_rate(SERVERS[0]) > 0
+
+
+def test_get_quotes_reports_missing_codes(health):
+    FakeApi.no_quote = {'000002'}
+    pool = TdxQuotePool(size=2, batch_size=2).connect()
+
+    df = pool.get_quotes_df(TDX_LIST)
+    assert df.attrs['missing_codes'] == ['sz.000002']
+    assert pool.last_missing_codes == ['sz.000002']
+
+
+def test_get_quotes_without_connections_reports_all_missing(health):
+    FakeApi.unreachable = set(SERVERS)
+    pool = TdxQuotePool(size=2)
+    df = pool.get_quotes_df(TDX_LIST)
+    assert df.empty
+    assert len(df.attrs['missing_codes']) == len(TDX_LIST)
+
+
+def test_rebalance_after_probe_switches_to_faster_server(health, monkeypatch):
+    pool = TdxQuotePool(size=2).connect()
+
+    # 重新探测后原来最慢的服务器变为最快，下一次取行情前调整连接
+    faster = dict(RTTS)
+    faster[SERVERS[3]] = 0.001
+    monkeypatch.setattr(tdx_server_health, 'probe_server', lambda server, time_out=1.5: faster[server])
+    health.probe_all()
+
+    pool.get_quotes_df(TDX_LIST[:1])
+    assert sorted(_servers_in_use(pool)) == [SERVERS[0], SERVERS[3]]
+    assert pool._health_version == health.version
@@ -0,0 +1,101 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from stock_project.src.strategyBacktesting import stock_position
+from stock_project.src.strategyBacktesting.stock_position import StockPosition, _linear_scan
+
+HISTORY_COLUMNS = ['shares', 'total_investment', 'average_cost', 'realized_profit']
+
+
+def _trades(rows):
+    return pd.DataFrame(rows, columns=['trade_date', 'code', 'code_name', 'trade_price', 'trade_number', 'isbuy'])
+
+
+def _random_trades(n, seed=0):
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range('2023-01-02', periods=n // 3 + 1).strftime('%Y-%m-%d')
+    return _trades([
+        (dates[i // 3], 'sh.600000', '浦发银行', float(np.round(rng.uniform(5, 15), 2)),
+         float(rng.integers(1, 20) * 100), int(rng.random() < 0.55))
+        for i in range(n)
+    ])
+
+
+@pytest.fixture
+def position(monkeypatch):
+    #用给定的交易记录构造StockPosition，不读取数据库
+    def build(trade_data):
+        monkeypatch.setattr(stock_position, 'query_trade_table', lambda table_name: trade_data)
+        return StockPosition('TRADE_TEST')
+    return build
+
+
+def test_linear_scan_matches_recurrence():
+    rng = np.random.default_rng(1)
+    m, b = rng.random(1000), rng.random(1000)
+    expected = np.empty_like(b)
+    x = 0.0
+    for k in range(len(b)):
+        x = m[k] * x + b[k]
+        expected[k] = x
+    np.testing.assert_allclose(_linear_scan(m, b), expected, rtol=1e-12)
+
+
+#向量化结果与逐笔处理一致，逐笔处理的卖出成本取整到5位小数，每股最多相差5e-6
+def test_vectorized_replay_matches_loop(position):
+    trade_data = _random_trades(600)
+    vectorized = position(trade_data)
+    vectorized.process_trades()
+    loop = position(trade_data)
+    loop.process_trades(vectorized=False)
+
+    fast, slow = vectorized.get_history(), loop.get_history()
+    assert fast['date'].tolist() == slow['date'].tolist()
+    np.testing.assert_array_equal(fast['shares'], slow['shares'])
+    np.testing.assert_allclose(fast['average_cost'], slow['average_cost'], atol=1e-4)
+
+    sold = np.cumsum(np.where(trade_data['isbuy'] == 0, trade_data['trade_number'], 0))
+    tolerance = 5e-6 * sold + 1e-6
+    assert (np.abs(fast['realized_profit'] - slow['realized_profit']) <= tolerance).all()
+    assert (np.abs(fast['total_investment'] - slow['total_investment']) <= tolerance).all()
+
+
+def test_oversell_is_clipped_and_state_resets(position):
+    trade_data = _trades([
+        ('2024-01-02', 'sh.600000', '浦发银行', 10.0, 1000.0, 1),
+        ('2024-01-03', 'sh.600000', '浦发银行', 12.0, 1500.0, 0),
+        ('2024-01-04', 'sh.600000', '浦发银行', 11.0, 200.0, 1),
+    ])
+    stock = position(trade_data)
+    stock.process_trades()
+    history = stock.get_history()
+    assert history['shares'].tolist() == [1000.0, 0.0, 200.0]
+    assert history['realized_profit'].tolist() == pytest.approx([0.0, 2000.0, 2000.0])
+    assert stock.average_cost == pytest.approx(11.0)
+
+    # 重复调用或切换计算方式都从空仓重新开始
+    stock.process_trades(vectorized=False)
+    assert stock.current_shares == 200.0
+    assert stock.realized_profit == pytest.approx(2000.0)
+    stock.process_trades()
+    assert stock.current_shares == 200.0
+    assert len(stock.get_history()) == 3
+
+
+#同一日期的多笔交易保持导入顺序，完整历史取当日最后一笔后的状态并前向填充
+def test_full_history_uses_last_state_per_day(position):
+    trade_data = _trades([
+        ('2024-01-03', 'sh.600000', '浦发银行', 10.0, 500.0, 1),
+        ('2024-01-03', 'sh.600000', '浦发银行', 11.0, 200.0, 0),
+        ('2024-01-02', 'sh.600000', '浦发银行', 9.0, 100.0, 1),
+    ])
+    stock = position(trade_data)
+    stock.process_trades()
+    stock_data = pd.DataFrame({'close': [9.0, 10.0, 10.5, 10.2]},
+                              index=pd.to_datetime(['2023-12-29', '2024-01-02', '2024-01-03', '2024-01-04']))
+
+    full = stock.get_full_history(stock_data)
+    assert list(full.index) == list(stock_data.index[1:])
+    assert full['shares'].tolist() == [100.0, 400.0, 400.0]
+    assert list(full.columns) == HISTORY_COLUMNS
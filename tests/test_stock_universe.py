@@ -0,0 +1,95 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from stock_project.technocal_indicators.stock_universe import build_universe, filter_universe, get_board
+
+CODE_NAME_MAP = {
+    'sh.600000': '浦发银行',
+    'sz.300750': '宁德时代',
+    'sh.688001': '华兴源创',
+    'sz.000004': '*ST国华',
+    'sh.603000': '新股一号',
+    'sz.000002': '万科A',
+    'sz.000001': '平安银行',
+    'sz.300001': '*ST特锐',
+}
+
+#各股票被剔除的原因：sz.000002市值过大，sz.000001没有市值数据
+EXPECTED_REASONS = {
+    'sh.600000': '',
+    'sz.300750': '创业板',
+    'sh.688001': '科创板',
+    'sz.000004': 'ST',
+    'sh.603000': '新股',
+    'sz.000002': '市值',
+    'sz.000001': '市值',
+    'sz.300001': '创业板、ST、新股',
+}
+
+ALL_CONDITIONS = {"exclude_gem": True, "exclude_star_market": True, "exclude_st": True,
+                  "exclude_new_stock": True, "exclude_market_value": True}
+
+
+@pytest.fixture
+def universe():
+    now = pd.Timestamp.now().normalize()
+    old = now - pd.Timedelta(days=3650)
+    recent = now - pd.Timedelta(days=30)
+    ipo_dates = {code: old for code in CODE_NAME_MAP}
+    ipo_dates.update({'sh.603000': recent, 'sz.300001': recent})
+    # 股票基本资料中没有的股票上市日期为NaT，不按新股剔除
+    del ipo_dates['sz.000001']
+    stock_basic_df = pd.DataFrame({'code': list(ipo_dates), 'ipo_date': list(ipo_dates.values())})
+
+    universe = build_universe(CODE_NAME_MAP, stock_basic_df, with_market_cap=False)
+    universe['float_cap'] = [1e10] * len(universe)
+    universe.loc['sz.000002', 'float_cap'] = 2e11
+    universe.loc['sz.000001', 'float_cap'] = np.nan
+    return universe
+
+
+def test_get_board():
+    assert get_board(['sz.300750', 'sh.688001', 'sh.600000', 'sz.000001']).tolist() == [
+        '创业板', '科创板', '主板', '主板']
+
+
+def test_build_universe_columns(universe):
+    assert universe.index.tolist() == list(CODE_NAME_MAP)
+    assert universe.loc['sz.000004', 'is_st']
+    assert not universe.loc['sh.600000', 'is_st']
+    assert pd.isna(universe.loc['sz.000001', 'ipo_date'])
+
+
+def test_build_universe_without_stock_basic():
+    universe = build_universe(CODE_NAME_MAP, None, with_market_cap=False)
+    assert universe['ipo_date'].isna().all()
+    assert universe['float_cap'].isna().all()
+
+
+def test_filter_universe_records_each_reason(universe):
+    result = filter_universe(universe, ALL_CONDITIONS, months=4, max_market_cap=5e10)
+    assert result['reason'].to_dict() == EXPECTED_REASONS
+    assert result.index[result['passed']].tolist() == ['sh.600000']
+
+
+#关闭某项条件后，只因该原因被剔除的股票通过筛选
+@pytest.mark.parametrize('condition, reason', [
+    ('exclude_gem', '创业板'),
+    ('exclude_star_market', '科创板'),
+    ('exclude_st', 'ST'),
+    ('exclude_new_stock', '新股'),
+    ('exclude_market_value', '市值'),
+])
+def test_filter_universe_condition_can_be_disabled(universe, condition, reason):
+    result = filter_universe(universe, dict(ALL_CONDITIONS, **{condition: False}))
+    expected = {code: '、'.join(r for r in reasons.split('、') if r and r != reason)
+                for code, reasons in EXPECTED_REASONS.items()}
+    assert result['reason'].to_dict() == expected
+    assert (result['passed'] == (result['reason'] == '')).all()
+
+
+#缺省的条件默认启用
+def test_filter_universe_defaults_enable_all(universe):
+    result = filter_universe(universe, {})
+    assert result['reason'].to_dict() == EXPECTED_REASONS
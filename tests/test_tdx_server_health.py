@@ -0,0 +1,74 @@
+import json
+
+import pytest
+
+from stock_project.src.data_acquisition import tdx_server_health
+from stock_project.src.data_acquisition.tdx_server_health import TdxServerHealth
+
+FAST = ('10.0.0.1', 7709)
+MEDIUM = ('10.0.0.2', 7709)
+SLOW = ('10.0.0.3', 80)
+DOWN = ('10.0.0.4', 7709)
+
+
+#探测结果替换为固定延迟，配置写入临时目录
+#返回的字典可在测试中修改，下一次探测时生效
+@pytest.fixture
+def rtts(tmp_path, monkeypatch):
+    values = {FAST: 0.01, MEDIUM: 0.05, SLOW: 0.2, DOWN: None}
+    monkeypatch.setattr(tdx_server_health, 'get_config_dir', lambda: str(tmp_path))
+    monkeypatch.setattr(tdx_server_health, 'probe_server', lambda server, time_out=1.5: values[server])
+    return values
+
+
+def test_ranked_servers_orders_by_latency(rtts):
+    health = TdxServerHealth(servers=[DOWN, SLOW, MEDIUM, FAST])
+    assert health.ranked_servers() == [FAST, MEDIUM, SLOW, DOWN]
+    assert health.version == 1
+    assert not health.is_healthy(DOWN)
+
+
+def test_errors_demote_server(rtts):
+    health = TdxServerHealth(servers=[FAST, MEDIUM, SLOW, DOWN], window=4)
+    health.probe_all()
+
+    # 出错率提高后延迟乘以惩罚系数：0.01 * (1 + 4 * 0.5) 仍小于0.05，但已不可用
+    health.record_error(FAST)
+    assert health.error_rate(FAST) == 0.5
+    assert not health.is_healthy(FAST)
+    assert health.ranked_servers() == [MEDIUM, SLOW, FAST, DOWN]
+
+    # 恢复成功后出错率按最近window个事件计算
+    for _ in range(4):
+        health.record_success(FAST)
+    assert health.error_rate(FAST) == 0.0
+    assert health.ranked_servers()[0] == FAST
+
+
+def test_probe_updates_latency_and_version(rtts):
+    health = TdxServerHealth(servers=[FAST, MEDIUM, SLOW, DOWN])
+    health.probe_all()
+
+    rtts[FAST] = None
+    rtts[DOWN] = 0.001
+    health.probe_all()
+    assert health.version == 2
+    # 恢复的服务器近期探测仍有一半失败，暂时排在可用服务器之后
+    assert health.ranked_servers() == [MEDIUM, SLOW, DOWN, FAST]
+
+    health.probe_all()
+    assert health.ranked_servers() == [DOWN, MEDIUM, SLOW, FAST]
+
+
+def test_saved_order_is_loaded_next_start(rtts, tmp_path):
+    TdxServerHealth(servers=[DOWN, SLOW, MEDIUM, FAST]).probe_all()
+    with open(tmp_path / 'tdx_servers.json', encoding='utf-8') as f:
+        saved = json.load(f)
+    assert [(item['ip'], item['port']) for item in saved['servers']] == [FAST, MEDIUM, SLOW, DOWN]
+
+    # 下次启动先使用上次的排序和延迟，新增的候选服务器排在最后
+    extra = ('10.0.0.5', 7709)
+    health = TdxServerHealth(servers=[extra, DOWN, SLOW, MEDIUM, FAST])
+    assert health.servers == [FAST, MEDIUM, SLOW, DOWN, extra]
+    assert health.rtt[FAST] == 0.01
+    assert health.rtt[extra] is None
@@ -0,0 +1,68 @@
+import json
+from datetime import date
+
+import pytest
+
+from stock_project.src.data_acquisition.trade_calendar import TradeCalendar
+
+
+@pytest.fixture
+def calendar(tmp_path):
+    return TradeCalendar(str(tmp_path / 'trade_calendar.json'))
+
+
+def test_holidays_and_adjusted_weekends(calendar):
+    # 国庆节休市；2024-09-29（周日）为调休工作日，但股市不开市
+    assert calendar.is_trade_day('2024-09-30')
+    assert not calendar.is_trade_day('2024-10-01')
+    assert not calendar.is_trade_day(date(2024, 9, 29))
+
+
+def test_next_prev_and_latest_trade_day(calendar):
+    assert calendar.next_trade_day('2024-09-30') == date(2024, 10, 8)
+    assert calendar.prev_trade_day('2024-10-08') == date(2024, 9, 30)
+    assert calendar.latest_trade_day('2024-10-05') == date(2024, 9, 30)
+    assert calendar.latest_trade_day('2024-10-08') == date(2024, 10, 8)
+
+
+def test_queries_across_year_boundary(calendar):
+    assert calendar.prev_trade_day('2024-01-02') == date(2023, 12, 29)
+    assert calendar.next_trade_day('2023-12-29') == date(2024, 1, 2)
+    assert calendar.trade_days_between('2023-12-28', '2024-01-03') == [
+        date(2023, 12, 28), date(2023, 12, 29), date(2024, 1, 2), date(2024, 1, 3)]
+
+
+def test_trade_days_ago(calendar):
+    assert calendar.trade_days_ago(0, '2024-10-05') == date(2024, 9, 30)
+    assert calendar.trade_days_ago(1, '2024-10-08') == date(2024, 9, 30)
+    # 远超一年的回溯会自动加载更早的年份
+    days = calendar.trade_days_between('2020-01-01', '2024-10-08')
+    assert calendar.trade_days_ago(len(days) - 1, '2024-10-08') == days[0]
+
+
+def test_out_of_range_index_raises(calendar):
+    calendar.is_trade_day('2024-06-03')
+    with pytest.raises(IndexError):
+        calendar._day_at(-1)
+    with pytest.raises(IndexError):
+        calendar._day_at(len(calendar.days))
+
+
+#chinese_calendar不支持的年份只剔除周末，给出警告且不写入缓存
+def test_unsupported_years_are_approximate_and_not_saved(calendar, capsys):
+    assert calendar.is_trade_day('2099-06-01')  # 周一，按工作日近似为交易日
+    assert 2099 in calendar.approximate_years
+    assert '警告' in capsys.readouterr().out
+
+    calendar.is_trade_day('2024-06-03')
+    with open(calendar.file_path, 'r', encoding='utf-8') as f:
+        saved = json.load(f)
+    assert '2024' in saved
+    assert '2099' not in saved
+
+
+def test_saved_years_are_reused(calendar):
+    calendar.is_trade_day('2024-06-03')
+    reloaded = TradeCalendar(calendar.file_path)
+    assert '2024' in reloaded._saved
+    assert reloaded.next_trade_day('2024-09-30') == date(2024, 10, 8)